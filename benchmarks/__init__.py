@@ -0,0 +1,7 @@
+"""
+Benchmarks de la API de Condonaciones
+
+Levantan la API en el mismo proceso contra una base de datos SQLite local con
+créditos sintéticos, generan carga concurrente y guardan los resultados en JSON
+para comparar versiones.
+"""
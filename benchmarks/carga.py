@@ -0,0 +1,275 @@
+"""
+Prueba de carga de la API de Condonaciones
+
+Crea la base SQLite sintética, levanta la API en el mismo proceso y genera
+carga concurrente sobre los endpoints por crédito. Reporta latencia
+p50/p95/p99, throughput y memoria, y guarda el resultado en JSON.
+
+Uso:
+    python -m benchmarks.carga
+    python -m benchmarks.carga --creditos 5000 --gastos 300 --peticiones 5000 --concurrencia 64
+    python -m benchmarks.carga --servidor   # a través de uvicorn y TCP en lugar de ASGI directo
+
+Requiere httpx (pip install httpx).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from benchmarks.datos import ID_INICIAL, crear_base, fabrica
+
+# Rutas disponibles: nombre -> (método, plantilla de la ruta)
+RUTAS = {
+    "condonaciones": ("GET", "/api/condonaciones/{id_credito}"),
+    "solo-condonados": ("GET", "/api/condonaciones/{id_credito}/solo-condonados"),
+    "pendientes": ("GET", "/api/condonaciones/{id_credito}/pendientes"),
+    "resumen": ("GET", "/api/condonaciones/{id_credito}/resumen"),
+    "batch": ("POST", "/api/condonaciones/batch"),
+}
+RUTAS_POR_DEFECTO = ("condonaciones", "solo-condonados", "pendientes")
+
+API_KEY = "benchmark"
+TAMANO_LOTE = 50
+
+
+def _argumentos() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark de la API de Condonaciones")
+    parser.add_argument("--creditos", type=int, default=2000, help="Créditos sintéticos")
+    parser.add_argument("--semanas", type=int, default=4, help="Snapshots semanales por crédito")
+    parser.add_argument("--gastos", type=int, default=150, help="Gastos de cobranza por crédito")
+    parser.add_argument("--peticiones", type=int, default=3000, help="Peticiones medidas por ruta")
+    parser.add_argument("--calentamiento", type=int, default=200, help="Peticiones previas no medidas por ruta")
+    parser.add_argument("--concurrencia", type=int, default=32, help="Peticiones simultáneas")
+    parser.add_argument("--rutas", default=",".join(RUTAS_POR_DEFECTO), help=f"Rutas separadas por comas ({', '.join(RUTAS)})")
+    parser.add_argument("--cache", action="store_true", help="Activa la caché de respuestas (por defecto desactivada)")
+    parser.add_argument("--servidor", action="store_true", help="Usa uvicorn sobre TCP en lugar de ASGI directo")
+    parser.add_argument("--base", help="Archivo SQLite a usar/crear (por defecto uno temporal)")
+    parser.add_argument("--semilla", type=int, default=1, help="Semilla de datos y de la selección de créditos")
+    parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto benchmarks/resultados/<fecha>.json)")
+    return parser.parse_args()
+
+
+def _configurar_entorno(args: argparse.Namespace) -> None:
+    """Variables que la API lee al importarse"""
+    os.environ["API_KEYS"] = API_KEY
+    os.environ["CACHE_ENABLED"] = "True" if args.cache else "False"
+    os.environ["CACHE_BACKEND"] = "memoria"
+    os.environ["VERIFICAR_INDICES"] = "False"
+    os.environ["RATE_LIMIT_ENABLED"] = "False"
+    os.environ["SNAPSHOT_INDICE_ENABLED"] = os.environ.get("SNAPSHOT_INDICE_ENABLED", "False")
+
+
+def _rss_mb() -> float:
+    """Memoria residente actual del proceso"""
+    try:
+        with open("/proc/self/statm") as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except OSError:
+        return _rss_max_mb()
+
+
+def _rss_max_mb() -> float:
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB y macOS bytes
+    return maximo / 1024 / 1024 if sys.platform == "darwin" else maximo / 1024
+
+
+def _percentil(valores: List[float], percentil: float) -> float:
+    """Percentil por rango más cercano sobre valores ordenados"""
+    if not valores:
+        return 0.0
+    posicion = max(0, min(len(valores) - 1, int(round(percentil / 100 * len(valores) + 0.5)) - 1))
+    return valores[posicion]
+
+
+def _resumen(latencias: List[float], estados: Dict[int, int], duracion: float) -> dict:
+    latencias = sorted(latencias)
+    total = len(latencias)
+    return {
+        "peticiones": total,
+        "errores": sum(cantidad for estado, cantidad in estados.items() if estado >= 500 or estado == 0),
+        "estados": {str(estado): cantidad for estado, cantidad in sorted(estados.items())},
+        "throughput_rps": round(total / duracion, 2) if duracion else 0.0,
+        "latencia_ms": {
+            "media": round(sum(latencias) / total * 1000, 3) if total else 0.0,
+            "p50": round(_percentil(latencias, 50) * 1000, 3),
+            "p95": round(_percentil(latencias, 95) * 1000, 3),
+            "p99": round(_percentil(latencias, 99) * 1000, 3),
+            "max": round(latencias[-1] * 1000, 3) if total else 0.0,
+        },
+    }
+
+
+async def _ejecutar_carga(cliente, ruta: str, peticiones: int, concurrencia: int, creditos: int, rnd: random.Random):
+    """Lanza `peticiones` contra una ruta con `concurrencia` trabajadores"""
+    metodo, plantilla = RUTAS[ruta]
+    ids = [ID_INICIAL + rnd.randrange(creditos) for _ in range(peticiones)]
+    latencias: List[float] = []
+    estados: Dict[int, int] = {}
+    siguiente = iter(range(peticiones))
+
+    async def trabajador():
+        for numero in siguiente:
+            id_credito = ids[numero]
+            inicio = time.perf_counter()
+            try:
+                if metodo == "POST":
+                    lote = [ID_INICIAL + (id_credito + k) % creditos for k in range(TAMANO_LOTE)]
+                    respuesta = await cliente.post(plantilla, json={"ids_credito": lote, "filtro": "todos"})
+                else:
+                    respuesta = await cliente.get(plantilla.format(id_credito=id_credito))
+                await respuesta.aread()
+                estado = respuesta.status_code
+            except Exception:
+                estado = 0
+            latencias.append(time.perf_counter() - inicio)
+            estados[estado] = estados.get(estado, 0) + 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabajador() for _ in range(concurrencia)))
+    return latencias, estados, time.perf_counter() - inicio
+
+
+async def _medir(app, args: argparse.Namespace, base_url: str, transporte) -> dict:
+    import httpx
+
+    rnd = random.Random(args.semilla)
+    rutas = [ruta.strip() for ruta in args.rutas.split(",") if ruta.strip()]
+    limites = httpx.Limits(max_connections=args.concurrencia, max_keepalive_connections=args.concurrencia)
+    resultados = {}
+
+    async with httpx.AsyncClient(
+        base_url=base_url, transport=transporte, headers={"X-API-Key": API_KEY}, limits=limites, timeout=60
+    ) as cliente:
+        for ruta in rutas:
+            if ruta not in RUTAS:
+                raise SystemExit(f"Ruta desconocida: {ruta}. Disponibles: {', '.join(RUTAS)}")
+            await _ejecutar_carga(cliente, ruta, args.calentamiento, args.concurrencia, args.creditos, rnd)
+            latencias, estados, duracion = await _ejecutar_carga(
+                cliente, ruta, args.peticiones, args.concurrencia, args.creditos, rnd
+            )
+            resultados[ruta] = _resumen(latencias, estados, duracion)
+            print(
+                f"{ruta:<16} {resultados[ruta]['throughput_rps']:>9.1f} req/s  "
+                f"p50 {resultados[ruta]['latencia_ms']['p50']:>8.2f} ms  "
+                f"p95 {resultados[ruta]['latencia_ms']['p95']:>8.2f} ms  "
+                f"p99 {resultados[ruta]['latencia_ms']['p99']:>8.2f} ms  "
+                f"errores {resultados[ruta]['errores']}"
+            )
+    return resultados
+
+
+async def _en_proceso(app, args: argparse.Namespace) -> dict:
+    """Carga por ASGI directo (sin red), ejecutando el ciclo de vida de la API"""
+    import httpx
+
+    async with app.router.lifespan_context(app):
+        return await _medir(app, args, "http://benchmark", httpx.ASGITransport(app=app))
+
+
+def _con_servidor(app, args: argparse.Namespace) -> dict:
+    """Carga a través de uvicorn en un hilo, sobre TCP local"""
+    import socket
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        puerto = sock.getsockname()[1]
+
+    servidor = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=puerto, log_level="warning"))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    while not servidor.started:
+        time.sleep(0.05)
+    try:
+        return asyncio.run(_medir(app, args, f"http://127.0.0.1:{puerto}", None))
+    finally:
+        servidor.should_exit = True
+        hilo.join()
+
+
+def _version() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocida"
+
+
+def main() -> None:
+    args = _argumentos()
+    _configurar_entorno(args)
+
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        raise SystemExit("El benchmark requiere el paquete 'httpx' (pip install httpx)")
+
+    ruta_base = args.base or os.path.join(tempfile.mkdtemp(prefix="condonaciones-bench-"), "datos.sqlite")
+    if not args.base or not os.path.exists(ruta_base):
+        inicio = time.perf_counter()
+        crear_base(ruta_base, args.creditos, args.semanas, args.gastos, semilla=args.semilla)
+        print(f"Base sintética: {args.creditos} créditos x {args.gastos} gastos en {time.perf_counter() - inicio:.1f} s")
+
+    # La API se importa después de fijar el entorno
+    from config.database import configurar_fabrica
+    from main import app
+
+    configurar_fabrica(fabrica(ruta_base))
+
+    rss_inicial = _rss_mb()
+    inicio = time.perf_counter()
+    rutas = _con_servidor(app, args) if args.servidor else asyncio.run(_en_proceso(app, args))
+    duracion = time.perf_counter() - inicio
+
+    resultado = {
+        "fecha": datetime.now(timezone.utc).isoformat(),
+        "version": _version(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {
+            "creditos": args.creditos,
+            "semanas": args.semanas,
+            "gastos_por_credito": args.gastos,
+            "peticiones": args.peticiones,
+            "calentamiento": args.calentamiento,
+            "concurrencia": args.concurrencia,
+            "cache": args.cache,
+            "modo": "servidor" if args.servidor else "asgi",
+        },
+        "duracion_s": round(duracion, 3),
+        "memoria_mb": {
+            "rss_inicial": round(rss_inicial, 1),
+            "rss_final": round(_rss_mb(), 1),
+            "rss_max": round(_rss_max_mb(), 1),
+        },
+        "rutas": rutas,
+    }
+
+    salida = args.salida or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "resultados",
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{resultado['version']}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as archivo:
+        json.dump(resultado, archivo, ensure_ascii=False, indent=2)
+    print(f"Memoria: {resultado['memoria_mb']}")
+    print(f"Resultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Comparación de dos resultados de benchmarks.carga
+
+Uso:
+    python -m benchmarks.comparar base.json nuevo.json
+    python -m benchmarks.comparar base.json nuevo.json --tolerancia 0.05
+
+Sale con código 1 si alguna ruta empeora más que la tolerancia en p95 o en
+throughput, para usarlo en CI.
+"""
+
+import argparse
+import json
+import sys
+
+
+def _cargar(ruta: str) -> dict:
+    with open(ruta, encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def _cambio(anterior: float, actual: float) -> float:
+    return (actual - anterior) / anterior if anterior else 0.0
+
+
+def comparar(base: dict, nuevo: dict, tolerancia: float) -> bool:
+    """
+    Imprime la comparación por ruta.
+
+    Returns:
+        True si ninguna ruta tiene una regresión mayor que la tolerancia
+    """
+    if base.get("parametros") != nuevo.get("parametros"):
+        print("Aviso: los parámetros de los benchmarks no coinciden")
+        print(f"  base:  {base.get('parametros')}")
+        print(f"  nuevo: {nuevo.get('parametros')}")
+
+    print(f"{'ruta':<16} {'métrica':<10} {base.get('version', '?'):>12} {nuevo.get('version', '?'):>12} {'cambio':>9}")
+    sin_regresiones = True
+    for ruta, anterior in base["rutas"].items():
+        actual = nuevo["rutas"].get(ruta)
+        if actual is None:
+            print(f"{ruta:<16} (no está en el resultado nuevo)")
+            continue
+
+        metricas = [
+            ("rps", anterior["throughput_rps"], actual["throughput_rps"], False),
+            ("p50 ms", anterior["latencia_ms"]["p50"], actual["latencia_ms"]["p50"], True),
+            ("p95 ms", anterior["latencia_ms"]["p95"], actual["latencia_ms"]["p95"], True),
+            ("p99 ms", anterior["latencia_ms"]["p99"], actual["latencia_ms"]["p99"], True),
+        ]
+        for nombre, valor_base, valor_nuevo, menor_es_mejor in metricas:
+            cambio = _cambio(valor_base, valor_nuevo)
+            regresion = cambio > tolerancia if menor_es_mejor else cambio < -tolerancia
+            # Solo p95 y throughput deciden el código de salida; p50 y p99 son informativos
+            if regresion and nombre in ("rps", "p95 ms"):
+                sin_regresiones = False
+            marca = "  REGRESIÓN" if regresion else ""
+            print(f"{ruta:<16} {nombre:<10} {valor_base:>12.2f} {valor_nuevo:>12.2f} {cambio:>+8.1%}{marca}")
+
+    memoria_base = base.get("memoria_mb", {}).get("rss_max")
+    memoria_nueva = nuevo.get("memoria_mb", {}).get("rss_max")
+    if memoria_base and memoria_nueva:
+        print(f"{'memoria':<16} {'rss_max MB':<10} {memoria_base:>12.1f} {memoria_nueva:>12.1f} "
+              f"{_cambio(memoria_base, memoria_nueva):>+8.1%}")
+    return sin_regresiones
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compara dos resultados de benchmarks.carga")
+    parser.add_argument("base", help="Resultado de referencia (JSON)")
+    parser.add_argument("nuevo", help="Resultado a comparar (JSON)")
+    parser.add_argument(
+        "--tolerancia", type=float, default=0.10,
+        help="Empeoramiento relativo permitido en p95 y throughput (0.10 = 10%%)"
+    )
+    args = parser.parse_args()
+
+    if not comparar(_cargar(args.base), _cargar(args.nuevo), args.tolerancia):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Base de datos local para benchmarks
+
+Sustituye a MySQL con un archivo SQLite que tiene las dos tablas que usa la
+API (tbl_segundometro_semana y gastos_cobranza) con créditos sintéticos, y una
+conexión con la misma interfaz que pymysql (cursor de diccionarios, ping,
+close) para conectarla al pool con `configurar_fabrica`.
+"""
+
+import random
+import sqlite3
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+
+# Primer id_credito sintético
+ID_INICIAL = 100001
+
+_DDL = (
+    """
+    CREATE TABLE tbl_segundometro_semana (
+        Id_credito INTEGER,
+        semana INTEGER,
+        Nombre_cliente TEXT,
+        Id_cliente INTEGER,
+        Domicilio_Completo TEXT,
+        Bucket_Morosidad_Real TEXT,
+        Dias_mora INTEGER,
+        saldo_vencido_inicio REAL
+    )
+    """,
+    """
+    CREATE TABLE gastos_cobranza (
+        id INTEGER PRIMARY KEY,
+        Id_credito INTEGER,
+        periodo_inicio DATE,
+        periodo_fin DATE,
+        SEMANA TEXT,
+        parcialidad TEXT,
+        monto_valor REAL,
+        cuota REAL,
+        condonado INTEGER,
+        fecha_condonacion TIMESTAMP
+    )
+    """,
+    # Los mismos índices que services/indices.py exige en MySQL
+    "CREATE INDEX idx_segundometro_credito_semana ON tbl_segundometro_semana (Id_credito, semana)",
+    "CREATE INDEX idx_gastos_credito_condonado_periodo ON gastos_cobranza (Id_credito, condonado, periodo_inicio)",
+)
+
+_NOMBRES = ("Juan", "María", "José", "Guadalupe", "Luis", "Ana", "Carlos", "Rosa")
+_APELLIDOS = ("Pérez", "García", "Hernández", "López", "Martínez", "Núñez", "Ramírez")
+_BUCKETS = ("B0", "B1", "B2", "B3", "B4", "B7+")
+
+
+def crear_base(
+    ruta: str,
+    creditos: int,
+    semanas: int = 4,
+    gastos_por_credito: int = 150,
+    proporcion_condonados: float = 0.4,
+    semilla: int = 1
+) -> None:
+    """
+    Crea el archivo SQLite con datos sintéticos.
+
+    Args:
+        ruta: Archivo de la base de datos (se sobrescriben las tablas)
+        creditos: Número de créditos
+        semanas: Snapshots semanales por crédito en tbl_segundometro_semana
+        gastos_por_credito: Filas de gastos_cobranza por crédito (una por semana)
+        proporcion_condonados: Fracción de gastos con condonado = 1
+        semilla: Semilla del generador para obtener siempre los mismos datos
+    """
+    rnd = random.Random(semilla)
+    conn = sqlite3.connect(ruta)
+    try:
+        conn.execute("DROP TABLE IF EXISTS tbl_segundometro_semana")
+        conn.execute("DROP TABLE IF EXISTS gastos_cobranza")
+        for sentencia in _DDL:
+            conn.execute(sentencia)
+
+        inicio = date(2023, 1, 2)
+        for id_credito in range(ID_INICIAL, ID_INICIAL + creditos):
+            nombre = f"{rnd.choice(_NOMBRES)} {rnd.choice(_APELLIDOS)} {rnd.choice(_APELLIDOS)}"
+            domicilio = f"Calle {rnd.randint(1, 500)} #{rnd.randint(1, 999)}, Col. Centro"
+            conn.executemany(
+                "INSERT INTO tbl_segundometro_semana VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        id_credito, semana, nombre, id_credito * 7, domicilio,
+                        rnd.choice(_BUCKETS), rnd.randint(0, 120), round(rnd.uniform(0, 20000), 2)
+                    )
+                    for semana in range(1, semanas + 1)
+                ]
+            )
+
+            filas = []
+            for numero in range(gastos_por_credito):
+                periodo_inicio = inicio + timedelta(weeks=numero)
+                condonado = 1 if rnd.random() < proporcion_condonados else rnd.choice((0, None))
+                filas.append((
+                    id_credito,
+                    periodo_inicio,
+                    periodo_inicio + timedelta(days=6),
+                    f"{periodo_inicio.isocalendar()[0]}-{periodo_inicio.isocalendar()[1]:02d}",
+                    f"{numero % 52 + 1}/52",
+                    round(rnd.uniform(50, 500), 2),
+                    150.0,
+                    condonado,
+                    datetime.combine(periodo_inicio, datetime.min.time()) + timedelta(days=10, hours=rnd.randint(8, 18))
+                    if condonado else None,
+                ))
+            conn.executemany(
+                """
+                INSERT INTO gastos_cobranza (
+                    Id_credito, periodo_inicio, periodo_fin, SEMANA, parcialidad,
+                    monto_valor, cuota, condonado, fecha_condonacion
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                filas
+            )
+
+        conn.commit()
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+
+
+class CursorSQLite:
+    """Cursor con la interfaz de pymysql.cursors.DictCursor"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._cursor = conn.cursor()
+        self._columnas: List[str] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, sql: str, parametros=()) -> int:
+        if sql.strip().upper().startswith("KILL QUERY"):
+            # Sin equivalente en SQLite: la consulta ya terminó o se descarta
+            self._columnas = []
+            return 0
+        self._cursor.execute(sql.replace("%s", "?"), tuple(parametros or ()))
+        self._columnas = [columna[0] for columna in self._cursor.description or ()]
+        return self._cursor.rowcount
+
+    def _fila(self, fila) -> Optional[dict]:
+        return None if fila is None else dict(zip(self._columnas, fila))
+
+    def fetchone(self) -> Optional[dict]:
+        return self._fila(self._cursor.fetchone())
+
+    def fetchmany(self, cantidad: int) -> List[dict]:
+        return [self._fila(fila) for fila in self._cursor.fetchmany(cantidad)]
+
+    def fetchall(self) -> List[dict]:
+        return [self._fila(fila) for fila in self._cursor.fetchall()]
+
+    def close(self) -> None:
+        self._cursor.close()
+
+
+class ConexionSQLite:
+    """Conexión con la interfaz de pymysql usada por config.database y los servicios"""
+
+    def __init__(self, ruta: str):
+        self._conn = sqlite3.connect(ruta, check_same_thread=False, detect_types=sqlite3.PARSE_DECLTYPES)
+        self.open = True
+
+    def cursor(self, cursorclass=None) -> CursorSQLite:
+        # SSDictCursor se comporta igual: SQLite ya lee por bloques
+        return CursorSQLite(self._conn)
+
+    def ping(self, reconnect: bool = False) -> None:
+        self._conn.execute("SELECT 1")
+
+    def thread_id(self) -> int:
+        return id(self)
+
+    def close(self) -> None:
+        self.open = False
+        self._conn.close()
+
+
+def fabrica(ruta: str):
+    """Función para `configurar_fabrica`: todas las bases apuntan al mismo archivo"""
+    return lambda database: ConexionSQLite(ruta)
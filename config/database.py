@@ -3,55 +3,958 @@ Configuración de base de datos
 """
 
 import pymysql
+import anyio
 from contextlib import contextmanager
-from typing import Generator
+from collections import deque
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Generator, List, Optional, Tuple, TypeVar
+import asyncio
+import logging
+import math
 import os
+import random
+import threading
+import time
 from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from utils.metricas import medir, registrar_error_db, registro
 
 # Cargar variables de entorno
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class DatabaseConfig:
     """Configuración de conexión a base de datos"""
-    
+
     HOST = os.getenv("DB_HOST", "localhost")
     PORT = int(os.getenv("DB_PORT", "3306"))
     USER = os.getenv("DB_USER", "root")
     PASSWORD = os.getenv("DB_PASSWORD", "")
     DATABASE = os.getenv("DB_DATABASE", "db-mega-reporte")
-    
+
     # Para tbl_segundometro_semana
     DATABASE_SEGUNDOMETRO = os.getenv("DB_SEGUNDOMETRO", "segundometro")
 
+    # Pool de conexiones (valores por sub-pool, es decir, por base de datos)
+    POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+    POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+    POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "True").lower() == "true"
+
+    # Máximo de consultas bloqueantes ejecutándose a la vez en hilos.
+    # Por defecto coincide con la capacidad del pool para no encolar hilos
+    # esperando conexiones.
+    MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", str(POOL_SIZE + POOL_MAX_OVERFLOW)))
+
+    # Segundos que el apagado espera a las consultas que siguen en ejecución
+    DRAIN_TIMEOUT = float(os.getenv("DB_DRAIN_TIMEOUT", "10"))
+
+    # Tiempos máximos de la comunicación con MySQL (segundos). READ_TIMEOUT
+    # debe ser mayor que MAX_EXECUTION_TIME para que sea el servidor quien
+    # cancele la consulta y la conexión siga siendo reutilizable.
+    CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+    READ_TIMEOUT = float(os.getenv("DB_READ_TIMEOUT", "30"))
+    WRITE_TIMEOUT = float(os.getenv("DB_WRITE_TIMEOUT", "30"))
+    # Límite de ejecución de cada SELECT en el servidor (ms; 0 = sin límite)
+    MAX_EXECUTION_TIME = int(os.getenv("DB_MAX_EXECUTION_TIME", "10000"))
+
+    # Circuit breaker: fallos seguidos que lo abren y segundos que permanece abierto
+    BREAKER_ENABLED = os.getenv("DB_BREAKER_ENABLED", "True").lower() == "true"
+    BREAKER_FALLOS = int(os.getenv("DB_BREAKER_FALLOS", "5"))
+    BREAKER_ESPERA = float(os.getenv("DB_BREAKER_ESPERA", "30"))
+
+
+class PoolTimeoutError(Exception):
+    """No se obtuvo una conexión del pool dentro del tiempo de espera"""
+
+
+def _crear_conexion(
+    database: str,
+    host: Optional[str] = None,
+    port: Optional[int] = None
+) -> pymysql.connections.Connection:
+    """Abre una conexión nueva contra la base de datos indicada (por defecto en DB_HOST)"""
+    return pymysql.connect(
+        host=host or DatabaseConfig.HOST,
+        port=port or DatabaseConfig.PORT,
+        user=DatabaseConfig.USER,
+        password=DatabaseConfig.PASSWORD,
+        database=database,
+        charset='utf8mb4',
+        cursorclass=pymysql.cursors.DictCursor,
+        autocommit=True,
+        connect_timeout=DatabaseConfig.CONNECT_TIMEOUT,
+        read_timeout=DatabaseConfig.READ_TIMEOUT,
+        write_timeout=DatabaseConfig.WRITE_TIMEOUT
+    )
+
+
+@lru_cache(maxsize=256)
+def con_limite_ejecucion(sql: str, milisegundos: int = DatabaseConfig.MAX_EXECUTION_TIME) -> str:
+    """
+    Agrega el hint MAX_EXECUTION_TIME al SELECT principal de la sentencia:
+    MySQL la cancela si excede el límite (error 3024). Otras sentencias y
+    `milisegundos` <= 0 se dejan sin cambios.
+    """
+    if milisegundos <= 0 or sql.lstrip()[:6].upper() != "SELECT":
+        return sql
+    inicio = sql.upper().index("SELECT") + 6
+    return f"{sql[:inicio]} /*+ MAX_EXECUTION_TIME({milisegundos}) */{sql[inicio:]}"
+
+
+# Errores que indican que MySQL no responde (cuentan para el circuit breaker);
+# un error de SQL o de datos sí es una respuesta del servidor
+ERRORES_DISPONIBILIDAD = (
+    PoolTimeoutError,
+    pymysql.err.OperationalError,
+    pymysql.err.InterfaceError,
+    OSError
+)
+
+# ER_QUERY_TIMEOUT: MySQL canceló la sentencia por MAX_EXECUTION_TIME
+ER_QUERY_TIMEOUT = 3024
+
+
+def es_tiempo_excedido(error: BaseException) -> bool:
+    """
+    La consulta fue cancelada por MAX_EXECUTION_TIME: el servidor respondió y
+    la conexión sigue sana, aunque llegue como OperationalError.
+    """
+    return isinstance(error, pymysql.err.OperationalError) and bool(error.args) and error.args[0] == ER_QUERY_TIMEOUT
+
+
+transiciones_circuito = registro.contador(
+    "condonaciones_db_circuit_transitions_total",
+    "Cambios de estado del circuit breaker de MySQL",
+    ("desde", "hacia")
+)
+rechazos_circuito = registro.contador(
+    "condonaciones_db_circuit_rejected_total",
+    "Peticiones rechazadas con 503 por el circuit breaker",
+    ()
+)
+
+
+class CircuitoAbiertoError(HTTPException):
+    """MySQL se considera no disponible: la petición falla sin intentar la consulta"""
+
+    def __init__(self, reintentar: float):
+        super().__init__(
+            status_code=503,
+            detail="Base de datos no disponible temporalmente, intente de nuevo más tarde",
+            headers={"Retry-After": str(max(1, math.ceil(reintentar)))}
+        )
+
+
+class ConsultaExcedidaError(HTTPException):
+    """MySQL canceló la consulta por exceder DB_MAX_EXECUTION_TIME"""
+
+    def __init__(self):
+        super().__init__(
+            status_code=504,
+            detail="La consulta excedió el tiempo máximo de ejecución, intente con un rango o filtro menor"
+        )
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker para el acceso a MySQL.
+
+    Tras `fallos` errores de disponibilidad seguidos se abre: durante `espera`
+    segundos las consultas fallan de inmediato con CircuitoAbiertoError en
+    lugar de ocupar hilos y conexiones. Después deja pasar una sola consulta
+    de prueba (semiabierto); si responde se cierra y si falla vuelve a
+    abrirse. Es seguro usarlo desde varios hilos.
+    """
+
+    CERRADO = "cerrado"
+    ABIERTO = "abierto"
+    SEMIABIERTO = "semiabierto"
+
+    def __init__(self, fallos: int, espera: float, enabled: bool = True):
+        self.fallos = max(1, fallos)
+        self.espera = espera
+        self.enabled = enabled
+        self.estado = self.CERRADO
+        self._lock = threading.Lock()
+        self._consecutivos = 0
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+        self._rechazos = 0
+        self._aperturas = 0
+
+    def _cambiar(self, estado: str) -> None:
+        transiciones_circuito.inc(self.estado, estado)
+        if estado == self.ABIERTO:
+            self._aperturas += 1
+            self._abierto_hasta = time.monotonic() + self.espera
+            logger.warning(
+                "Circuit breaker de MySQL abierto por %s s tras %s fallos seguidos",
+                self.espera, self._consecutivos
+            )
+        else:
+            logger.info("Circuit breaker de MySQL %s", estado)
+        self.estado = estado
+
+    def _rechazar(self, reintentar: float) -> None:
+        self._rechazos += 1
+        rechazos_circuito.inc()
+        raise CircuitoAbiertoError(reintentar)
+
+    def verificar(self) -> None:
+        """
+        Falla de inmediato si el circuito no dejaría pasar la consulta, antes
+        de ocupar un hilo. No reserva la consulta de prueba.
+
+        Raises:
+            CircuitoAbiertoError: Si el circuito está abierto
+        """
+        if not self.enabled or self.estado == self.CERRADO:
+            return
+        with self._lock:
+            restante = self._abierto_hasta - time.monotonic()
+            if self.estado == self.ABIERTO and restante > 0:
+                self._rechazar(restante)
+            if self.estado == self.SEMIABIERTO and self._prueba_en_curso:
+                self._rechazar(1)
+
+    def permitir(self) -> None:
+        """
+        Autoriza una consulta; con el circuito semiabierto solo la de prueba.
+        Cada llamada debe seguirse de `registrar`.
+
+        Raises:
+            CircuitoAbiertoError: Si el circuito está abierto
+        """
+        if not self.enabled or self.estado == self.CERRADO:
+            return
+        with self._lock:
+            if self.estado == self.ABIERTO:
+                restante = self._abierto_hasta - time.monotonic()
+                if restante > 0:
+                    self._rechazar(restante)
+                self._cambiar(self.SEMIABIERTO)
+            if self.estado == self.SEMIABIERTO:
+                if self._prueba_en_curso:
+                    self._rechazar(1)
+                self._prueba_en_curso = True
+
+    def registrar(self, error: Optional[BaseException] = None) -> None:
+        """Resultado de una consulta autorizada: None si MySQL respondió"""
+        if not self.enabled:
+            return
+        fallo = isinstance(error, ERRORES_DISPONIBILIDAD) and not es_tiempo_excedido(error)
+        if not fallo and self.estado == self.CERRADO and self._consecutivos == 0:
+            return
+        with self._lock:
+            self._prueba_en_curso = False
+            if not fallo:
+                self._consecutivos = 0
+                if self.estado != self.CERRADO:
+                    self._cambiar(self.CERRADO)
+                return
+            self._consecutivos += 1
+            if self.estado == self.SEMIABIERTO or (
+                self.estado == self.CERRADO and self._consecutivos >= self.fallos
+            ):
+                self._cambiar(self.ABIERTO)
+
+    def omitir(self) -> None:
+        """
+        Cierra una consulta autorizada sin contar su resultado (p. ej. falló
+        una réplica que ya tiene reemplazo); libera la consulta de prueba.
+        """
+        if not self.enabled or self.estado == self.CERRADO:
+            return
+        with self._lock:
+            self._prueba_en_curso = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "estado": self.estado,
+                "fallos_consecutivos": self._consecutivos,
+                "umbral": self.fallos,
+                "espera_s": self.espera,
+                "aperturas": self._aperturas,
+                "rechazos": self._rechazos,
+                "reintentar_en_s": round(max(0.0, self._abierto_hasta - time.monotonic()), 3)
+                if self.estado == self.ABIERTO else 0
+            }
+
+
+# Circuit breaker compartido por todas las bases de datos y destinos. Los fallos
+# de una réplica cuentan solo si su grupo no tiene otro destino disponible: con
+# alternativa basta con retirarla de la rotación (ver get_db_connection)
+circuito = CircuitBreaker(
+    DatabaseConfig.BREAKER_FALLOS,
+    DatabaseConfig.BREAKER_ESPERA,
+    DatabaseConfig.BREAKER_ENABLED
+)
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones acotado para una base de datos.
+
+    Mantiene hasta `size` conexiones abiertas de forma permanente y permite
+    abrir hasta `max_overflow` conexiones adicionales en picos, que se cierran
+    al devolverse si el pool ya tiene suficientes conexiones libres.
+    Las conexiones que pasaron más de `recycle` segundos sin usarse se
+    reemplazan y, si `pre_ping` está activo, se valida cada conexión antes
+    de entregarla.
+    """
+
+    def __init__(
+        self,
+        database: str,
+        size: int,
+        max_overflow: int,
+        timeout: float,
+        recycle: int,
+        pre_ping: bool,
+        factory: Callable[[str], pymysql.connections.Connection] = _crear_conexion
+    ):
+        self.database = database
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._factory = factory
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conexión, último uso)
+        self._abiertas = 0
+
+        # Estadísticas
+        self._checkouts = 0
+        self._timeouts = 0
+        self._creadas = 0
+        self._descartadas = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+        self._checkout_total = 0.0
+        self._checkout_max = 0.0
+
+    def acquire(self) -> pymysql.connections.Connection:
+        """
+        Obtiene una conexión del pool, esperando hasta `timeout` segundos.
+
+        Raises:
+            PoolTimeoutError: Si no hay conexiones disponibles a tiempo
+        """
+        inicio = time.perf_counter()
+        limite = inicio + self.timeout
+        conexion = None
+        ultimo_uso = 0.0
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    conexion, ultimo_uso = self._idle.pop()
+                    break
+                if self._abiertas < self.size + self.max_overflow:
+                    self._abiertas += 1
+                    break
+                restante = limite - time.perf_counter()
+                if restante <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeoutError(
+                        f"Sin conexiones disponibles para '{self.database}' "
+                        f"después de {self.timeout}s"
+                    )
+                self._cond.wait(restante)
+            espera = time.perf_counter() - inicio
+
+        try:
+            if conexion is not None and not self._es_valida(conexion, ultimo_uso):
+                self._cerrar(conexion)
+                conexion = None
+            if conexion is None:
+                conexion = self._factory(self.database)
+                with self._cond:
+                    self._creadas += 1
+        except Exception:
+            with self._cond:
+                self._abiertas -= 1
+                self._cond.notify()
+            raise
+
+        latencia = time.perf_counter() - inicio
+        with self._cond:
+            self._checkouts += 1
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+            self._checkout_total += latencia
+            self._checkout_max = max(self._checkout_max, latencia)
+
+        return conexion
+
+    def release(self, conexion: pymysql.connections.Connection, discard: bool = False) -> None:
+        """
+        Devuelve una conexión al pool.
+
+        Args:
+            conexion: Conexión obtenida con `acquire`
+            discard: Cierra la conexión en lugar de reutilizarla (p. ej. tras un error)
+        """
+        with self._cond:
+            if not discard and len(self._idle) < self.size:
+                self._idle.append((conexion, time.monotonic()))
+                self._cond.notify()
+                return
+            self._abiertas -= 1
+            self._descartadas += 1
+            self._cond.notify()
+        self._cerrar(conexion)
+
+    def precalentar(self, cantidad: int) -> int:
+        """
+        Abre conexiones hasta tener `cantidad` libres (a lo más `size`), para
+        que las primeras peticiones no paguen el handshake con MySQL.
+
+        Returns:
+            Número de conexiones abiertas
+        """
+        abiertas = 0
+        while True:
+            with self._cond:
+                if len(self._idle) >= min(cantidad, self.size) or self._abiertas >= self.size + self.max_overflow:
+                    return abiertas
+                self._abiertas += 1
+            try:
+                conexion = self._factory(self.database)
+            except Exception:
+                with self._cond:
+                    self._abiertas -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._creadas += 1
+                self._idle.append((conexion, time.monotonic()))
+                self._cond.notify()
+            abiertas += 1
+
+    def dispose(self) -> None:
+        """Cierra todas las conexiones libres del pool"""
+        with self._cond:
+            libres = list(self._idle)
+            self._idle.clear()
+            self._abiertas -= len(libres)
+            self._cond.notify_all()
+        for conexion, _ in libres:
+            self._cerrar(conexion)
+
+    def stats(self) -> dict:
+        """Estadísticas del pool para ajustar su tamaño"""
+        with self._cond:
+            checkouts = self._checkouts or 1
+            return {
+                "database": self.database,
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "abiertas": self._abiertas,
+                "libres": len(self._idle),
+                "en_uso": self._abiertas - len(self._idle),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "creadas": self._creadas,
+                "descartadas": self._descartadas,
+                "espera_promedio_ms": round(self._espera_total / checkouts * 1000, 3),
+                "espera_max_ms": round(self._espera_max * 1000, 3),
+                "checkout_promedio_ms": round(self._checkout_total / checkouts * 1000, 3),
+                "checkout_max_ms": round(self._checkout_max * 1000, 3)
+            }
+
+    def _es_valida(self, conexion: pymysql.connections.Connection, ultimo_uso: float) -> bool:
+        """Descarta conexiones inactivas demasiado tiempo o que no responden al ping"""
+        if self.recycle >= 0 and time.monotonic() - ultimo_uso > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                conexion.ping(reconnect=False)
+            except Exception:
+                return False
+        return True
+
+    def _cerrar(self, conexion: pymysql.connections.Connection) -> None:
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+
+# Sub-pools por base de datos
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_fabrica: Callable[[str], pymysql.connections.Connection] = _crear_conexion
+
+
+def configurar_fabrica(factory: Callable[[str], Any]) -> None:
+    """
+    Sustituye la función que abre conexiones nuevas (p. ej. por una base de
+    datos local en benchmarks). Cierra los pools existentes para que las
+    siguientes conexiones se abran con la nueva función.
+
+    Args:
+        factory: Función que recibe el nombre de la base de datos y retorna
+            una conexión compatible con pymysql (cursor, ping, close)
+    """
+    global _fabrica
+    with _pools_lock:
+        _fabrica = factory
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.dispose()
+
+
+def get_pool(database: Optional[str] = None) -> ConnectionPool:
+    """
+    Obtiene (o crea) el pool de conexiones de una base de datos
+
+    Args:
+        database: Nombre de la base de datos (opcional)
+    """
+    db_name = database or DatabaseConfig.DATABASE
+    pool = _pools.get(db_name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_name)
+            if pool is None:
+                pool = ConnectionPool(
+                    database=db_name,
+                    size=DatabaseConfig.POOL_SIZE,
+                    max_overflow=DatabaseConfig.POOL_MAX_OVERFLOW,
+                    timeout=DatabaseConfig.POOL_TIMEOUT,
+                    recycle=DatabaseConfig.POOL_RECYCLE,
+                    pre_ping=DatabaseConfig.POOL_PRE_PING,
+                    factory=_fabrica
+                )
+                _pools[db_name] = pool
+    return pool
+
+
+def obtener_estadisticas_pool() -> Dict[str, dict]:
+    """Estadísticas de todos los sub-pools creados"""
+    return {nombre: pool.stats() for nombre, pool in list(_pools.items())}
+
+
+def cerrar_pools() -> None:
+    """Cierra las conexiones libres de todos los pools (apagado de la API)"""
+    for pool in list(_pools.values()):
+        pool.dispose()
+
+
+class ReplicasConfig:
+    """
+    Réplicas de lectura por base de datos lógica.
+
+    DB_REPLICAS_<LOGICA> es una lista separada por comas de destinos con la
+    forma `host[:puerto][/base][*peso]`, p. ej.
+    `DB_REPLICAS_GASTOS=replica-1/db-mega-reporte*2,replica-2:3307`. Sin la
+    variable la base lógica usa DB_HOST:DB_PORT.
+    """
+
+    # peso (aleatorio ponderado) | latencia (la menor de dos elegidas por peso)
+    ESTRATEGIA = os.getenv("DB_REPLICAS_ESTRATEGIA", "peso")
+    # Segundos entre verificaciones de salud
+    CHECK_INTERVAL = float(os.getenv("DB_REPLICAS_CHECK_INTERVAL", "5"))
+    # Fallos seguidos que retiran a una réplica hasta que vuelva a responder
+    FALLOS = int(os.getenv("DB_REPLICAS_FALLOS", "2"))
+
+
+expulsiones_replica = registro.contador(
+    "condonaciones_db_replica_ejections_total",
+    "Réplicas retiradas de la rotación por fallos seguidos",
+    ("replica",)
+)
+
+
+class Destino:
+    """
+    Servidor y base de datos a los que se envían lecturas, con su estado de
+    salud. Los grupos que comparten un destino comparten su pool y su estado.
+    """
+
+    def __init__(self, host: str, port: int, base: str):
+        self.host = host
+        self.port = port
+        self.base = base
+        # El destino principal conserva el nombre de la base (y de su pool)
+        if (host, port) == (DatabaseConfig.HOST, DatabaseConfig.PORT):
+            self.nombre = base
+        else:
+            self.nombre = f"{host}:{port}/{base}"
+        self.disponible = True
+        self.fallos = 0
+        self.expulsiones = 0
+        # Promedio móvil exponencial de la latencia de las verificaciones
+        self.latencia_ms: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def registrar_fallo(self) -> None:
+        with self._lock:
+            self.fallos += 1
+            if not self.disponible or self.fallos < ReplicasConfig.FALLOS:
+                return
+            self.disponible = False
+            self.expulsiones += 1
+        expulsiones_replica.inc(self.nombre)
+        logger.warning("Réplica %s retirada tras %s fallos seguidos", self.nombre, self.fallos)
+
+    def registrar_exito(self, latencia_ms: Optional[float] = None) -> None:
+        with self._lock:
+            self.fallos = 0
+            if latencia_ms is not None:
+                anterior = self.latencia_ms
+                self.latencia_ms = latencia_ms if anterior is None else 0.7 * anterior + 0.3 * latencia_ms
+            if self.disponible:
+                return
+            self.disponible = True
+        logger.info("Réplica %s de vuelta en la rotación", self.nombre)
+
+    def stats(self) -> dict:
+        return {
+            "destino": self.nombre,
+            "disponible": self.disponible,
+            "fallos_consecutivos": self.fallos,
+            "expulsiones": self.expulsiones,
+            "latencia_ms": round(self.latencia_ms, 3) if self.latencia_ms is not None else None
+        }
+
+
+class GrupoLectura:
+    """Destinos intercambiables de una base de datos lógica, con su peso en el grupo"""
+
+    def __init__(self, nombre: str, destinos: List[Destino], pesos: List[float]):
+        self.nombre = nombre
+        self.destinos = destinos
+        self.pesos = pesos
+
+    def hay_alternativa(self, destino: Destino) -> bool:
+        """Otro destino del grupo puede atender las lecturas que fallen en `destino`"""
+        return any(otro.disponible for otro in self.destinos if otro is not destino)
+
+    def elegir(self) -> Destino:
+        """
+        Destino para la siguiente lectura entre los disponibles; si ninguno lo
+        está se intenta con todos en lugar de fallar sin consultar.
+        """
+        if len(self.destinos) == 1:
+            return self.destinos[0]
+        candidatos, pesos = self.destinos, self.pesos
+        if not all(destino.disponible for destino in candidatos):
+            disponibles = [(destino, peso) for destino, peso in zip(candidatos, pesos) if destino.disponible]
+            if disponibles:
+                candidatos, pesos = [d for d, _ in disponibles], [p for _, p in disponibles]
+        if ReplicasConfig.ESTRATEGIA == "latencia" and len(candidatos) > 1:
+            # Dos al azar por peso y la de menor latencia: evita que todas
+            # las lecturas se amontonen en la réplica más rápida
+            uno, otro = random.choices(candidatos, weights=pesos, k=2)
+            return uno if (uno.latencia_ms or 0.0) <= (otro.latencia_ms or 0.0) else otro
+        return random.choices(candidatos, weights=pesos)[0]
+
+
+def parsear_destinos(valor: str, base: str) -> List[Tuple[Destino, float]]:
+    """
+    Destinos de DB_REPLICAS_<LOGICA> (`host[:puerto][/base][*peso]`,
+    separados por comas) con su peso. `base` se usa cuando el destino no
+    indica una.
+    """
+    destinos = []
+    for parte in valor.split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        parte, _, peso = parte.partition("*")
+        direccion, _, base_destino = parte.partition("/")
+        host, _, puerto = direccion.partition(":")
+        destino = Destino(
+            host or DatabaseConfig.HOST,
+            int(puerto) if puerto else DatabaseConfig.PORT,
+            base_destino or base
+        )
+        destinos.append((destino, float(peso) if peso else 1.0))
+    return destinos
+
+
+# Bases de datos lógicas y destinos (compartidos entre grupos por nombre)
+_grupos: Dict[str, GrupoLectura] = {}
+_destinos: Dict[str, Destino] = {}
+
+
+def registrar_lectura(nombre: str, base: str) -> str:
+    """
+    Declara una base de datos lógica de lectura. Sus destinos salen de
+    DB_REPLICAS_<NOMBRE> o, sin la variable, son `base` en DB_HOST:DB_PORT.
+    `get_db_connection(database=nombre)` elige entonces uno de sus destinos.
+
+    Returns:
+        El nombre, para usarlo como constante
+    """
+    variable = f"DB_REPLICAS_{nombre.upper().replace('-', '_')}"
+    destinos = parsear_destinos(os.getenv(variable, ""), base) or [
+        (Destino(DatabaseConfig.HOST, DatabaseConfig.PORT, base), 1.0)
+    ]
+    _grupos[nombre] = GrupoLectura(
+        nombre,
+        [_destinos.setdefault(destino.nombre, destino) for destino, _ in destinos],
+        [peso for _, peso in destinos]
+    )
+    return nombre
+
+
+def misma_ubicacion(*nombres: str) -> bool:
+    """True si las bases lógicas tienen los mismos destinos (admiten JOIN entre sus tablas)"""
+    return len({frozenset(destino.nombre for destino in _grupos[nombre].destinos) for nombre in nombres}) == 1
+
+
+def _pool_destino(destino: Destino) -> ConnectionPool:
+    """Pool de un destino; el del servidor principal es el mismo de get_pool"""
+    pool = _pools.get(destino.nombre)
+    if pool is not None:
+        return pool
+    if (destino.host, destino.port) == (DatabaseConfig.HOST, DatabaseConfig.PORT):
+        return get_pool(destino.base)
+    with _pools_lock:
+        pool = _pools.get(destino.nombre)
+        if pool is None:
+            # Una fábrica sustituida (benchmarks) no distingue servidores
+            factory = _fabrica
+            if factory is _crear_conexion:
+                factory = partial(_crear_conexion, host=destino.host, port=destino.port)
+            pool = ConnectionPool(
+                database=destino.base,
+                size=DatabaseConfig.POOL_SIZE,
+                max_overflow=DatabaseConfig.POOL_MAX_OVERFLOW,
+                timeout=DatabaseConfig.POOL_TIMEOUT,
+                recycle=DatabaseConfig.POOL_RECYCLE,
+                pre_ping=DatabaseConfig.POOL_PRE_PING,
+                factory=factory
+            )
+            _pools[destino.nombre] = pool
+    return pool
+
+
+def elegir_pool(database: Optional[str] = None) -> ConnectionPool:
+    """Pool para una lectura: de un destino si `database` es lógica, si no get_pool"""
+    grupo = _grupos.get(database)
+    if grupo is None:
+        return get_pool(database)
+    return _pool_destino(grupo.elegir())
+
+
+def precalentar_pools(cantidad: int) -> int:
+    """
+    Abre `cantidad` conexiones en el pool de cada destino de las bases
+    lógicas. Función bloqueante.
+
+    Returns:
+        Número de conexiones abiertas
+    """
+    return sum(_pool_destino(destino).precalentar(cantidad) for destino in obtener_destinos())
+
+
+def verificar_destino(destino: Destino) -> None:
+    """
+    Verificación de salud de un destino: ping con una conexión de su pool.
+    Un pool agotado no cuenta como fallo (la réplica responde, está ocupada).
+    Función bloqueante.
+    """
+    pool = _pool_destino(destino)
+    inicio = time.perf_counter()
+    try:
+        conexion = pool.acquire()
+    except PoolTimeoutError:
+        return
+    except Exception:
+        destino.registrar_fallo()
+        return
+    try:
+        conexion.ping(reconnect=False)
+    except Exception:
+        pool.release(conexion, discard=True)
+        destino.registrar_fallo()
+        return
+    pool.release(conexion)
+    destino.registrar_exito((time.perf_counter() - inicio) * 1000)
+
+
+def hay_replicas() -> bool:
+    """Alguna base lógica tiene más de un destino"""
+    return any(len(grupo.destinos) > 1 for grupo in _grupos.values())
+
+
+async def vigilar_replicas() -> None:
+    """Verifica periódicamente los destinos de las bases lógicas (tarea del lifespan)"""
+    while True:
+        for destino in obtener_destinos():
+            await anyio.to_thread.run_sync(verificar_destino, destino)
+        await asyncio.sleep(ReplicasConfig.CHECK_INTERVAL)
+
+
+def obtener_estadisticas_replicas() -> Dict[str, List[dict]]:
+    """Destinos de cada base lógica con su estado de salud"""
+    return {
+        nombre: [{**destino.stats(), "peso": peso} for destino, peso in zip(grupo.destinos, grupo.pesos)]
+        for nombre, grupo in _grupos.items()
+    }
+
+
+def obtener_destinos() -> List[Destino]:
+    """Destinos de todas las bases lógicas, sin repetir"""
+    return list(_destinos.values())
+
+
+def _registrar_en_circuito(grupo: Optional[GrupoLectura], destino: Optional[Destino], error: BaseException) -> None:
+    """Falla de una consulta: cuenta para el circuit breaker salvo que otra réplica pueda atenderla"""
+    if destino is not None and grupo.hay_alternativa(destino):
+        circuito.omitir()
+    else:
+        circuito.registrar(error)
+
 
 @contextmanager
-def get_db_connection(database: str = None) -> Generator[pymysql.connections.Connection, None, None]:
+def get_db_connection(
+    database: str = None,
+    pool: Optional[ConnectionPool] = None
+) -> Generator[pymysql.connections.Connection, None, None]:
     """
     Context manager para conexión a base de datos
-    
+
+    La conexión se toma del pool de la base de datos y se devuelve al salir.
+    Si la base de datos es lógica (registrar_lectura) se elige uno de sus
+    destinos. Si ocurre un error de conexión durante su uso se descarta en
+    lugar de reutilizarse. Los errores de disponibilidad cuentan para la
+    salud del destino y para el circuit breaker (salvo que otra réplica del
+    grupo esté disponible). Una consulta cancelada por MAX_EXECUTION_TIME
+    conserva la conexión y se convierte en ConsultaExcedidaError (504).
+
     Args:
-        database: Nombre de la base de datos (opcional)
-    
+        database: Nombre de la base de datos o de la base lógica (opcional)
+        pool: Pool específico, en lugar de resolverlo por `database` (opcional)
+
     Yields:
         Conexión a la base de datos
     """
-    db_name = database or DatabaseConfig.DATABASE
-    
-    connection = pymysql.connect(
-        host=DatabaseConfig.HOST,
-        port=DatabaseConfig.PORT,
-        user=DatabaseConfig.USER,
-        password=DatabaseConfig.PASSWORD,
-        database=db_name,
-        charset='utf8mb4',
-        cursorclass=pymysql.cursors.DictCursor
-    )
-    
+    destino = None
+    grupo = None
+    if pool is None:
+        grupo = _grupos.get(database)
+        if grupo is not None:
+            destino = grupo.elegir()
+            pool = _pool_destino(destino)
+        else:
+            pool = get_pool(database)
+    circuito.permitir()
+    try:
+        with medir("conexion"):
+            connection = pool.acquire()
+    except (PoolTimeoutError, pymysql.Error, OSError) as error:
+        registrar_error_db(error)
+        if destino is not None and not isinstance(error, PoolTimeoutError):
+            destino.registrar_fallo()
+        _registrar_en_circuito(grupo, destino, error)
+        raise
+    except BaseException as error:
+        circuito.registrar(error)
+        raise
+
     try:
         yield connection
-    finally:
-        connection.close()
+    except (pymysql.err.OperationalError, pymysql.err.InterfaceError, OSError) as error:
+        registrar_error_db(error)
+        if es_tiempo_excedido(error):
+            # MySQL respondió cancelando la consulta: la conexión sigue sana y
+            # no es una falla de disponibilidad
+            circuito.registrar()
+            pool.release(connection, discard=not connection.open)
+            raise ConsultaExcedidaError() from error
+        # La conexión quedó en un estado desconocido: no se reutiliza
+        if destino is not None:
+            destino.registrar_fallo()
+        _registrar_en_circuito(grupo, destino, error)
+        pool.release(connection, discard=True)
+        raise
+    except BaseException as error:
+        if isinstance(error, pymysql.Error):
+            registrar_error_db(error)
+        circuito.registrar(error)
+        pool.release(connection, discard=not connection.open)
+        raise
+    else:
+        circuito.registrar()
+        if destino is not None and destino.fallos:
+            destino.registrar_exito()
+        pool.release(connection)
+
+
+T = TypeVar("T")
+
+_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _get_limiter() -> anyio.CapacityLimiter:
+    """Limitador de concurrencia compartido (se crea dentro del event loop)"""
+    global _limiter
+    if _limiter is None:
+        _limiter = anyio.CapacityLimiter(DatabaseConfig.MAX_CONCURRENCY)
+    return _limiter
+
+
+async def run_db(func: Callable[..., T], *args: Any) -> T:
+    """
+    Ejecuta una función bloqueante de acceso a datos en un hilo de trabajo.
+
+    Evita que las consultas con pymysql bloqueen el event loop: mientras una
+    consulta espera a MySQL el worker sigue atendiendo otras peticiones.
+    Como máximo `DB_MAX_CONCURRENCY` funciones se ejecutan a la vez; el resto
+    espera su turno sin ocupar hilos. Con el circuit breaker abierto falla de
+    inmediato con CircuitoAbiertoError (503).
+
+    Args:
+        func: Función síncrona que usa get_db_connection
+        *args: Argumentos posicionales para la función
+
+    Returns:
+        El resultado de la función
+    """
+    circuito.verificar()
+    return await anyio.to_thread.run_sync(func, *args, limiter=_get_limiter())
+
+
+async def esperar_consultas(timeout: float) -> bool:
+    """
+    Espera a que terminen las consultas que se ejecutan en hilos (apagado de
+    la API): una petición cancelada no detiene su consulta, que sigue
+    ocupando una conexión hasta que MySQL responde.
+
+    Returns:
+        True si no quedaron consultas en ejecución
+    """
+    limite = time.monotonic() + timeout
+    while _limiter is not None and _limiter.borrowed_tokens > 0:
+        if time.monotonic() >= limite:
+            return False
+        await anyio.sleep(0.05)
+    return True
+
+
+def obtener_estadisticas_concurrencia() -> dict:
+    """Uso del limitador de consultas en hilos"""
+    limiter = _limiter
+    return {
+        "max_concurrency": DatabaseConfig.MAX_CONCURRENCY,
+        "en_ejecucion": limiter.borrowed_tokens if limiter else 0,
+        "en_espera": limiter.statistics().tasks_waiting if limiter else 0
+    }
 
 
 def get_db():
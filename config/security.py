@@ -1,49 +1,276 @@
 """
 Sistema de Seguridad y Autenticación
+
+Las API Keys se guardan como hash SHA-256 en un diccionario: verificar una
+clave cuesta un hash y una búsqueda, sin importar cuántos clientes haya, y la
+coincidencia final se compara en tiempo constante. Además de `API_KEYS`, las
+claves pueden venir de un archivo JSON (`API_KEYS_FILE`) con el nombre del
+cliente, sus scopes y límites; una tarea de fondo vuelve a leer el archivo al
+recibir SIGHUP o cada `API_KEYS_RELOAD_INTERVAL` segundos, sin reiniciar la API
+y sin leer archivos en el event loop.
+
+Las rutas exigen scopes con `Security(verificar_scopes, scopes=[...])`.
 """
 
-from fastapi import HTTPException, Security, status
-from fastapi.security import APIKeyHeader
-from typing import Optional
+from fastapi import HTTPException, Request, Security, status
+from fastapi.security import APIKeyHeader, SecurityScopes
+from typing import Dict, Optional, Tuple
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
 import os
+import threading
+import anyio
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Configuración de API Keys
 API_KEY_NAME = "X-API-Key"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=True)
 
-# Cargar API Keys válidas desde .env (separadas por comas)
-VALID_API_KEYS = os.getenv("API_KEYS", "").split(",")
-VALID_API_KEYS = [key.strip() for key in VALID_API_KEYS if key.strip()]
 
+class SecurityConfig:
+    """Configuración del almacén de API Keys"""
+
+    # API Keys en texto plano (separadas por comas); se cargan una vez al iniciar
+    API_KEYS = [key.strip() for key in os.getenv("API_KEYS", "").split(",") if key.strip()]
+    # Archivo JSON con claves (hash o texto plano) y metadatos por cliente
+    API_KEYS_FILE = os.getenv("API_KEYS_FILE", "")
+    # Segundos entre revisiones del archivo (0 = solo al recibir SIGHUP)
+    RELOAD_INTERVAL = float(os.getenv("API_KEYS_RELOAD_INTERVAL", "60"))
+
+
+# Scopes que exigen las rutas; "*" los concede todos
+SCOPE_CONSULTAR = "condonaciones"
+SCOPE_EXPORTAR = "condonaciones:exportar"
+SCOPE_INVALIDAR_CACHE = "cache:invalidar"
+
+
+def hash_api_key(api_key: str) -> str:
+    """Hash SHA-256 (hex) con el que se guarda una API Key"""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+class ClienteApiKey:
+    """Cliente dueño de una API Key y sus metadatos"""
+
+    __slots__ = ("nombre", "digest", "scopes", "rate_limit", "burst", "max_en_vuelo")
+
+    def __init__(
+        self,
+        nombre: str,
+        digest: bytes,
+        scopes: Tuple[str, ...] = ("*",),
+        rate_limit: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_en_vuelo: Optional[int] = None
+    ):
+        self.nombre = nombre
+        self.digest = digest
+        self.scopes = scopes
+        self.rate_limit = rate_limit
+        self.burst = burst
+        self.max_en_vuelo = max_en_vuelo
+
+    def tiene_scope(self, scope: str) -> bool:
+        return "*" in self.scopes or scope in self.scopes
+
+
+def _cliente_desde_json(entrada: dict, posicion: int) -> ClienteApiKey:
+    """
+    Convierte una entrada del archivo de claves:
+
+        {"nombre": "php-cobranza", "sha256": "<hex>", "scopes": ["condonaciones"],
+         "rate_limit": 50, "burst": 100, "max_en_vuelo": 10}
+
+    En lugar de "sha256" se acepta "key" con la clave en texto plano.
+    """
+    if entrada.get("sha256"):
+        digest = bytes.fromhex(entrada["sha256"])
+    elif entrada.get("key"):
+        digest = bytes.fromhex(hash_api_key(entrada["key"]))
+    else:
+        raise ValueError(f"La entrada {posicion} no tiene 'sha256' ni 'key'")
+    if len(digest) != hashlib.sha256().digest_size:
+        raise ValueError(f"La entrada {posicion} tiene un 'sha256' inválido")
+
+    return ClienteApiKey(
+        nombre=str(entrada.get("nombre") or f"cliente-{posicion}"),
+        digest=digest,
+        scopes=tuple(entrada.get("scopes") or ("*",)),
+        rate_limit=float(entrada["rate_limit"]) if entrada.get("rate_limit") is not None else None,
+        burst=int(entrada["burst"]) if entrada.get("burst") is not None else None,
+        max_en_vuelo=int(entrada["max_en_vuelo"]) if entrada.get("max_en_vuelo") is not None else None
+    )
+
+
+class ApiKeyStore:
+    """
+    Claves válidas indexadas por su hash.
+
+    El diccionario se reemplaza completo en cada recarga (una asignación), por
+    lo que las verificaciones en curso nunca ven un estado intermedio.
+    """
+
+    def __init__(self, claves_env, archivo: str = "", intervalo: float = 60):
+        self.claves_env = list(claves_env)
+        self.archivo = archivo
+        self.intervalo = intervalo
+        self._clientes: Dict[bytes, ClienteApiKey] = {}
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._recarga_solicitada: Optional[asyncio.Event] = None
+        self.recargas = 0
+        self.ultimo_error: Optional[str] = None
+        self.recargar()
+
+    def _leer(self) -> Dict[bytes, ClienteApiKey]:
+        clientes: Dict[bytes, ClienteApiKey] = {}
+        for posicion, key in enumerate(self.claves_env, start=1):
+            digest = bytes.fromhex(hash_api_key(key))
+            clientes[digest] = ClienteApiKey(f"env-{posicion}", digest)
 
-async def verify_api_key(api_key: str = Security(api_key_header)) -> str:
+        if self.archivo:
+            with open(self.archivo, encoding="utf-8") as archivo:
+                contenido = json.load(archivo)
+            entradas = contenido.get("clientes", []) if isinstance(contenido, dict) else contenido
+            for posicion, entrada in enumerate(entradas, start=1):
+                cliente = _cliente_desde_json(entrada, posicion)
+                clientes[cliente.digest] = cliente
+        return clientes
+
+    def recargar(self) -> bool:
+        """
+        Vuelve a leer las claves. Si el archivo no se puede leer o es inválido
+        se conservan las claves anteriores.
+
+        Returns:
+            True si se reemplazaron las claves
+        """
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.archivo) if self.archivo else None
+                clientes = self._leer()
+            except (OSError, ValueError, TypeError, AttributeError) as exc:
+                self.ultimo_error = str(exc)
+                logger.error("No se pudieron cargar las API Keys de %s: %s", self.archivo, exc)
+                return False
+            self._clientes = clientes
+            self._mtime = mtime
+            self.recargas += 1
+            self.ultimo_error = None
+        logger.info("API Keys cargadas: %d clientes", len(clientes))
+        return True
+
+    def _revisar_archivo(self) -> None:
+        """Recarga si el archivo cambió desde la última lectura"""
+        try:
+            mtime = os.path.getmtime(self.archivo)
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.recargar()
+
+    def solicitar_recarga(self) -> None:
+        """Pide a `vigilar` una recarga inmediata (manejador de SIGHUP en el event loop)"""
+        if self._recarga_solicitada is not None:
+            self._recarga_solicitada.set()
+
+    async def vigilar(self) -> None:
+        """
+        Recarga el archivo en un hilo al pedirlo `solicitar_recarga` y, si
+        cambió, cada `intervalo` segundos (tarea de fondo del lifespan).
+        """
+        self._recarga_solicitada = solicitada = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(solicitada.wait(), self.intervalo if self.intervalo > 0 else None)
+                solicitada.clear()
+                revisar = self.recargar
+            except asyncio.TimeoutError:
+                revisar = self._revisar_archivo
+            await anyio.to_thread.run_sync(revisar)
+
+    def buscar(self, api_key: str) -> Optional[ClienteApiKey]:
+        """Cliente de la API Key o None si no es válida"""
+        digest = hashlib.sha256(api_key.encode()).digest()
+        cliente = self._clientes.get(digest)
+        # La búsqueda es por hash; la comparación final no depende de cuántos bytes coinciden
+        if cliente is None or not hmac.compare_digest(cliente.digest, digest):
+            return None
+        return cliente
+
+    def __len__(self) -> int:
+        return len(self._clientes)
+
+    def stats(self) -> dict:
+        return {
+            "clientes": len(self._clientes),
+            "archivo": self.archivo or None,
+            "recargas": self.recargas,
+            "ultimo_error": self.ultimo_error
+        }
+
+
+# Almacén compartido por la API
+api_key_store = ApiKeyStore(SecurityConfig.API_KEYS, SecurityConfig.API_KEYS_FILE, SecurityConfig.RELOAD_INTERVAL)
+
+
+async def verify_api_key(request: Request, api_key: str = Security(api_key_header)) -> str:
     """
     Verifica que el API Key proporcionado sea válido.
-    
+    El cliente queda disponible en `request.state.cliente_api`.
+
     Args:
         api_key: API Key del header X-API-Key
-        
+
     Returns:
         El API Key si es válido
-        
+
     Raises:
         HTTPException: Si el API Key es inválido o no existe
     """
-    if not VALID_API_KEYS:
+    if not len(api_key_store):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="No hay API Keys configuradas en el servidor"
         )
-    
-    if api_key not in VALID_API_KEYS:
+
+    cliente = api_key_store.buscar(api_key)
+    if cliente is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API Key inválida o no autorizada"
         )
-    
+
+    request.state.cliente_api = cliente
+    return api_key
+
+
+async def verificar_scopes(
+    security_scopes: SecurityScopes,
+    request: Request,
+    api_key: str = Security(verify_api_key)
+) -> str:
+    """
+    Verifica la API Key y que su cliente tenga los scopes de la ruta
+    (`Security(verificar_scopes, scopes=[...])`).
+
+    Raises:
+        HTTPException: 403 si al cliente le falta alguno de los scopes
+    """
+    cliente: ClienteApiKey = request.state.cliente_api
+    faltantes = [scope for scope in security_scopes.scopes if not cliente.tiene_scope(scope)]
+    if faltantes:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"El cliente '{cliente.nombre}' no tiene el scope requerido: {', '.join(faltantes)}"
+        )
     return api_key
 
 
@@ -51,7 +278,7 @@ def generate_api_key() -> str:
     """
     Genera un nuevo API Key aleatorio.
     Útil para crear nuevas claves.
-    
+
     Returns:
         Un API Key de 32 caracteres
     """
@@ -59,5 +286,9 @@ def generate_api_key() -> str:
     return secrets.token_urlsafe(32)
 
 
-# Para generar un nuevo API Key, ejecuta:
-# python -c "from config.security import generate_api_key; print(generate_api_key())"
+# Para generar un nuevo API Key y el hash que va en API_KEYS_FILE, ejecuta:
+# python -m config.security
+if __name__ == "__main__":
+    nueva = generate_api_key()
+    print(f"API Key: {nueva}")
+    print(f"sha256:  {hash_api_key(nueva)}")
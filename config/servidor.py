@@ -0,0 +1,206 @@
+"""
+Arranque del servidor en producción
+
+Lanza uvicorn con varios procesos de trabajo: por defecto uno por CPU
+disponible, considerando la afinidad del proceso y el límite de CPU del
+contenedor (cgroup v2 `cpu.max` o cgroup v1 `cpu.cfs_quota_us`).
+
+Cada proceso tiene su propio pool de conexiones, por lo que el total de
+conexiones a MySQL es procesos × (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW). Con
+DB_MAX_CONNECTIONS se fija el presupuesto de conexiones de la instancia y el
+tamaño del pool de cada proceso se reduce para no excederlo.
+
+Al recibir SIGTERM/SIGINT cada proceso deja de aceptar conexiones, termina
+las peticiones en curso (hasta API_GRACEFUL_TIMEOUT segundos) y espera las
+consultas que sigan ejecutándose antes de cerrar el pool.
+
+Uso:
+    python -m config.servidor
+
+Es un módulo aparte de main.py para que la API (main:app) se importe una sola
+vez por proceso: ni el proceso principal ni los procesos de trabajo ejecutan
+main.py como __main__/__mp_main__.
+"""
+
+import logging
+import math
+import os
+import signal
+from importlib.util import find_spec
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+def _entero_o_auto(valor: str) -> Optional[int]:
+    """None para "auto" (o vacío); el entero en otro caso"""
+    valor = valor.strip().lower()
+    return None if valor in ("", "auto") else int(valor)
+
+
+class ServidorConfig:
+    """Configuración del servidor HTTP"""
+
+    HOST = os.getenv("API_HOST", "0.0.0.0")
+    # Cloud Run indica el puerto en PORT
+    PORT = int(os.getenv("API_PORT") or os.getenv("PORT", "8000"))
+    # Solo para desarrollo: implica un único proceso
+    RELOAD = os.getenv("API_RELOAD", "False").lower() == "true"
+    # Número de procesos o "auto" (CPUs disponibles)
+    WORKERS = _entero_o_auto(os.getenv("API_WORKERS", "auto"))
+    # auto | uvloop | asyncio
+    LOOP = os.getenv("API_LOOP", "auto")
+    # auto | httptools | h11
+    HTTP = os.getenv("API_HTTP", "auto")
+    # Segundos para terminar las peticiones en curso al apagar
+    GRACEFUL_TIMEOUT = int(os.getenv("API_GRACEFUL_TIMEOUT", "30"))
+    KEEPALIVE = int(os.getenv("API_KEEPALIVE", "5"))
+    BACKLOG = int(os.getenv("API_BACKLOG", "2048"))
+    LOG_LEVEL = os.getenv("API_LOG_LEVEL", "info")
+    # Conexiones a MySQL disponibles para toda la instancia (0 = sin presupuesto)
+    DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+
+
+def _leer(ruta: str) -> Optional[str]:
+    try:
+        with open(ruta) as archivo:
+            return archivo.read().strip()
+    except OSError:
+        return None
+
+
+def limite_cpu_cgroup(raiz: str = "/sys/fs/cgroup") -> Optional[float]:
+    """
+    CPUs que permite la cuota del cgroup, o None si no hay cuota.
+
+    Args:
+        raiz: Punto de montaje de los cgroups
+    """
+    # cgroup v2: "<cuota> <periodo>" o "max <periodo>"
+    cpu_max = _leer(os.path.join(raiz, "cpu.max"))
+    if cpu_max:
+        cuota, _, periodo = cpu_max.partition(" ")
+        if cuota != "max" and periodo:
+            return int(cuota) / int(periodo)
+        return None
+
+    # cgroup v1: cuota -1 significa sin límite
+    cuota = _leer(os.path.join(raiz, "cpu", "cpu.cfs_quota_us"))
+    periodo = _leer(os.path.join(raiz, "cpu", "cpu.cfs_period_us"))
+    if cuota and periodo and int(cuota) > 0:
+        return int(cuota) / int(periodo)
+    return None
+
+
+def cpus_disponibles() -> int:
+    """CPUs que puede usar el proceso: afinidad y cuota del contenedor"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    cuota = limite_cpu_cgroup()
+    if cuota is not None:
+        # Una fracción de CPU sigue alcanzando para un proceso que espera a MySQL
+        cpus = min(cpus, math.ceil(cuota))
+    return max(1, cpus)
+
+
+def repartir_conexiones(
+    workers: int,
+    pool_size: int,
+    max_overflow: int,
+    presupuesto: int
+) -> Tuple[int, int, int]:
+    """
+    Ajusta procesos y pool por proceso para no exceder el presupuesto de
+    conexiones a MySQL.
+
+    Returns:
+        (workers, pool_size, max_overflow) por proceso
+    """
+    if presupuesto <= 0 or workers * (pool_size + max_overflow) <= presupuesto:
+        return workers, pool_size, max_overflow
+    # Cada proceso necesita al menos una conexión
+    workers = min(workers, presupuesto)
+    por_proceso = presupuesto // workers
+    pool_size = min(pool_size, por_proceso)
+    return workers, pool_size, por_proceso - pool_size
+
+
+def _elegir(valor: str, preferido: str, alterno: str) -> str:
+    """Implementación configurada; en "auto" la preferida si está instalada"""
+    if valor != "auto":
+        return valor
+    return preferido if find_spec(preferido) is not None else alterno
+
+
+def ejecutar() -> None:
+    """Inicia uvicorn con la configuración de ServidorConfig"""
+    import uvicorn
+    from uvicorn.supervisors import Multiprocess
+
+    from config.database import DatabaseConfig
+
+    logging.basicConfig(level=ServidorConfig.LOG_LEVEL.upper())
+
+    workers = 1 if ServidorConfig.RELOAD else (ServidorConfig.WORKERS or cpus_disponibles())
+    workers, pool_size, max_overflow = repartir_conexiones(
+        workers,
+        DatabaseConfig.POOL_SIZE,
+        DatabaseConfig.POOL_MAX_OVERFLOW,
+        ServidorConfig.DB_MAX_CONNECTIONS
+    )
+    if (pool_size, max_overflow) != (DatabaseConfig.POOL_SIZE, DatabaseConfig.POOL_MAX_OVERFLOW):
+        logger.warning(
+            "Pool reducido a %s + %s conexiones por proceso para no exceder DB_MAX_CONNECTIONS=%s con %s procesos",
+            pool_size, max_overflow, ServidorConfig.DB_MAX_CONNECTIONS, workers
+        )
+        # Los procesos de trabajo leen la configuración del entorno al importar la API
+        os.environ["DB_POOL_SIZE"] = str(pool_size)
+        os.environ["DB_POOL_MAX_OVERFLOW"] = str(max_overflow)
+        if DatabaseConfig.MAX_CONCURRENCY > pool_size + max_overflow:
+            os.environ["DB_MAX_CONCURRENCY"] = str(pool_size + max_overflow)
+
+    loop = _elegir(ServidorConfig.LOOP, "uvloop", "asyncio")
+    http = _elegir(ServidorConfig.HTTP, "httptools", "h11")
+    logger.info(
+        "Iniciando %s proceso(s) en %s:%s (loop=%s, http=%s, pool=%s+%s por proceso)",
+        workers, ServidorConfig.HOST, ServidorConfig.PORT, loop, http, pool_size, max_overflow
+    )
+
+    opciones = dict(
+        host=ServidorConfig.HOST,
+        port=ServidorConfig.PORT,
+        reload=ServidorConfig.RELOAD,
+        workers=workers,
+        loop=loop,
+        http=http,
+        backlog=ServidorConfig.BACKLOG,
+        timeout_keep_alive=ServidorConfig.KEEPALIVE,
+        timeout_graceful_shutdown=ServidorConfig.GRACEFUL_TIMEOUT,
+        log_level=ServidorConfig.LOG_LEVEL
+    )
+    if ServidorConfig.RELOAD or workers == 1:
+        uvicorn.run("main:app", **opciones)
+        return
+
+    # Mismo arranque que uvicorn.run con workers > 1, reenviando además SIGHUP
+    # (recarga de API Keys) a los procesos de trabajo
+    config = uvicorn.Config("main:app", **opciones)
+    supervisor = Multiprocess(config, target=uvicorn.Server(config).run, sockets=[config.bind_socket()])
+
+    def reenviar_sighup(sig, frame):
+        for proceso in supervisor.processes:
+            if proceso.pid is not None:
+                os.kill(proceso.pid, signal.SIGHUP)
+
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, reenviar_sighup)
+    supervisor.run()
+
+
+if __name__ == "__main__":
+    ejecutar()
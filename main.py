@@ -6,20 +6,93 @@ FastAPI application para gestión de condonaciones de crédito
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from contextlib import asynccontextmanager, suppress
 from typing import Optional
-import uvicorn
+import asyncio
+import logging
+import os
+import signal
+import sys
 
 from routers import condonaciones
-from config.database import get_db
+from config.database import (
+    DatabaseConfig,
+    circuito,
+    get_db,
+    cerrar_pools,
+    esperar_consultas,
+    hay_replicas,
+    obtener_destinos,
+    obtener_estadisticas_pool,
+    obtener_estadisticas_concurrencia,
+    obtener_estadisticas_replicas,
+    run_db,
+    vigilar_replicas
+)
+from config.security import api_key_store
+from services.arranque import ArranqueConfig, PrimerByteMiddleware, estado_arranque, verificar_disponibilidad
+from services.cache import response_cache
+from services.indices import IndicesConfig, verificar_indices
+from services.invalidacion import InvalidacionConfig, invalidador_cache
+from services.snapshot import indice_snapshot
+from utils.compresion import CompresionConfig, CompresionMiddleware
+from utils.metricas import MetricasConfig, MetricasMiddleware, registro
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Ciclo de vida de la API: verifica índices, arranca el índice de datos
+    generales, vigila las réplicas de lectura, invalida la caché con los
+    cambios de gastos_cobranza, precalienta conexiones y serializadores, y
+    recarga las API Keys (cada intervalo o con SIGHUP); al apagar espera las consultas en curso
+    y libera el pool
+    """
+    # SIGHUP no existe en Windows ni se puede instalar fuera del hilo principal
+    with suppress(AttributeError, NotImplementedError, RuntimeError, ValueError):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, api_key_store.solicitar_recarga)
+    if IndicesConfig.VERIFICAR_AL_INICIAR:
+        await run_db(verificar_indices)
+    tarea_indice = asyncio.create_task(indice_snapshot.ejecutar()) if indice_snapshot.enabled else None
+    tarea_replicas = asyncio.create_task(vigilar_replicas()) if hay_replicas() else None
+    tarea_api_keys = asyncio.create_task(api_key_store.vigilar()) if api_key_store.archivo else None
+    tarea_invalidacion = None
+    if invalidador_cache.enabled:
+        refrescar = condonaciones.precargar_creditos if InvalidacionConfig.REFRESCAR else None
+        tarea_invalidacion = asyncio.create_task(invalidador_cache.ejecutar(refrescar))
+    if ArranqueConfig.WARMUP_ENABLED:
+        await estado_arranque.precalentar(condonaciones.calentar_serializacion, condonaciones.precargar_creditos)
+    else:
+        estado_arranque.precalentado = True
+    estado_arranque.marcar_listo()
+    yield
+    for tarea in (tarea_indice, tarea_replicas, tarea_api_keys, tarea_invalidacion):
+        if tarea is not None:
+            tarea.cancel()
+            with suppress(asyncio.CancelledError):
+                await tarea
+    with suppress(AttributeError, NotImplementedError, RuntimeError, ValueError):
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+    if not await esperar_consultas(DatabaseConfig.DRAIN_TIMEOUT):
+        logger.warning("Apagando con consultas en ejecución después de DB_DRAIN_TIMEOUT (%ss)", DatabaseConfig.DRAIN_TIMEOUT)
+    cerrar_pools()
+
 
 # Crear instancia de FastAPI
 app = FastAPI(
     title="API Condonaciones Sparta Ledger",
     description="API para gestión de condonaciones de crédito",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Compresión de las respuestas que no vienen comprimidas del router
+if CompresionConfig.ENABLED:
+    app.add_middleware(CompresionMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -29,15 +102,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencia por ruta, código y tamaño de respuesta (expuestas en /metrics)
+if MetricasConfig.ENABLED:
+    app.add_middleware(MetricasMiddleware)
+
+# Tiempo desde el inicio del proceso hasta la primera respuesta
+app.add_middleware(PrimerByteMiddleware)
+
 
 # Diccionario de mensajes HTTP estándar
 HTTP_STATUS_MESSAGES = {
     200: "OK",
     400: "Bad Request",
     401: "Unauthorized",
+    403: "Forbidden",
     404: "Not Found",
     422: "Unprocessable Entity",
-    500: "Internal Server Error"
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+    504: "Gateway Timeout"
 }
 
 
@@ -54,7 +138,8 @@ async def http_exception_handler(request, exc: HTTPException):
             "status_message": HTTP_STATUS_MESSAGES.get(exc.status_code, "Error"),
             "success": False,
             "mensaje": exc.detail
-        }
+        },
+        headers=exc.headers
     )
 
 
@@ -141,10 +226,105 @@ async def health_check():
     }
 
 
-if __name__ == "__main__":
-    uvicorn.run(
-        "main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
+@app.get("/ready")
+async def readiness_check():
+    """
+    Disponibilidad para recibir tráfico (sonda de inicio de Cloud Run):
+    precalentamiento terminado y latencia de la base de datos
+    """
+    estado = await verificar_disponibilidad()
+    return JSONResponse(
+        status_code=200 if estado["ready"] else 503,
+        content={"status": "ready" if estado["ready"] else "not_ready", **estado}
     )
+
+
+@app.get("/health/pool")
+async def pool_status():
+    """Estadísticas del pool de conexiones, de las consultas en ejecución, del circuit breaker y de las réplicas"""
+    return {
+        "status": "ok",
+        "pools": obtener_estadisticas_pool(),
+        "concurrencia": obtener_estadisticas_concurrencia(),
+        "circuito": circuito.stats(),
+        "replicas": obtener_estadisticas_replicas()
+    }
+
+
+@app.get("/health/cache")
+async def cache_status():
+    """Contadores de la caché de respuestas (aciertos, fallos y desalojos) y de su invalidación por cambios"""
+    return {
+        "status": "ok",
+        "cache": response_cache.stats(),
+        "invalidacion": invalidador_cache.stats()
+    }
+
+
+@app.get("/health/snapshot")
+async def snapshot_status():
+    """Índice en memoria de datos generales (semana, créditos, memoria y tiempo de construcción)"""
+    return {
+        "status": "ok",
+        "snapshot": indice_snapshot.stats()
+    }
+
+
+def _metricas_estado():
+    """Estado del pool, la caché y el limitador al momento de exponer las métricas"""
+    pools = obtener_estadisticas_pool()
+    for campo, tipo, ayuda in (
+        ("en_uso", "gauge", "Conexiones del pool en uso"),
+        ("libres", "gauge", "Conexiones libres en el pool"),
+        ("checkouts", "counter", "Conexiones entregadas por el pool"),
+        ("timeouts", "counter", "Esperas del pool que agotaron DB_POOL_TIMEOUT"),
+    ):
+        nombre = f"condonaciones_pool_{campo}" + ("_total" if tipo == "counter" else "")
+        yield nombre, tipo, ayuda, [({"database": db}, stats[campo]) for db, stats in pools.items()]
+    
+    concurrencia = obtener_estadisticas_concurrencia()
+    yield "condonaciones_db_threads_running", "gauge", "Consultas ejecutándose en hilos", [({}, concurrencia["en_ejecucion"])]
+    yield "condonaciones_db_threads_waiting", "gauge", "Consultas esperando un hilo", [({}, concurrencia["en_espera"])]
+    yield "condonaciones_db_circuit_state", "gauge", "Estado del circuit breaker de MySQL (1 en el estado actual)", [
+        ({"estado": estado}, int(circuito.estado == estado))
+        for estado in (circuito.CERRADO, circuito.SEMIABIERTO, circuito.ABIERTO)
+    ]
+    destinos = obtener_destinos()
+    yield "condonaciones_db_replica_up", "gauge", "Destino de lectura en la rotación (1) o retirado (0)", [
+        ({"replica": destino.nombre}, int(destino.disponible)) for destino in destinos
+    ]
+    yield "condonaciones_db_replica_latency_ms", "gauge", "Latencia promedio del ping a cada destino de lectura", [
+        ({"replica": destino.nombre}, destino.latencia_ms) for destino in destinos if destino.latencia_ms is not None
+    ]
+    
+    cache = response_cache.stats()
+    yield "condonaciones_cache_hits_total", "counter", "Aciertos de la caché de respuestas", [({}, cache["hits"])]
+    yield "condonaciones_cache_misses_total", "counter", "Fallos de la caché de respuestas", [({}, cache["misses"])]
+    yield "condonaciones_requests_coalesced_total", "counter", "Peticiones que compartieron una carga en curso", [({}, cache["cargas_compartidas"])]
+    yield "condonaciones_cache_stale_total", "counter", "Respuestas vencidas servidas por motivo", [
+        ({"motivo": motivo}, total) for motivo, total in cache["vencidas"].items()
+    ]
+    invalidacion = invalidador_cache.stats()
+    yield "condonaciones_cache_feed_credits_total", "counter", "Créditos modificados recibidos de la fuente de cambios", [({}, invalidacion["creditos_modificados"])]
+    yield "condonaciones_cache_feed_evictions_total", "counter", "Entradas de caché eliminadas por cambios", [({}, invalidacion["entradas_eliminadas"])]
+    yield "condonaciones_cache_feed_errors_total", "counter", "Lecturas fallidas de la fuente de cambios", [({}, invalidacion["errores"])]
+    
+    claves = api_key_store.stats()
+    yield "condonaciones_api_keys", "gauge", "API Keys cargadas", [({}, claves["clientes"])]
+    yield "condonaciones_api_keys_reloads_total", "counter", "Cargas del almacén de API Keys", [({}, claves["recargas"])]
+
+
+registro.colector(_metricas_estado)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto de Prometheus"""
+    return Response(content=registro.exponer(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+if __name__ == "__main__":
+    # El servidor importa main:app por su cuenta: este proceso se reemplaza por
+    # el lanzador para que el módulo no se ejecute dos veces (como __main__ y
+    # como main), lo que duplicaría los colectores de /metrics
+    os.execv(sys.executable, [sys.executable, "-m", "config.servidor"])
@@ -2,8 +2,8 @@
 Modelos Pydantic para Condonaciones
 """
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Union
+from pydantic import BaseModel, Field, model_serializer
+from typing import List, Literal, Optional, Union
 from datetime import datetime, date
 
 
@@ -66,6 +66,18 @@ class CondonacionCobranza(BaseModel):
         default_factory=list,
         description="Lista de detalles de gastos de cobranza"
     )
+    siguiente_cursor: Optional[str] = Field(
+        None,
+        description="Cursor de la siguiente página; solo se incluye al paginar con limit si quedan más gastos"
+    )
+    
+    @model_serializer(mode="wrap")
+    def _omitir_cursor_vacio(self, handler):
+        # Sin paginación (o en la última página) la respuesta no lleva el campo
+        datos = handler(self)
+        if datos.get("siguiente_cursor") is None:
+            datos.pop("siguiente_cursor", None)
+        return datos
     
     class Config:
         json_schema_extra = {
@@ -145,3 +157,213 @@ class ErrorResponse(BaseModel):
                 "error": None
             }
         }
+
+
+class CacheInvalidacionResponse(BaseModel):
+    """Modelo de respuesta para la invalidación de caché de un crédito"""
+    
+    status_code: int = Field(200, description="Código HTTP de respuesta")
+    status_message: str = Field("OK", description="Significado del código HTTP")
+    success: bool = Field(True, description="Indica si la operación fue exitosa")
+    mensaje: str = Field("", description="Mensaje de respuesta")
+    id_credito: int = Field(..., description="ID del crédito invalidado")
+    entradas_eliminadas: int = Field(0, description="Número de respuestas eliminadas de la caché")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status_code": 200,
+                "status_message": "OK",
+                "success": True,
+                "mensaje": "Se invalidaron 3 entradas de caché del crédito 12345",
+                "id_credito": 12345,
+                "entradas_eliminadas": 3
+            }
+        }
+
+
+class BatchCondonacionRequest(BaseModel):
+    """Modelo de petición para la consulta por lotes"""
+    
+    ids_credito: List[int] = Field(..., min_length=1, description="IDs de crédito a consultar")
+    filtro: Literal["condonados", "pendientes", "todos"] = Field(
+        "condonados",
+        description="Gastos a incluir: condonados (condonado=1), pendientes (condonado=0 o NULL) o todos"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids_credito": [12345, 67890],
+                "filtro": "condonados"
+            }
+        }
+
+
+class ResultadoCredito(BaseModel):
+    """Resultado individual de un crédito dentro de la consulta por lotes"""
+    
+    id_credito: int = Field(..., description="ID del crédito")
+    status_code: int = Field(200, description="Código HTTP del resultado de este crédito")
+    mensaje: str = Field("", description="Mensaje del resultado")
+    datos_generales: Optional[DatosGenerales] = Field(None, description="Datos generales del cliente")
+    condonacion_cobranza: Optional[CondonacionCobranza] = Field(None, description="Detalles de condonación")
+
+
+class BatchCondonacionResponse(BaseModel):
+    """Modelo de respuesta para la consulta por lotes"""
+    
+    status_code: int = Field(200, description="Código HTTP de respuesta")
+    status_message: str = Field("OK", description="Significado del código HTTP")
+    success: bool = Field(True, description="Indica si la operación fue exitosa")
+    mensaje: str = Field("", description="Mensaje de respuesta")
+    total_encontrados: int = Field(0, description="Créditos encontrados")
+    total_no_encontrados: int = Field(0, description="Créditos no encontrados o inválidos")
+    resultados: List[ResultadoCredito] = Field(default_factory=list, description="Resultado por crédito")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status_code": 200,
+                "status_message": "OK",
+                "success": True,
+                "mensaje": "Se consultaron 2 créditos: 1 encontrados, 1 no encontrados",
+                "total_encontrados": 1,
+                "total_no_encontrados": 1,
+                "resultados": [
+                    {
+                        "id_credito": 12345,
+                        "status_code": 200,
+                        "mensaje": "Se encontraron 1 gastos condonados",
+                        "datos_generales": {
+                            "id_credito": 12345,
+                            "nombre_cliente": "Juan Pérez García",
+                            "id_cliente": 67890,
+                            "domicilio_completo": "Calle Principal #123",
+                            "bucket_morosidad": "B2",
+                            "dias_mora": 15,
+                            "saldo_vencido": 3500.00
+                        },
+                        "condonacion_cobranza": {
+                            "detalle": [
+                                {
+                                    "periodoinicio": "2026-01-01",
+                                    "periodofin": "2026-01-07",
+                                    "semana": "2026-01",
+                                    "parcialidad": "1/52",
+                                    "monto_valor": 150.50,
+                                    "cuota": 150.00,
+                                    "condonado": 1,
+                                    "fecha_condonacion": "2026-01-28T10:30:00"
+                                }
+                            ]
+                        }
+                    },
+                    {
+                        "id_credito": 67890,
+                        "status_code": 404,
+                        "mensaje": "No se encontró información del crédito 67890. Verifica que el ID sea correcto.",
+                        "datos_generales": None,
+                        "condonacion_cobranza": None
+                    }
+                ]
+            }
+        }
+
+
+class TotalesGastos(BaseModel):
+    """Totales de gastos de cobranza de un estado de condonación"""
+    
+    cantidad: int = Field(0, description="Número de gastos")
+    monto_valor: float = Field(0, description="Suma de monto_valor")
+    cuota: float = Field(0, description="Suma de cuota")
+
+
+class ResumenGastos(BaseModel):
+    """Resumen de los gastos de cobranza de un crédito, calculado en la base de datos"""
+    
+    condonados: TotalesGastos = Field(default_factory=TotalesGastos, description="Gastos condonados (condonado=1)")
+    pendientes: TotalesGastos = Field(default_factory=TotalesGastos, description="Gastos pendientes (condonado=0 o NULL)")
+    primera_fecha_condonacion: Optional[datetime] = Field(None, description="Primera fecha de condonación")
+    ultima_fecha_condonacion: Optional[datetime] = Field(None, description="Última fecha de condonación")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "condonados": {"cantidad": 2, "monto_valor": 301.00, "cuota": 300.00},
+                "pendientes": {"cantidad": 1, "monto_valor": 150.50, "cuota": 150.00},
+                "primera_fecha_condonacion": "2026-01-14T09:00:00",
+                "ultima_fecha_condonacion": "2026-01-28T10:30:00"
+            }
+        }
+
+
+class ResumenResponse(BaseModel):
+    """Modelo de respuesta del resumen de un crédito"""
+    
+    status_code: int = Field(200, description="Código HTTP de respuesta")
+    status_message: str = Field("OK", description="Significado del código HTTP")
+    success: bool = Field(True, description="Indica si la operación fue exitosa")
+    mensaje: str = Field("", description="Mensaje de respuesta")
+    datos_generales: Optional[DatosGenerales] = Field(None, description="Datos generales del cliente")
+    resumen: Optional[ResumenGastos] = Field(None, description="Totales de gastos de cobranza")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "status_code": 200,
+                "status_message": "OK",
+                "success": True,
+                "mensaje": "Resumen de 3 gastos de cobranza",
+                "datos_generales": {
+                    "id_credito": 12345,
+                    "nombre_cliente": "Juan Pérez García",
+                    "id_cliente": 67890,
+                    "domicilio_completo": "Calle Principal #123",
+                    "bucket_morosidad": "B2",
+                    "dias_mora": 15,
+                    "saldo_vencido": 3500.00
+                },
+                "resumen": {
+                    "condonados": {"cantidad": 2, "monto_valor": 301.00, "cuota": 300.00},
+                    "pendientes": {"cantidad": 1, "monto_valor": 150.50, "cuota": 150.00},
+                    "primera_fecha_condonacion": "2026-01-14T09:00:00",
+                    "ultima_fecha_condonacion": "2026-01-28T10:30:00"
+                }
+            }
+        }
+
+
+class BatchResumenRequest(BaseModel):
+    """Modelo de petición para el resumen por lotes"""
+    
+    ids_credito: List[int] = Field(..., min_length=1, description="IDs de crédito a consultar")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "ids_credito": [12345, 67890]
+            }
+        }
+
+
+class ResultadoResumen(BaseModel):
+    """Resumen individual de un crédito dentro de la consulta por lotes"""
+    
+    id_credito: int = Field(..., description="ID del crédito")
+    status_code: int = Field(200, description="Código HTTP del resultado de este crédito")
+    mensaje: str = Field("", description="Mensaje del resultado")
+    datos_generales: Optional[DatosGenerales] = Field(None, description="Datos generales del cliente")
+    resumen: Optional[ResumenGastos] = Field(None, description="Totales de gastos de cobranza")
+
+
+class BatchResumenResponse(BaseModel):
+    """Modelo de respuesta para el resumen por lotes"""
+    
+    status_code: int = Field(200, description="Código HTTP de respuesta")
+    status_message: str = Field("OK", description="Significado del código HTTP")
+    success: bool = Field(True, description="Indica si la operación fue exitosa")
+    mensaje: str = Field("", description="Mensaje de respuesta")
+    total_encontrados: int = Field(0, description="Créditos encontrados")
+    total_no_encontrados: int = Field(0, description="Créditos no encontrados o inválidos")
+    resultados: List[ResultadoResumen] = Field(default_factory=list, description="Resumen por crédito")
@@ -3,8 +3,18 @@ Router de Condonaciones
 Endpoints para gestión de condonaciones de crédito
 """
 
-from fastapi import APIRouter, HTTPException, Depends, Path, Security
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Path, Query, Request, Security, Body
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from dataclasses import replace
+from functools import partial
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, Dict, List, Literal, Optional, Tuple
+import anyio
+import csv
+import io
+import logging
 import pymysql
 
 from models.condonaciones import (
@@ -12,13 +22,564 @@ from models.condonaciones import (
     ErrorResponse,
     DatosGenerales,
     CondonacionCobranza,
-    DetalleCondonacion
+    DetalleCondonacion,
+    CacheInvalidacionResponse,
+    BatchCondonacionRequest,
+    BatchCondonacionResponse,
+    ResultadoCredito,
+    ResumenGastos,
+    ResumenResponse,
+    BatchResumenRequest,
+    BatchResumenResponse,
+    ResultadoResumen
 )
-from config.database import get_db_connection
-from config.security import verify_api_key
+from config.database import run_db
+from config.security import SCOPE_CONSULTAR, SCOPE_EXPORTAR, SCOPE_INVALIDAR_CACHE, verificar_scopes
+from services.condonaciones import (
+    obtener_condonacion,
+    obtener_condonaciones_lote,
+    obtener_resumen,
+    obtener_resumenes_lote,
+    ExportacionGastos,
+    FiltroGastos,
+    BatchConfig,
+    PaginacionConfig,
+    CAMPOS_DETALLE,
+    codificar_cursor,
+    decodificar_cursor
+)
+from services.snapshot import indice_snapshot
+from services.cache import (
+    response_cache,
+    cache_control,
+    Vencida,
+    VARIANTE_CONDONACIONES,
+    VARIANTE_SOLO_CONDONADOS,
+    VARIANTE_PENDIENTES,
+    VARIANTE_BATCH,
+    VARIANTE_RESUMEN
+)
+from services.limites import Permiso, limitar_peticion
+from utils.serializacion import (
+    usa_serializacion_rapida,
+    serializar_condonacion,
+    resultado_credito,
+    fila_detalle,
+    dumps
+)
+from utils.compresion import comprimir_async, elegir_codificacion
+from utils.condicionales import calcular_etag, etag_codificado, etag_coincide
+from utils.metricas import medir
 from utils.validations import validar_id_credito, validar_datos_encontrados
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Los límites por API Key se aplican antes de cualquier consulta
+router = APIRouter(dependencies=[Depends(limitar_peticion)])
+
+
+def _consultar_condonacion(
+    id_credito: int,
+    filtro: FiltroGastos,
+    datos_generales: Optional[dict] = None
+) -> Tuple[dict, List[dict]]:
+    """
+    Obtiene datos generales y gastos de cobranza en un solo viaje a la base de datos.
+    Función bloqueante: se ejecuta en un hilo mediante run_db.
+    """
+    datos_generales_row, detalles_rows = obtener_condonacion(id_credito, filtro, datos_generales)
+    
+    # Validar que se encontraron datos
+    validar_datos_encontrados(datos_generales_row, 'cliente', id_credito)
+    
+    return datos_generales_row, detalles_rows
+
+
+def _serializar_condonacion(
+    variante: str,
+    mensaje: str,
+    datos_generales_row: dict,
+    detalles_rows: List[dict],
+    campos: Optional[Tuple[str, ...]] = None,
+    siguiente_cursor: Optional[str] = None
+) -> bytes:
+    """
+    Serializa la respuesta de un crédito.
+    
+    Según SERIALIZACION_RAPIDA la respuesta se construye directamente desde las
+    filas o pasando por los modelos Pydantic; ambas producen el mismo JSON.
+    Con `campos` el detalle solo incluye esos campos.
+    """
+    if usa_serializacion_rapida(variante):
+        with medir("serializacion"):
+            return serializar_condonacion(mensaje, datos_generales_row, detalles_rows, campos, siguiente_cursor)
+    
+    with medir("modelos"):
+        response = CondonacionResponse(
+            status_code=200,
+            status_message="OK",
+            success=True,
+            mensaje=mensaje,
+            datos_generales=DatosGenerales(**datos_generales_row),
+            condonacion_cobranza=CondonacionCobranza(
+                detalle=[DetalleCondonacion(**row) for row in detalles_rows],
+                siguiente_cursor=siguiente_cursor
+            )
+        )
+    excluir = None
+    if campos is not None:
+        omitidos = {campo for campo in CAMPOS_DETALLE if campo not in campos}
+        excluir = {"condonacion_cobranza": {"detalle": {"__all__": omitidos}}}
+    with medir("serializacion"):
+        return response.model_dump_json(exclude=excluir).encode()
+
+
+# Descripción de los gastos por estado de condonación
+DESCRIPCIONES_ESTADO = {
+    "condonados": "gastos condonados",
+    "pendientes": "gastos pendientes de condonación",
+    "todos": "gastos de cobranza"
+}
+
+# Estado de condonación y mensaje de respuesta de cada variante de endpoint
+VARIANTES = {
+    VARIANTE_CONDONACIONES: (
+        "condonados",
+        lambda total: f"Se encontraron {total} gastos condonados" if total else "No hay gastos condonados para este crédito"
+    ),
+    VARIANTE_SOLO_CONDONADOS: (
+        "condonados",
+        lambda total: f"Se encontraron {total} gastos condonados"
+    ),
+    VARIANTE_PENDIENTES: (
+        "pendientes",
+        lambda total: f"Se encontraron {total} gastos pendientes de condonación"
+    )
+}
+
+
+def parametros_filtro(
+    fecha_condonacion_desde: Optional[date] = Query(None, description="Fecha de condonación inicial (inclusiva)"),
+    fecha_condonacion_hasta: Optional[date] = Query(None, description="Fecha de condonación final (inclusiva)"),
+    semana: Optional[str] = Query(None, description="Semana del gasto"),
+    parcialidad: Optional[str] = Query(None, description="Parcialidad del gasto"),
+    orden: Literal["asc", "desc"] = Query("asc", description="Orden por periodo de inicio"),
+    limit: Optional[int] = Query(
+        None, gt=0, le=PaginacionConfig.MAX_LIMIT, description="Máximo de gastos por página"
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Cursor de la página siguiente (condonacion_cobranza.siguiente_cursor)"
+    ),
+    fields: Optional[str] = Query(
+        None, description="Campos del detalle separados por comas, p. ej. monto_valor,fecha_condonacion"
+    )
+) -> FiltroGastos:
+    """Dependency con los criterios opcionales sobre el detalle de gastos"""
+    if (
+        fecha_condonacion_desde is not None
+        and fecha_condonacion_hasta is not None
+        and fecha_condonacion_desde > fecha_condonacion_hasta
+    ):
+        raise HTTPException(
+            status_code=400,
+            detail="La fecha 'fecha_condonacion_desde' no puede ser posterior a 'fecha_condonacion_hasta'"
+        )
+    
+    despues_de = None
+    if cursor is not None:
+        try:
+            despues_de = decodificar_cursor(cursor)
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+    
+    campos = None
+    if fields is not None:
+        solicitados = [campo.strip() for campo in fields.split(",") if campo.strip()]
+        desconocidos = [campo for campo in solicitados if campo not in CAMPOS_DETALLE]
+        if not solicitados or desconocidos:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Campos no válidos en 'fields': {', '.join(desconocidos) or fields}. "
+                       f"Permitidos: {', '.join(CAMPOS_DETALLE)}"
+            )
+        # Orden canónico para compartir consulta y entrada de caché
+        campos = tuple(campo for campo in CAMPOS_DETALLE if campo in solicitados)
+    
+    return FiltroGastos(
+        fecha_condonacion_desde=fecha_condonacion_desde,
+        fecha_condonacion_hasta=fecha_condonacion_hasta,
+        semana=semana,
+        parcialidad=parcialidad,
+        orden=orden,
+        limite=limit,
+        despues_de=despues_de,
+        campos=campos
+    )
+
+
+# Cabecera Warning de las respuestas vencidas (RFC 7234 5.5)
+_WARNING_VENCIDA = {
+    Vencida.REVALIDANDO: '110 - "Response is Stale"',
+    Vencida.ERROR: '111 - "Revalidation Failed"'
+}
+
+
+async def _respuesta_json(
+    request: Request,
+    variante: str,
+    id_credito: int,
+    contenido: bytes,
+    vencida: Optional[Vencida] = None
+) -> Response:
+    """
+    Respuesta JSON de una ruta por crédito con ETag y Cache-Control, o 304 si
+    el cliente ya tiene esa versión. Si el cliente acepta compresión, la
+    versión comprimida se guarda en la caché junto a la original (por su
+    ETag) y se reutiliza en lugar de comprimir en cada acierto. Una respuesta
+    vencida lleva su antigüedad en Age y el motivo en Warning.
+    """
+    etag = calcular_etag(contenido)
+    codificacion = elegir_codificacion(request.headers.get("accept-encoding"), len(contenido))
+    headers = {
+        "ETag": etag_codificado(etag, codificacion),
+        "Cache-Control": cache_control(variante),
+        "Vary": "X-API-Key, Accept-Encoding"
+    }
+    if vencida is not None:
+        headers["Age"] = str(int(vencida.edad))
+        headers["Warning"] = _WARNING_VENCIDA[vencida.motivo]
+    if etag_coincide(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    if codificacion is not None:
+        contenido = await response_cache.obtener_derivado(
+            variante, id_credito, f"{codificacion}:{etag[1:-1]}",
+            partial(comprimir_async, contenido, codificacion)
+        )
+        headers["Content-Encoding"] = codificacion
+    return Response(content=contenido, media_type="application/json", headers=headers)
+
+
+async def _contenido_condonacion(
+    variante: str,
+    id_credito: int,
+    filtro: FiltroGastos
+) -> Tuple[bytes, Optional[Vencida]]:
+    """
+    Cuerpo JSON de cualquier variante de consulta de un crédito.
+    
+    Aplica el estado de condonación de la variante al filtro, consulta la base
+    de datos (o la caché) y serializa la respuesta. Al paginar se lee una fila
+    de más para saber si existe una página siguiente. Si la base de datos
+    falla puede retornar la última respuesta guardada, marcada como vencida.
+    """
+    estado, construir_mensaje = VARIANTES[variante]
+    filtro = replace(filtro, estado=estado)
+    consulta = replace(filtro, limite=filtro.limite + 1) if filtro.limite is not None else filtro
+    
+    async def construir_respuesta() -> bytes:
+        # Consulta en un hilo para no bloquear el event loop
+        datos_generales_row, detalles_rows = await run_db(
+            _consultar_condonacion, id_credito, consulta, indice_snapshot.obtener(id_credito)
+        )
+        siguiente_cursor = None
+        if filtro.limite is not None and len(detalles_rows) > filtro.limite:
+            detalles_rows = detalles_rows[:filtro.limite]
+            siguiente_cursor = codificar_cursor(detalles_rows[-1])
+        mensaje = construir_mensaje(len(detalles_rows))
+        return _serializar_condonacion(
+            variante, mensaje, datos_generales_row, detalles_rows, filtro.campos, siguiente_cursor
+        )
+    
+    # Respuesta desde caché (o vencida) o construida y guardada
+    return await response_cache.obtener_o_vencida(
+        variante, id_credito, construir_respuesta, sufijo=filtro.clave_cache()
+    )
+
+
+async def _responder_condonacion(request: Request, variante: str, id_credito: int, filtro: FiltroGastos) -> Response:
+    """
+    Resuelve cualquier variante de consulta de un crédito. Responde 304 si el
+    If-None-Match del cliente coincide con el ETag del cuerpo; sin caché el
+    ETag se calcula sobre el cuerpo recién consultado y serializado, por lo
+    que el 304 solo evita transferirlo y comprimirlo.
+    """
+    try:
+        # Validar ID de crédito
+        validar_id_credito(id_credito)
+        
+        contenido, vencida = await _contenido_condonacion(variante, id_credito, filtro)
+        return await _respuesta_json(request, variante, id_credito, contenido, vencida)
+        
+    except HTTPException:
+        raise
+    except pymysql.Error as db_error:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error de base de datos: {str(db_error)}"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error interno del servidor: {str(e)}"
+        )
+
+
+def calentar_serializacion() -> None:
+    """
+    Serializa una respuesta de ejemplo por variante, por la ruta rápida y por
+    los modelos Pydantic, para que la primera petición real no pague la
+    inicialización de los serializadores. Se usa al iniciar la API.
+    """
+    datos_generales_row = {
+        "id_credito": 1, "nombre_cliente": "", "id_cliente": 1, "domicilio_completo": "",
+        "bucket_morosidad": "", "dias_mora": 0, "saldo_vencido": Decimal("0.00")
+    }
+    detalles_rows = [{
+        "periodoinicio": date(2024, 1, 1), "periodofin": date(2024, 1, 7), "semana": "2024-01",
+        "parcialidad": "1/52", "monto_valor": Decimal("0.00"), "cuota": Decimal("0.00"),
+        "condonado": 1, "fecha_condonacion": datetime(2024, 1, 8)
+    }]
+    for variante in VARIANTES:
+        _serializar_condonacion(variante, "", datos_generales_row, detalles_rows, None, None)
+    serializar_condonacion("", datos_generales_row, detalles_rows, CAMPOS_DETALLE[:2], "")
+    CondonacionResponse(
+        mensaje="",
+        datos_generales=DatosGenerales(**datos_generales_row),
+        condonacion_cobranza=CondonacionCobranza(detalle=[DetalleCondonacion(**row) for row in detalles_rows])
+    ).model_dump_json()
+    resumen = {
+        "condonados": {"cantidad": 0, "monto_valor": 0.0, "cuota": 0.0},
+        "pendientes": {"cantidad": 0, "monto_valor": 0.0, "cuota": 0.0},
+        "primera_fecha_condonacion": None,
+        "ultima_fecha_condonacion": None
+    }
+    ResumenResponse(
+        mensaje="",
+        datos_generales=DatosGenerales(**datos_generales_row),
+        resumen=ResumenGastos(**resumen)
+    ).model_dump_json()
+
+
+async def precargar_creditos(ids_credito: List[int]) -> int:
+    """
+    Construye (y guarda en la caché, si está activa) las respuestas sin
+    filtros de los créditos indicados. Se usa al iniciar la API.
+    
+    Returns:
+        Número de respuestas construidas
+    """
+    construidas = 0
+    for id_credito in ids_credito:
+        for variante in (VARIANTE_CONDONACIONES, VARIANTE_PENDIENTES):
+            try:
+                await _contenido_condonacion(variante, id_credito, FiltroGastos())
+                construidas += 1
+            except HTTPException as exc:
+                logger.warning("No se precargó el crédito %s (%s): %s", id_credito, variante, exc.detail)
+    return construidas
+
+
+def _validar_lote(ids_solicitados: List[int]) -> Tuple[List[int], List[int], Dict[int, Tuple[int, str]]]:
+    """
+    Valida los IDs de una petición por lotes sin detener el lote.
+    
+    Returns:
+        Tupla (IDs únicos en el orden de la petición, IDs válidos,
+        id_credito -> (status_code, mensaje) de los IDs inválidos)
+    """
+    # IDs únicos conservando el orden de la petición
+    ids_credito = list(dict.fromkeys(ids_solicitados))
+    
+    if len(ids_credito) > BatchConfig.MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"La petición excede el máximo de {BatchConfig.MAX_IDS} créditos por lote"
+        )
+    
+    errores: Dict[int, Tuple[int, str]] = {}
+    ids_validos = []
+    for id_credito in ids_credito:
+        try:
+            validar_id_credito(id_credito)
+            ids_validos.append(id_credito)
+        except HTTPException as error:
+            errores[id_credito] = (error.status_code, error.detail)
+    
+    return ids_credito, ids_validos, errores
+
+
+def _mensaje_no_encontrado(id_credito: int) -> str:
+    return f"No se encontró información del crédito {id_credito}. Verifica que el ID sea correcto."
+
+
+def _mensaje_resumen(resumen: dict) -> str:
+    total = resumen["condonados"]["cantidad"] + resumen["pendientes"]["cantidad"]
+    return f"Resumen de {total} gastos de cobranza"
+
+
+# Columnas de la exportación masiva
+CAMPOS_EXPORTACION = (
+    "id_credito",
+    "periodoinicio",
+    "periodofin",
+    "semana",
+    "parcialidad",
+    "monto_valor",
+    "cuota",
+    "condonado",
+    "fecha_condonacion"
+)
+
+
+def _valor_json(valor):
+    """Convierte fechas y decimales a su representación JSON"""
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def _valor_csv(valor):
+    """Valor de una celda CSV (vacío para NULL)"""
+    if valor is None:
+        return ""
+    if isinstance(valor, (date, datetime, Decimal)):
+        return _valor_json(valor)
+    return valor
+
+
+def _serializar_bloque(filas: List[dict], formato: str) -> bytes:
+    """Serializa un bloque de filas como NDJSON o CSV"""
+    if formato == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for fila in filas:
+            writer.writerow([_valor_csv(fila[campo]) for campo in CAMPOS_EXPORTACION])
+        return buffer.getvalue().encode()
+    
+    return b"".join(
+        dumps({"id_credito": fila["id_credito"], **fila_detalle(fila)}) + b"\n"
+        for fila in filas
+    )
+
+
+async def _cerrar_exportacion(exportacion: ExportacionGastos, permiso: Permiso) -> None:
+    """
+    Devuelve la conexión de la exportación y el lugar en vuelo del cliente.
+    Puede llamarse más de una vez.
+    """
+    # La limpieza debe completarse aunque la tarea haya sido cancelada, y
+    # sin pasar por run_db: con el circuit breaker abierto no se ejecutaría
+    # y la conexión de la exportación nunca volvería al pool
+    with anyio.CancelScope(shield=True):
+        try:
+            await anyio.to_thread.run_sync(exportacion.cerrar)
+        finally:
+            await permiso.liberar()
+
+
+async def _generar_exportacion(
+    exportacion: ExportacionGastos,
+    formato: str,
+    permiso: Permiso
+) -> AsyncIterator[bytes]:
+    """
+    Genera el cuerpo de la exportación bloque por bloque.
+    Si el cliente se desconecta la tarea se cancela y `cerrar` cancela la consulta.
+    """
+    try:
+        if formato == "csv":
+            yield (",".join(CAMPOS_EXPORTACION) + "\r\n").encode()
+        
+        while True:
+            filas = await run_db(exportacion.siguiente_bloque)
+            if not filas:
+                break
+            yield _serializar_bloque(filas, formato)
+    finally:
+        await _cerrar_exportacion(exportacion, permiso)
+
+
+@router.get(
+    "/condonaciones/export",
+    responses={
+        200: {
+            "description": "Éxito - Gastos en NDJSON (una fila JSON por línea) o CSV",
+            "content": {"application/x-ndjson": {}, "text/csv": {}}
+        },
+        400: {"description": "Bad Request - Rango de fechas inválido"},
+        401: {"description": "No Autenticado - API Key inválida o faltante"},
+        403: {"description": "Prohibido - La API Key no tiene el scope requerido"},
+        429: {"description": "Too Many Requests - Límite de peticiones de la API Key excedido"},
+        500: {"description": "Error del Servidor - Error interno"},
+        503: {"description": "Service Unavailable - Base de datos no disponible (circuit breaker abierto)"},
+        504: {"description": "Gateway Timeout - La consulta excedió DB_MAX_EXECUTION_TIME"}
+    },
+    summary="Exportar gastos de cobranza por rango de fechas",
+    description=(
+        "Transmite en streaming los gastos de todos los créditos en el rango. "
+        "Con estado=condonados el rango se aplica a fecha_condonacion; con pendientes o todos, a periodo_inicio."
+    )
+)
+async def exportar_condonaciones(
+    desde: date = Query(..., description="Fecha inicial (inclusiva)"),
+    hasta: date = Query(..., description="Fecha final (inclusiva)"),
+    estado: Literal["condonados", "pendientes", "todos"] = Query("condonados", description="Gastos a incluir"),
+    formato: Literal["ndjson", "csv"] = Query("ndjson", description="Formato de salida"),
+    api_key: str = Security(verificar_scopes, scopes=[SCOPE_EXPORTAR]),
+    permiso: Permiso = Depends(limitar_peticion)
+):
+    """
+    Exporta gastos de cobranza de todos los créditos para un rango de fechas.
+    
+    - **desde** / **hasta**: Rango de fechas (YYYY-MM-DD)
+    - **estado**: condonados, pendientes o todos
+    - **formato**: ndjson (por defecto) o csv
+    
+    Las filas se leen con un cursor del lado del servidor y se envían conforme
+    llegan, por lo que la memoria no depende del número de filas.
+    """
+    
+    if desde > hasta:
+        raise HTTPException(
+            status_code=400,
+            detail="La fecha 'desde' no puede ser posterior a 'hasta'"
+        )
+    
+    exportacion = ExportacionGastos(
+        desde,
+        hasta,
+        FiltroGastos(estado=estado),
+        columna_fecha="fecha_condonacion" if estado == "condonados" else "periodo_inicio"
+    )
+    
+    try:
+        await run_db(exportacion.abrir)
+    except pymysql.Error as db_error:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error de base de datos: {str(db_error)}"
+        )
+    
+    # El lugar en vuelo y la conexión se liberan al terminar el cuerpo, no al
+    # salir de la ruta. La tarea de fondo cubre al cliente que se desconecta
+    # antes de que empiece el cuerpo (el generador nunca llega a ejecutarse)
+    permiso = permiso.transferir()
+    cierre = BackgroundTask(_cerrar_exportacion, exportacion, permiso)
+    if formato == "csv":
+        return StreamingResponse(
+            _generar_exportacion(exportacion, formato, permiso),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="condonaciones_{desde}_{hasta}.csv"'},
+            background=cierre
+        )
+    return StreamingResponse(
+        _generar_exportacion(exportacion, formato, permiso),
+        media_type="application/x-ndjson",
+        background=cierre
+    )
 
 
 @router.get(
@@ -26,97 +587,176 @@ router = APIRouter()
     response_model=CondonacionResponse,
     responses={
         200: {"description": "Éxito - Datos obtenidos correctamente"},
+        304: {"description": "No Modificado - El If-None-Match coincide con el ETag vigente"},
         400: {"description": "Bad Request - ID inválido o mal formado"},
         401: {"description": "No Autenticado - API Key inválida o faltante"},
+        403: {"description": "Prohibido - La API Key no tiene el scope requerido"},
         404: {"description": "No Encontrado - Crédito no existe"},
-        500: {"description": "Error del Servidor - Error interno"}
+        429: {"description": "Too Many Requests - Límite de peticiones de la API Key excedido"},
+        500: {"description": "Error del Servidor - Error interno"},
+        503: {"description": "Service Unavailable - Base de datos no disponible (circuit breaker abierto)"},
+        504: {"description": "Gateway Timeout - La consulta excedió DB_MAX_EXECUTION_TIME"}
     },
     summary="Obtener información de condonación por ID de crédito",
     description="Retorna los gastos de cobranza CONDONADOS (condonado=1). Si no hay gastos condonados, retorna array vacío."
 )
 async def get_condonacion_por_credito(
+    request: Request,
     id_credito: int = Path(..., description="ID del crédito a consultar", gt=0),
-    api_key: str = Security(verify_api_key)
+    filtro: FiltroGastos = Depends(parametros_filtro),
+    api_key: str = Security(verificar_scopes, scopes=[SCOPE_CONSULTAR])
 ):
     """
     Obtiene información completa de condonación para un crédito específico.
     
     - **id_credito**: ID del crédito a consultar
+    - **fecha_condonacion_desde** / **fecha_condonacion_hasta**, **semana**, **parcialidad**: filtros opcionales del detalle
+    - **orden**: asc o desc por periodo de inicio
+    - **limit** / **cursor**: paginación del detalle (usar siguiente_cursor de la respuesta anterior)
+    - **fields**: campos del detalle a incluir, separados por comas
     
     Retorna:
     - **datos_generales**: Información del cliente y crédito
     - **condonacion_cobranza**: Lista de detalles de gastos de cobranza
     """
     
+    return await _responder_condonacion(request, VARIANTE_CONDONACIONES, id_credito, filtro)
+
+
+@router.get(
+    "/condonaciones/{id_credito}/solo-condonados",
+    response_model=CondonacionResponse,
+    responses={
+        200: {"description": "Éxito - Datos obtenidos correctamente"},
+        304: {"description": "No Modificado - El If-None-Match coincide con el ETag vigente"},
+        400: {"description": "Bad Request - ID inválido o mal formado"},
+        401: {"description": "No Autenticado - API Key inválida o faltante"},
+        403: {"description": "Prohibido - La API Key no tiene el scope requerido"},
+        404: {"description": "No Encontrado - Crédito no existe"},
+        429: {"description": "Too Many Requests - Límite de peticiones de la API Key excedido"},
+        500: {"description": "Error del Servidor - Error interno"},
+        503: {"description": "Service Unavailable - Base de datos no disponible (circuit breaker abierto)"},
+        504: {"description": "Gateway Timeout - La consulta excedió DB_MAX_EXECUTION_TIME"}
+    },
+    summary="Obtener solo gastos condonados",
+    description="Retorna únicamente los gastos que ya fueron condonados (condonado = 1). Igual al endpoint principal."
+)
+async def get_solo_condonados(
+    request: Request,
+    id_credito: int = Path(..., description="ID del crédito a consultar", gt=0),
+    filtro: FiltroGastos = Depends(parametros_filtro),
+    api_key: str = Security(verificar_scopes, scopes=[SCOPE_CONSULTAR])
+):
+    """
+    Obtiene información de condonación mostrando solo los gastos ya condonados.
+    
+    - **id_credito**: ID del crédito a consultar
+    - **fecha_condonacion_desde** / **fecha_condonacion_hasta**, **semana**, **parcialidad**: filtros opcionales del detalle
+    - **orden**: asc o desc por periodo de inicio
+    - **limit** / **cursor**: paginación del detalle (usar siguiente_cursor de la respuesta anterior)
+    - **fields**: campos del detalle a incluir, separados por comas
+    
+    Retorna solo los registros donde condonado = 1
+    """
+    
+    return await _responder_condonacion(request, VARIANTE_SOLO_CONDONADOS, id_credito, filtro)
+
+
+@router.get(
+    "/condonaciones/{id_credito}/pendientes",
+    response_model=CondonacionResponse,
+    responses={
+        200: {"description": "Éxito - Datos obtenidos correctamente"},
+        304: {"description": "No Modificado - El If-None-Match coincide con el ETag vigente"},
+        400: {"description": "Bad Request - ID inválido o mal formado"},
+        401: {"description": "No Autenticado - API Key inválida o faltante"},
+        403: {"description": "Prohibido - La API Key no tiene el scope requerido"},
+        404: {"description": "No Encontrado - Crédito no existe"},
+        429: {"description": "Too Many Requests - Límite de peticiones de la API Key excedido"},
+        500: {"description": "Error del Servidor - Error interno"},
+        503: {"description": "Service Unavailable - Base de datos no disponible (circuit breaker abierto)"},
+        504: {"description": "Gateway Timeout - La consulta excedió DB_MAX_EXECUTION_TIME"}
+    },
+    summary="Obtener solo gastos pendientes de condonar",
+    description="Retorna únicamente los gastos que NO han sido condonados (condonado = 0 o NULL)"
+)
+async def get_pendientes_condonacion(
+    request: Request,
+    id_credito: int = Path(..., description="ID del crédito a consultar", gt=0),
+    filtro: FiltroGastos = Depends(parametros_filtro),
+    api_key: str = Security(verificar_scopes, scopes=[SCOPE_CONSULTAR])
+):
+    """
+    Obtiene información mostrando solo los gastos pendientes de condonación.
+    
+    - **id_credito**: ID del crédito a consultar
+    - **fecha_condonacion_desde** / **fecha_condonacion_hasta**, **semana**, **parcialidad**: filtros opcionales del detalle
+    - **orden**: asc o desc por periodo de inicio
+    - **limit** / **cursor**: paginación del detalle (usar siguiente_cursor de la respuesta anterior)
+    - **fields**: campos del detalle a incluir, separados por comas
+    
+    Retorna solo los registros donde condonado IS NULL o condonado = 0
+    """
+    
+    return await _responder_condonacion(request, VARIANTE_PENDIENTES, id_credito, filtro)
+
+
+@router.get(
+    "/condonaciones/{id_credito}/resumen",
+    response_model=ResumenResponse,
+    responses={
+        200: {"description": "Éxito - Totales obtenidos correctamente"},
+        304: {"description": "No Modificado - El If-None-Match coincide con el ETag vigente"},
+        400: {"description": "Bad Request - ID inválido o mal formado"},
+        401: {"description": "No Autenticado - API Key inválida o faltante"},
+        403: {"description": "Prohibido - La API Key no tiene el scope requerido"},
+        404: {"description": "No Encontrado - Crédito no existe"},
+        429: {"description": "Too Many Requests - Límite de peticiones de la API Key excedido"},
+        500: {"description": "Error del Servidor - Error interno"},
+        503: {"description": "Service Unavailable - Base de datos no disponible (circuit breaker abierto)"},
+        504: {"description": "Gateway Timeout - La consulta excedió DB_MAX_EXECUTION_TIME"}
+    },
+    summary="Obtener totales de gastos de cobranza",
+    description="Retorna la cantidad y suma de monto_valor y cuota de los gastos condonados y pendientes, calculadas en la base de datos, junto con los datos generales."
+)
+async def get_resumen_condonacion(
+    request: Request,
+    id_credito: int = Path(..., description="ID del crédito a consultar", gt=0),
+    api_key: str = Security(verificar_scopes, scopes=[SCOPE_CONSULTAR])
+):
+    """
+    Obtiene el resumen de gastos de cobranza de un crédito sin transferir el detalle.
+    
+    - **id_credito**: ID del crédito a consultar
+    
+    Retorna:
+    - **datos_generales**: Información del cliente y crédito
+    - **resumen**: Totales de gastos condonados y pendientes, y primera/última fecha de condonación
+    """
+    
     try:
         # Validar ID de crédito
         validar_id_credito(id_credito)
         
-        # Obtener datos generales del cliente desde tbl_segundometro_semana
-        with get_db_connection(database="db-mega-reporte") as conn:
-            with conn.cursor() as cursor:
-                query_datos_generales = """
-                    SELECT 
-                        Id_credito as id_credito,
-                        Nombre_cliente as nombre_cliente,
-                        Id_cliente as id_cliente,
-                        Domicilio_Completo as domicilio_completo,
-                        Bucket_Morosidad_Real as bucket_morosidad,
-                        Dias_mora as dias_mora,
-                        saldo_vencido_inicio as saldo_vencido
-                    FROM tbl_segundometro_semana
-                    WHERE Id_credito = %s
-                    LIMIT 1
-                """
-                
-                cursor.execute(query_datos_generales, (id_credito,))
-                datos_generales_row = cursor.fetchone()
-                
-                # Validar que se encontraron datos
-                validar_datos_encontrados(datos_generales_row, 'cliente', id_credito)
-                
-                # Convertir a modelo Pydantic
-                datos_generales = DatosGenerales(**datos_generales_row)
+        async def construir_respuesta() -> bytes:
+            datos_generales_row, resumen = await run_db(
+                obtener_resumen, id_credito, indice_snapshot.obtener(id_credito)
+            )
+            
+            # Validar que se encontraron datos
+            validar_datos_encontrados(datos_generales_row, 'cliente', id_credito)
+            
+            return ResumenResponse(
+                status_code=200,
+                status_message="OK",
+                success=True,
+                mensaje=_mensaje_resumen(resumen),
+                datos_generales=DatosGenerales(**datos_generales_row),
+                resumen=ResumenGastos(**resumen)
+            ).model_dump_json().encode()
         
-        # Obtener gastos de cobranza desde db-mega-reporte (solo condonados)
-        with get_db_connection(database="db-mega-reporte") as conn:
-            with conn.cursor() as cursor:
-                query_gastos = """
-                    SELECT 
-                        periodo_inicio as periodoinicio,
-                        periodo_fin as periodofin,
-                        SEMANA as semana,
-                        parcialidad,
-                        monto_valor,
-                        cuota,
-                        condonado,
-                        fecha_condonacion
-                    FROM gastos_cobranza
-                    WHERE Id_credito = %s
-                      AND condonado = 1
-                    ORDER BY periodo_inicio ASC
-                """
-                
-                cursor.execute(query_gastos, (id_credito,))
-                detalles_rows = cursor.fetchall()
-                
-                # Convertir a modelos Pydantic (puede estar vacío si no hay condonados)
-                detalles = [DetalleCondonacion(**row) for row in detalles_rows]
-                
-                condonacion_cobranza = CondonacionCobranza(detalle=detalles)
-        
-        # Construir respuesta
-        mensaje = f"Se encontraron {len(detalles)} gastos condonados" if detalles else "No hay gastos condonados para este crédito"
-        response = CondonacionResponse(
-            status_code=200,
-            status_message="OK",
-            success=True,
-            mensaje=mensaje,
-            datos_generales=datos_generales,
-            condonacion_cobranza=condonacion_cobranza
-        )
-        
-        return response
+        contenido, vencida = await response_cache.obtener_o_vencida(VARIANTE_RESUMEN, id_credito, construir_respuesta)
+        return await _respuesta_json(request, VARIANTE_RESUMEN, id_credito, contenido, vencida)
         
     except HTTPException:
         raise
@@ -132,95 +772,108 @@ async def get_condonacion_por_credito(
         )
 
 
-@router.get(
-    "/condonaciones/{id_credito}/solo-condonados",
-    response_model=CondonacionResponse,
+@router.post(
+    "/condonaciones/batch",
+    response_model=BatchCondonacionResponse,
     responses={
-        200: {"description": "Éxito - Datos obtenidos correctamente"},
-        400: {"description": "Bad Request - ID inválido o mal formado"},
+        200: {"description": "Éxito - Resultado por crédito (puede incluir 404 individuales)"},
+        400: {"description": "Bad Request - Demasiados IDs en la petición"},
         401: {"description": "No Autenticado - API Key inválida o faltante"},
-        404: {"description": "No Encontrado - Crédito no existe"},
-        500: {"description": "Error del Servidor - Error interno"}
+        403: {"description": "Prohibido - La API Key no tiene el scope requerido"},
+        429: {"description": "Too Many Requests - Límite de peticiones de la API Key excedido"},
+        500: {"description": "Error del Servidor - Error interno"},
+        503: {"description": "Service Unavailable - Base de datos no disponible (circuit breaker abierto)"},
+        504: {"description": "Gateway Timeout - La consulta excedió DB_MAX_EXECUTION_TIME"}
     },
-    summary="Obtener solo gastos condonados",
-    description="Retorna únicamente los gastos que ya fueron condonados (condonado = 1). Igual al endpoint principal."
+    summary="Consultar condonaciones de varios créditos",
+    description="Resuelve una lista de créditos con consultas por conjunto. Cada crédito trae su propio status_code (200, 400 o 404)."
 )
-async def get_solo_condonados(
-    id_credito: int = Path(..., description="ID del crédito a consultar", gt=0),
-    api_key: str = Security(verify_api_key)
+async def get_condonaciones_lote(
+    peticion: BatchCondonacionRequest = Body(...),
+    api_key: str = Security(verificar_scopes, scopes=[SCOPE_CONSULTAR])
 ):
     """
-    Obtiene información de condonación mostrando solo los gastos ya condonados.
+    Obtiene información de condonación de varios créditos en una sola llamada.
     
-    - **id_credito**: ID del crédito a consultar
+    - **ids_credito**: Lista de IDs de crédito (máximo BATCH_MAX_IDS)
+    - **filtro**: condonados, pendientes o todos
     
-    Retorna solo los registros donde condonado = 1
+    Retorna un resultado por crédito en el mismo orden de la petición
     """
     
     try:
-        # Validar ID de crédito
-        validar_id_credito(id_credito)
+        ids_credito, ids_validos, errores = _validar_lote(peticion.ids_credito)
         
-        # Obtener datos generales
-        with get_db_connection(database="db-mega-reporte") as conn:
-            with conn.cursor() as cursor:
-                query_datos_generales = """
-                    SELECT 
-                        Id_credito as id_credito,
-                        Nombre_cliente as nombre_cliente,
-                        Id_cliente as id_cliente,
-                        Domicilio_Completo as domicilio_completo,
-                        Bucket_Morosidad_Real as bucket_morosidad,
-                        Dias_mora as dias_mora,
-                        saldo_vencido_inicio as saldo_vencido
-                    FROM tbl_segundometro_semana
-                    WHERE Id_credito = %s
-                    LIMIT 1
-                """
-                
-                cursor.execute(query_datos_generales, (id_credito,))
-                datos_generales_row = cursor.fetchone()
-                
-                # Validar que se encontraron datos
-                validar_datos_encontrados(datos_generales_row, 'cliente', id_credito)
-                
-                datos_generales = DatosGenerales(**datos_generales_row)
+        filtro = FiltroGastos(estado=peticion.filtro)
+        descripcion = DESCRIPCIONES_ESTADO[peticion.filtro]
         
-        # Obtener solo gastos condonados
-        with get_db_connection(database="db-mega-reporte") as conn:
-            with conn.cursor() as cursor:
-                query_gastos = """
-                    SELECT 
-                        periodo_inicio as periodoinicio,
-                        periodo_fin as periodofin,
-                        SEMANA as semana,
-                        parcialidad,
-                        monto_valor,
-                        cuota,
-                        condonado,
-                        fecha_condonacion
-                    FROM gastos_cobranza
-                    WHERE Id_credito = %s
-                      AND condonado = 1
-                    ORDER BY periodo_inicio ASC
-                """
-                
-                cursor.execute(query_gastos, (id_credito,))
-                detalles_rows = cursor.fetchall()
-                
-                detalles = [DetalleCondonacion(**row) for row in detalles_rows]
-                condonacion_cobranza = CondonacionCobranza(detalle=detalles)
+        # id_credito -> (status_code, mensaje, datos generales, detalle)
+        resultados: Dict[int, Tuple[int, str, Optional[dict], Optional[List[dict]]]] = {
+            id_credito: (status_code, mensaje, None, None)
+            for id_credito, (status_code, mensaje) in errores.items()
+        }
         
-        response = CondonacionResponse(
-            status_code=200,
-            status_message="OK",
-            success=True,
-            mensaje=f"Se encontraron {len(detalles)} gastos condonados",
-            datos_generales=datos_generales,
-            condonacion_cobranza=condonacion_cobranza
-        )
+        filas = await run_db(
+            partial(obtener_condonaciones_lote, datos_generales=indice_snapshot.obtener_varios(ids_validos)),
+            ids_validos,
+            filtro
+        ) if ids_validos else {}
         
-        return response
+        for id_credito in ids_validos:
+            if id_credito in filas:
+                datos_generales_row, detalles_rows = filas[id_credito]
+                resultados[id_credito] = (
+                    200,
+                    f"Se encontraron {len(detalles_rows)} {descripcion}",
+                    datos_generales_row,
+                    detalles_rows
+                )
+            else:
+                # Créditos sin datos generales
+                resultados[id_credito] = (404, _mensaje_no_encontrado(id_credito), None, None)
+        
+        encontrados = len(filas)
+        no_encontrados = len(ids_credito) - encontrados
+        mensaje = f"Se consultaron {len(ids_credito)} créditos: {encontrados} encontrados, {no_encontrados} no encontrados"
+        
+        with medir("serializacion"):
+            if usa_serializacion_rapida(VARIANTE_BATCH):
+                contenido = dumps({
+                    "status_code": 200,
+                    "status_message": "OK",
+                    "success": True,
+                    "mensaje": mensaje,
+                    "total_encontrados": encontrados,
+                    "total_no_encontrados": no_encontrados,
+                    "resultados": [
+                        resultado_credito(id_credito, *resultados[id_credito])
+                        for id_credito in ids_credito
+                    ]
+                })
+            else:
+                contenido = BatchCondonacionResponse(
+                    status_code=200,
+                    status_message="OK",
+                    success=True,
+                    mensaje=mensaje,
+                    total_encontrados=encontrados,
+                    total_no_encontrados=no_encontrados,
+                    resultados=[
+                        ResultadoCredito(
+                            id_credito=id_credito,
+                            status_code=status_code,
+                            mensaje=mensaje_credito,
+                            datos_generales=DatosGenerales(**datos_generales_row) if datos_generales_row is not None else None,
+                            condonacion_cobranza=CondonacionCobranza(
+                                detalle=[DetalleCondonacion(**row) for row in detalles_rows]
+                            ) if detalles_rows is not None else None
+                        )
+                        for id_credito, (status_code, mensaje_credito, datos_generales_row, detalles_rows)
+                        in ((id_credito, resultados[id_credito]) for id_credito in ids_credito)
+                    ]
+                ).model_dump_json().encode()
+        
+        return Response(content=contenido, media_type="application/json")
         
     except HTTPException:
         raise
@@ -236,95 +889,78 @@ async def get_solo_condonados(
         )
 
 
-@router.get(
-    "/condonaciones/{id_credito}/pendientes",
-    response_model=CondonacionResponse,
+@router.post(
+    "/condonaciones/resumen/batch",
+    response_model=BatchResumenResponse,
     responses={
-        200: {"description": "Éxito - Datos obtenidos correctamente"},
-        400: {"description": "Bad Request - ID inválido o mal formado"},
+        200: {"description": "Éxito - Resumen por crédito (puede incluir 404 individuales)"},
+        400: {"description": "Bad Request - Demasiados IDs en la petición"},
         401: {"description": "No Autenticado - API Key inválida o faltante"},
-        404: {"description": "No Encontrado - Crédito no existe"},
-        500: {"description": "Error del Servidor - Error interno"}
+        403: {"description": "Prohibido - La API Key no tiene el scope requerido"},
+        429: {"description": "Too Many Requests - Límite de peticiones de la API Key excedido"},
+        500: {"description": "Error del Servidor - Error interno"},
+        503: {"description": "Service Unavailable - Base de datos no disponible (circuit breaker abierto)"},
+        504: {"description": "Gateway Timeout - La consulta excedió DB_MAX_EXECUTION_TIME"}
     },
-    summary="Obtener solo gastos pendientes de condonar",
-    description="Retorna únicamente los gastos que NO han sido condonados (condonado = 0 o NULL)"
+    summary="Obtener totales de gastos de varios créditos",
+    description="Calcula en la base de datos los totales de gastos condonados y pendientes de una lista de créditos. Cada crédito trae su propio status_code (200, 400 o 404)."
 )
-async def get_pendientes_condonacion(
-    id_credito: int = Path(..., description="ID del crédito a consultar", gt=0),
-    api_key: str = Security(verify_api_key)
+async def get_resumenes_lote(
+    peticion: BatchResumenRequest = Body(...),
+    api_key: str = Security(verificar_scopes, scopes=[SCOPE_CONSULTAR])
 ):
     """
-    Obtiene información mostrando solo los gastos pendientes de condonación.
+    Obtiene el resumen de gastos de cobranza de varios créditos en una sola llamada.
     
-    - **id_credito**: ID del crédito a consultar
+    - **ids_credito**: Lista de IDs de crédito (máximo BATCH_MAX_IDS)
     
-    Retorna solo los registros donde condonado IS NULL o condonado = 0
+    Retorna un resumen por crédito en el mismo orden de la petición
     """
     
     try:
-        # Validar ID de crédito
-        validar_id_credito(id_credito)
+        ids_credito, ids_validos, errores = _validar_lote(peticion.ids_credito)
         
-        # Obtener datos generales
-        with get_db_connection(database="db-mega-reporte") as conn:
-            with conn.cursor() as cursor:
-                query_datos_generales = """
-                    SELECT 
-                        Id_credito as id_credito,
-                        Nombre_cliente as nombre_cliente,
-                        Id_cliente as id_cliente,
-                        Domicilio_Completo as domicilio_completo,
-                        Bucket_Morosidad_Real as bucket_morosidad,
-                        Dias_mora as dias_mora,
-                        saldo_vencido_inicio as saldo_vencido
-                    FROM tbl_segundometro_semana
-                    WHERE Id_credito = %s
-                    LIMIT 1
-                """
-                
-                cursor.execute(query_datos_generales, (id_credito,))
-                datos_generales_row = cursor.fetchone()
-                
-                # Validar que se encontraron datos
-                validar_datos_encontrados(datos_generales_row, 'cliente', id_credito)
-                
-                datos_generales = DatosGenerales(**datos_generales_row)
+        filas = await run_db(
+            partial(obtener_resumenes_lote, datos_generales=indice_snapshot.obtener_varios(ids_validos)),
+            ids_validos
+        ) if ids_validos else {}
         
-        # Obtener solo gastos pendientes
-        with get_db_connection(database="db-mega-reporte") as conn:
-            with conn.cursor() as cursor:
-                query_gastos = """
-                    SELECT 
-                        periodo_inicio as periodoinicio,
-                        periodo_fin as periodofin,
-                        SEMANA as semana,
-                        parcialidad,
-                        monto_valor,
-                        cuota,
-                        condonado,
-                        fecha_condonacion
-                    FROM gastos_cobranza
-                    WHERE Id_credito = %s
-                      AND (condonado IS NULL OR condonado = 0)
-                    ORDER BY periodo_inicio ASC
-                """
-                
-                cursor.execute(query_gastos, (id_credito,))
-                detalles_rows = cursor.fetchall()
-                
-                detalles = [DetalleCondonacion(**row) for row in detalles_rows]
-                condonacion_cobranza = CondonacionCobranza(detalle=detalles)
+        resultados = []
+        for id_credito in ids_credito:
+            if id_credito in errores:
+                status_code, mensaje_credito = errores[id_credito]
+                resultados.append(ResultadoResumen(id_credito=id_credito, status_code=status_code, mensaje=mensaje_credito))
+            elif id_credito in filas:
+                datos_generales_row, resumen = filas[id_credito]
+                resultados.append(ResultadoResumen(
+                    id_credito=id_credito,
+                    status_code=200,
+                    mensaje=_mensaje_resumen(resumen),
+                    datos_generales=DatosGenerales(**datos_generales_row),
+                    resumen=ResumenGastos(**resumen)
+                ))
+            else:
+                # Créditos sin datos generales
+                resultados.append(ResultadoResumen(
+                    id_credito=id_credito,
+                    status_code=404,
+                    mensaje=_mensaje_no_encontrado(id_credito)
+                ))
         
-        response = CondonacionResponse(
+        encontrados = len(filas)
+        no_encontrados = len(ids_credito) - encontrados
+        
+        contenido = BatchResumenResponse(
             status_code=200,
             status_message="OK",
             success=True,
-            mensaje=f"Se encontraron {len(detalles)} gastos pendientes de condonación",
-            datos_generales=datos_generales,
-            condonacion_cobranza=condonacion_cobranza
-        )
+            mensaje=f"Se consultaron {len(ids_credito)} créditos: {encontrados} encontrados, {no_encontrados} no encontrados",
+            total_encontrados=encontrados,
+            total_no_encontrados=no_encontrados,
+            resultados=resultados
+        ).model_dump_json().encode()
         
-        return response
+        return Response(content=contenido, media_type="application/json")
         
     except HTTPException:
         raise
@@ -338,3 +974,40 @@ async def get_pendientes_condonacion(
             status_code=500,
             detail=f"Error interno del servidor: {str(e)}"
         )
+
+
+@router.delete(
+    "/condonaciones/{id_credito}/cache",
+    response_model=CacheInvalidacionResponse,
+    responses={
+        200: {"description": "Éxito - Caché invalidada"},
+        401: {"description": "No Autenticado - API Key inválida o faltante"},
+        403: {"description": "Prohibido - La API Key no tiene el scope requerido"},
+        429: {"description": "Too Many Requests - Límite de peticiones de la API Key excedido"},
+        500: {"description": "Error del Servidor - Error interno"},
+        503: {"description": "Service Unavailable - Base de datos no disponible (circuit breaker abierto)"},
+        504: {"description": "Gateway Timeout - La consulta excedió DB_MAX_EXECUTION_TIME"}
+    },
+    summary="Invalidar la caché de un crédito",
+    description="Elimina las respuestas en caché de todas las variantes del crédito. Usar cuando cambia gastos_cobranza.condonado."
+)
+async def invalidar_cache_credito(
+    id_credito: int = Path(..., description="ID del crédito a invalidar", gt=0),
+    api_key: str = Security(verificar_scopes, scopes=[SCOPE_INVALIDAR_CACHE])
+):
+    """
+    Invalida la caché de respuestas de un crédito.
+    
+    - **id_credito**: ID del crédito cuyas respuestas se eliminan de la caché
+    """
+    
+    eliminadas = await response_cache.invalidar(id_credito)
+    
+    return CacheInvalidacionResponse(
+        status_code=200,
+        status_message="OK",
+        success=True,
+        mensaje=f"Se invalidaron {eliminadas} entradas de caché del crédito {id_credito}",
+        id_credito=id_credito,
+        entradas_eliminadas=eliminadas
+    )
@@ -0,0 +1,3 @@
+"""
+Módulo de servicios (acceso a datos)
+"""
@@ -0,0 +1,208 @@
+"""
+Arranque de la API: precalentamiento y disponibilidad
+
+En un arranque en frío las primeras peticiones pagan los handshakes con
+MySQL, la primera lectura de cada tabla y la inicialización de los
+serializadores. El precalentamiento hace ese trabajo en el lifespan, antes de
+que la API reciba tráfico, y `verificar_disponibilidad` respalda a /ready
+midiendo la latencia de la base de datos.
+
+También se registra el tiempo desde que inició el proceso hasta que la API
+quedó lista y hasta que envió su primera respuesta.
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from dotenv import load_dotenv
+
+from config.database import DatabaseConfig, get_db_connection, precalentar_pools, run_db
+from services.condonaciones import LECTURA_POR_TABLA
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class ArranqueConfig:
+    """Configuración del precalentamiento"""
+
+    WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "True").lower() == "true"
+    # Conexiones que se abren por adelantado (a lo más DB_POOL_SIZE)
+    CONEXIONES = int(os.getenv("WARMUP_CONEXIONES", str(DatabaseConfig.POOL_SIZE)))
+    # Créditos cuyas respuestas se construyen al iniciar (separados por comas)
+    CREDITOS = [int(c) for c in os.getenv("WARMUP_CREDITOS", "").split(",") if c.strip()]
+    # Tiempo máximo del precalentamiento; al agotarse la API arranca igual
+    TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "30"))
+
+
+# Lectura mínima de cada tabla que usa la API
+_SQL_TABLAS = {
+    "tbl_segundometro_semana": "SELECT 1 FROM tbl_segundometro_semana LIMIT 1",
+    "gastos_cobranza": "SELECT 1 FROM gastos_cobranza LIMIT 1",
+}
+
+
+def _inicio_proceso() -> float:
+    """Momento (epoch) en que arrancó el proceso; incluye el intérprete y los imports"""
+    try:
+        with open("/proc/self/stat") as archivo:
+            # El nombre del proceso puede tener espacios: los campos siguen al último ')'
+            campos = archivo.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as archivo:
+            uptime = float(archivo.read().split()[0])
+        inicio_tics = int(campos[19])
+        return time.time() - uptime + inicio_tics / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return time.time()
+
+
+def _consultar_tablas() -> Dict[str, float]:
+    """Ejecuta la lectura mínima de cada tabla y retorna su latencia en ms"""
+    latencias = {}
+    for tabla, sql in _SQL_TABLAS.items():
+        with get_db_connection(database=LECTURA_POR_TABLA[tabla]) as conn:
+            with conn.cursor() as cursor:
+                inicio = time.perf_counter()
+                cursor.execute(sql)
+                cursor.fetchall()
+                latencias[tabla] = round((time.perf_counter() - inicio) * 1000, 3)
+    return latencias
+
+
+def _ping() -> float:
+    """
+    Latencia en ms de un SELECT 1 con una conexión del pool; con las tablas
+    en destinos distintos, la mayor de ellos.
+    """
+    latencia = 0.0
+    for database in set(LECTURA_POR_TABLA.values()):
+        inicio = time.perf_counter()
+        with get_db_connection(database=database) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+        latencia = max(latencia, round((time.perf_counter() - inicio) * 1000, 3))
+    return latencia
+
+
+class EstadoArranque:
+    """Progreso del precalentamiento y tiempos del arranque en frío"""
+
+    def __init__(self):
+        self.inicio_proceso = _inicio_proceso()
+        self.precalentado = False
+        self.listo_ms: Optional[float] = None
+        self.primer_byte_ms: Optional[float] = None
+        self.pasos: Dict[str, dict] = {}
+
+    def _desde_inicio_ms(self) -> float:
+        return round((time.time() - self.inicio_proceso) * 1000, 1)
+
+    async def _paso(self, nombre: str, funcion: Callable) -> None:
+        """Ejecuta un paso registrando su duración; un error no detiene el arranque"""
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion()
+            if inspect.isawaitable(resultado):
+                resultado = await resultado
+            self.pasos[nombre] = {"ok": True, "ms": round((time.perf_counter() - inicio) * 1000, 3)}
+            if resultado is not None:
+                self.pasos[nombre]["resultado"] = resultado
+        except Exception as exc:
+            self.pasos[nombre] = {
+                "ok": False,
+                "ms": round((time.perf_counter() - inicio) * 1000, 3),
+                "error": str(exc)
+            }
+            logger.warning("Precalentamiento '%s' falló: %s", nombre, exc)
+
+    async def precalentar(
+        self,
+        calentar_serializacion: Callable[[], None],
+        precargar_creditos: Callable[[List[int]], Awaitable[int]]
+    ) -> None:
+        """
+        Abre conexiones del pool, lee ambas tablas, inicializa los
+        serializadores y precarga los créditos de WARMUP_CREDITOS, con un
+        límite total de WARMUP_TIMEOUT segundos.
+        """
+        async def pasos():
+            await self._paso("conexiones", lambda: run_db(precalentar_pools, ArranqueConfig.CONEXIONES))
+            await self._paso("tablas", lambda: run_db(_consultar_tablas))
+            await self._paso("serializacion", calentar_serializacion)
+            if ArranqueConfig.CREDITOS:
+                await self._paso("creditos", lambda: precargar_creditos(ArranqueConfig.CREDITOS))
+
+        try:
+            await asyncio.wait_for(pasos(), ArranqueConfig.TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("El precalentamiento excedió WARMUP_TIMEOUT (%ss)", ArranqueConfig.TIMEOUT)
+        self.precalentado = True
+
+    def marcar_listo(self) -> None:
+        self.listo_ms = self._desde_inicio_ms()
+        logger.info("API lista %.0f ms después de iniciar el proceso (%s)", self.listo_ms, self.pasos)
+
+    def marcar_primer_byte(self) -> None:
+        if self.primer_byte_ms is None:
+            self.primer_byte_ms = self._desde_inicio_ms()
+            logger.info("Primera respuesta %.0f ms después de iniciar el proceso", self.primer_byte_ms)
+
+    def stats(self) -> dict:
+        return {
+            "precalentado": self.precalentado,
+            "listo_ms": self.listo_ms,
+            "primer_byte_ms": self.primer_byte_ms,
+            "pasos": self.pasos
+        }
+
+
+async def verificar_disponibilidad() -> dict:
+    """
+    Estado para /ready: la API está lista cuando terminó el precalentamiento
+    y la base de datos responde.
+    """
+    dependencias = {}
+    try:
+        dependencias["mysql"] = {"ok": True, "latencia_ms": await run_db(_ping)}
+    except Exception as exc:
+        dependencias["mysql"] = {"ok": False, "error": str(exc)}
+    return {
+        "ready": estado_arranque.precalentado and all(d["ok"] for d in dependencias.values()),
+        "dependencias": dependencias,
+        "arranque": estado_arranque.stats()
+    }
+
+
+class PrimerByteMiddleware:
+    """
+    Registra cuándo se envía la primera respuesta que no es una sonda
+    (/health, /ready). Después de la primera solo compara un atributo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            estado_arranque.primer_byte_ms is not None
+            or scope["type"] != "http"
+            or scope["path"].startswith(("/health", "/ready"))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado_arranque.marcar_primer_byte()
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
+
+
+# Estado compartido por la API
+estado_arranque = EstadoArranque()
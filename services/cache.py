@@ -0,0 +1,506 @@
+"""
+Caché de respuestas de Condonaciones
+Guarda el JSON serializado por (variante de endpoint, id_credito)
+"""
+
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
+import pymysql
+from dotenv import load_dotenv
+
+from config.database import CircuitoAbiertoError, ConsultaExcedidaError, PoolTimeoutError
+from utils.singleflight import SingleFlight
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class CacheConfig:
+    """Configuración de la caché de respuestas"""
+
+    ENABLED = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+    BACKEND = os.getenv("CACHE_BACKEND", "memoria")  # memoria | redis
+    TTL = int(os.getenv("CACHE_TTL", "60"))
+    MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    # Agrupa peticiones concurrentes idénticas aunque la caché esté desactivada
+    COALESCING = os.getenv("CACHE_COALESCING", "True").lower() == "true"
+
+
+# Variantes de endpoint (primera parte de la clave)
+VARIANTE_CONDONACIONES = "condonaciones"
+VARIANTE_SOLO_CONDONADOS = "solo-condonados"
+VARIANTE_PENDIENTES = "pendientes"
+VARIANTE_BATCH = "batch"
+VARIANTE_RESUMEN = "resumen"
+
+
+class CacheControlConfig:
+    """
+    Cabecera Cache-Control de las respuestas por crédito.
+
+    CACHE_CONTROL aplica a todas las variantes; CACHE_CONTROL_<VARIANTE>
+    (p. ej. CACHE_CONTROL_SOLO_CONDONADOS) la reemplaza para una variante.
+    Por defecto los proxies no guardan la respuesta (contiene datos del
+    cliente) y el navegador revalida con If-None-Match en cada uso.
+    """
+
+    POR_DEFECTO = os.getenv("CACHE_CONTROL", "private, no-cache")
+
+
+def cache_control(variante: str) -> str:
+    """Valor de Cache-Control para una variante de endpoint"""
+    return _CACHE_CONTROL.get(variante, CacheControlConfig.POR_DEFECTO)
+
+
+_CACHE_CONTROL = {
+    variante: os.getenv(f"CACHE_CONTROL_{variante.upper().replace('-', '_')}", CacheControlConfig.POR_DEFECTO)
+    for variante in (VARIANTE_CONDONACIONES, VARIANTE_SOLO_CONDONADOS, VARIANTE_PENDIENTES, VARIANTE_RESUMEN)
+}
+
+
+class StaleConfig:
+    """
+    Respuestas vencidas de las rutas por crédito (segundos después de CACHE_TTL).
+
+    Durante STALE_WHILE_REVALIDATE se responde con la copia vencida y se
+    actualiza en segundo plano; durante STALE_IF_ERROR se responde con ella
+    si la base de datos falla o el circuit breaker está abierto. Cada
+    variante admite su propio valor (p. ej. CACHE_STALE_IF_ERROR_RESUMEN).
+    """
+
+    WHILE_REVALIDATE = int(os.getenv("CACHE_STALE_WHILE_REVALIDATE", "0"))
+    IF_ERROR = int(os.getenv("CACHE_STALE_IF_ERROR", "3600"))
+
+
+def ventanas_stale(variante: str) -> Tuple[int, int]:
+    """(stale-while-revalidate, stale-if-error) en segundos de una variante"""
+    return _VENTANAS_STALE.get(variante, (0, 0))
+
+
+_VENTANAS_STALE = {
+    variante: (
+        int(os.getenv(f"CACHE_STALE_WHILE_REVALIDATE_{variante.upper().replace('-', '_')}", str(StaleConfig.WHILE_REVALIDATE))),
+        int(os.getenv(f"CACHE_STALE_IF_ERROR_{variante.upper().replace('-', '_')}", str(StaleConfig.IF_ERROR)))
+    )
+    for variante in (VARIANTE_CONDONACIONES, VARIANTE_SOLO_CONDONADOS, VARIANTE_PENDIENTES, VARIANTE_RESUMEN)
+}
+
+# Errores de la base de datos que permiten responder con una copia vencida
+_ERRORES_DB = (pymysql.Error, PoolTimeoutError, OSError, CircuitoAbiertoError, ConsultaExcedidaError)
+
+# Tamaño aproximado de la estructura de cada entrada en memoria
+_OVERHEAD_ENTRADA = 200
+
+# Fecha de creación antepuesta al valor en backends sin metadatos
+_FECHA = struct.Struct("!d")
+
+
+def clave_cache(variante: str, id_credito: int, sufijo: str = "") -> str:
+    """Construye la clave de caché de una respuesta"""
+    clave = f"{variante}:{id_credito}"
+    return f"{clave}:{sufijo}" if sufijo else clave
+
+
+class _Entrada:
+    __slots__ = ("valor", "id_credito", "expira", "tamano", "creada")
+
+    def __init__(self, valor: bytes, id_credito: int, expira: float, tamano: int, creada: float):
+        self.valor = valor
+        self.id_credito = id_credito
+        self.expira = expira
+        self.tamano = tamano
+        self.creada = creada
+
+
+class Vencida:
+    """Marca de una respuesta servida después de su TTL"""
+
+    __slots__ = ("edad", "motivo")
+
+    # Se sirve mientras se actualiza en segundo plano
+    REVALIDANDO = "revalidando"
+    # Se sirve porque la base de datos falló
+    ERROR = "error"
+
+    def __init__(self, edad: float, motivo: str):
+        self.edad = edad
+        self.motivo = motivo
+
+
+class CacheBackend:
+    """Interfaz de almacenamiento de la caché"""
+
+    async def get(self, clave: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, clave: str, id_credito: int, valor: bytes, ttl: int) -> None:
+        raise NotImplementedError
+
+    async def get_con_fecha(self, clave: str) -> Optional[Tuple[bytes, float]]:
+        """Valor guardado con set_con_fecha y su fecha de creación (epoch)"""
+        valor = await self.get(clave)
+        if valor is None:
+            return None
+        return valor[_FECHA.size:], _FECHA.unpack_from(valor)[0]
+
+    async def set_con_fecha(self, clave: str, id_credito: int, valor: bytes, ttl: int) -> None:
+        """Guarda el valor junto con la fecha actual"""
+        await self.set(clave, id_credito, _FECHA.pack(time.time()) + valor, ttl)
+
+    async def invalidar_credito(self, id_credito: int) -> int:
+        """Elimina todas las entradas de un crédito y retorna cuántas eran"""
+        raise NotImplementedError
+
+    async def limpiar(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Caché en memoria del proceso con TTL por entrada y desalojo LRU.
+
+    El tamaño está acotado tanto por número de entradas como por bytes.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[str, _Entrada]" = OrderedDict()
+        self._por_credito: Dict[int, Set[str]] = {}
+        self._bytes = 0
+        self.desalojos = 0
+        self.expiradas = 0
+
+    async def get(self, clave: str) -> Optional[bytes]:
+        with self._lock:
+            entrada = self._vigente(clave)
+            return entrada.valor if entrada is not None else None
+
+    async def get_con_fecha(self, clave: str) -> Optional[Tuple[bytes, float]]:
+        # La fecha ya está en la entrada: no se copia el valor
+        with self._lock:
+            entrada = self._vigente(clave)
+            return (entrada.valor, entrada.creada) if entrada is not None else None
+
+    async def set_con_fecha(self, clave: str, id_credito: int, valor: bytes, ttl: int) -> None:
+        await self.set(clave, id_credito, valor, ttl)
+
+    async def set(self, clave: str, id_credito: int, valor: bytes, ttl: int) -> None:
+        tamano = len(valor) + len(clave) + _OVERHEAD_ENTRADA
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._entradas:
+                self._quitar(clave)
+            self._entradas[clave] = _Entrada(valor, id_credito, time.monotonic() + ttl, tamano, time.time())
+            self._por_credito.setdefault(id_credito, set()).add(clave)
+            self._bytes += tamano
+            while len(self._entradas) > self.max_entries or self._bytes > self.max_bytes:
+                antigua = next(iter(self._entradas))
+                self._quitar(antigua)
+                self.desalojos += 1
+
+    async def invalidar_credito(self, id_credito: int) -> int:
+        with self._lock:
+            claves = list(self._por_credito.get(id_credito, ()))
+            for clave in claves:
+                self._quitar(clave)
+            return len(claves)
+
+    async def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+            self._por_credito.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memoria",
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "desalojos": self.desalojos,
+                "expiradas": self.expiradas
+            }
+
+    def _vigente(self, clave: str) -> Optional[_Entrada]:
+        """Entrada no expirada (se llama con el lock tomado)"""
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        if entrada.expira <= time.monotonic():
+            self._quitar(clave)
+            self.expiradas += 1
+            return None
+        self._entradas.move_to_end(clave)
+        return entrada
+
+    def _quitar(self, clave: str) -> None:
+        entrada = self._entradas.pop(clave)
+        self._bytes -= entrada.tamano
+        claves = self._por_credito.get(entrada.id_credito)
+        if claves is not None:
+            claves.discard(clave)
+            if not claves:
+                del self._por_credito[entrada.id_credito]
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Caché compartida entre instancias sobre Redis.
+
+    Recibe un cliente asíncrono compatible con `redis.asyncio.Redis`, por lo
+    que en pruebas puede sustituirse por un objeto local con los mismos métodos
+    (get, set, sadd, smembers, expire, delete). Redis aplica el TTL y su propia
+    política de desalojo.
+    """
+
+    def __init__(self, client, prefijo: str = "condonaciones:"):
+        self.client = client
+        self.prefijo = prefijo
+
+    def _indice(self, id_credito: int) -> str:
+        return f"{self.prefijo}credito:{id_credito}"
+
+    async def get(self, clave: str) -> Optional[bytes]:
+        return await self.client.get(self.prefijo + clave)
+
+    async def set(self, clave: str, id_credito: int, valor: bytes, ttl: int) -> None:
+        indice = self._indice(id_credito)
+        await self.client.set(self.prefijo + clave, valor, ex=ttl)
+        await self.client.sadd(indice, self.prefijo + clave)
+        await self.client.expire(indice, ttl)
+
+    async def invalidar_credito(self, id_credito: int) -> int:
+        indice = self._indice(id_credito)
+        claves = list(await self.client.smembers(indice))
+        if claves:
+            await self.client.delete(*claves)
+        await self.client.delete(indice)
+        return len(claves)
+
+    async def limpiar(self) -> None:
+        # Solo se eliminan claves con el prefijo de esta API
+        async for clave in self.client.scan_iter(match=self.prefijo + "*"):
+            await self.client.delete(clave)
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class ResponseCache:
+    """
+    Caché de respuestas con protección contra estampida.
+
+    Si varias peticiones concurrentes fallan la caché para la misma clave,
+    solo una ejecuta la carga contra la base de datos y las demás reciben
+    el mismo resultado. Con la caché desactivada y `coalescing` activo se
+    sigue agrupando: las peticiones que llegan mientras una carga idéntica
+    está en curso reciben su resultado, pero nada se guarda.
+
+    `obtener_o_vencida` además conserva cada respuesta después de su TTL
+    para servirla vencida mientras se actualiza o si la base de datos falla.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int, enabled: bool = True, coalescing: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self.coalescing = coalescing
+        self._singleflight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.derivadas_reusadas = 0
+        self.vencidas: Dict[str, int] = {Vencida.REVALIDANDO: 0, Vencida.ERROR: 0}
+        self.revalidaciones_fallidas = 0
+        self._revalidaciones: Set[asyncio.Task] = set()
+
+    async def obtener(
+        self,
+        variante: str,
+        id_credito: int,
+        cargar: Callable[[], Awaitable[bytes]],
+        sufijo: str = "",
+        ttl: Optional[int] = None
+    ) -> bytes:
+        """
+        Retorna la respuesta en caché o la carga y la guarda.
+
+        Args:
+            variante: Variante de endpoint
+            id_credito: ID del crédito
+            cargar: Función asíncrona que construye la respuesta serializada
+            sufijo: Parámetros adicionales que distinguen la respuesta
+            ttl: Segundos de vigencia de la entrada (por defecto CACHE_TTL)
+
+        Returns:
+            El cuerpo JSON de la respuesta
+        """
+        clave = clave_cache(variante, id_credito, sufijo)
+        if not self.enabled:
+            if self.coalescing:
+                return await self._singleflight.do(clave, cargar)
+            return await cargar()
+
+        valor = await self.backend.get(clave)
+        if valor is not None:
+            self.hits += 1
+            return valor
+
+        self.misses += 1
+
+        async def cargar_y_guardar() -> bytes:
+            contenido = await cargar()
+            await self.backend.set(clave, id_credito, contenido, ttl or self.ttl)
+            return contenido
+
+        return await self._singleflight.do(clave, cargar_y_guardar)
+
+    async def obtener_o_vencida(
+        self,
+        variante: str,
+        id_credito: int,
+        cargar: Callable[[], Awaitable[bytes]],
+        sufijo: str = "",
+        ttl: Optional[int] = None
+    ) -> Tuple[bytes, Optional[Vencida]]:
+        """
+        Como `obtener`, pero la entrada se conserva las ventanas de
+        `ventanas_stale(variante)` después de su TTL:
+
+        - dentro de stale-while-revalidate se retorna la copia vencida y se
+          carga una nueva en segundo plano;
+        - si la carga falla por la base de datos y la copia está dentro de
+          stale-if-error, se retorna la copia en lugar del error.
+
+        Returns:
+            (cuerpo JSON, Vencida o None si la respuesta está vigente)
+        """
+        revalidar, si_error = ventanas_stale(variante)
+        if not self.enabled or (revalidar <= 0 and si_error <= 0):
+            return await self.obtener(variante, id_credito, cargar, sufijo, ttl), None
+
+        clave = clave_cache(variante, id_credito, sufijo)
+        ttl = ttl or self.ttl
+        guardada = await self.backend.get_con_fecha(clave)
+        edad = 0.0
+        if guardada is not None:
+            edad = time.time() - guardada[1]
+            if edad < ttl:
+                self.hits += 1
+                return guardada[0], None
+
+        async def cargar_y_guardar() -> bytes:
+            contenido = await cargar()
+            await self.backend.set_con_fecha(clave, id_credito, contenido, ttl + max(revalidar, si_error))
+            return contenido
+
+        if guardada is not None and edad < ttl + revalidar:
+            self.vencidas[Vencida.REVALIDANDO] += 1
+            self._revalidar(clave, cargar_y_guardar)
+            return guardada[0], Vencida(edad, Vencida.REVALIDANDO)
+
+        self.misses += 1
+        try:
+            return await self._singleflight.do(clave, cargar_y_guardar), None
+        except _ERRORES_DB as error:
+            if guardada is None or edad >= ttl + si_error:
+                raise
+            self.vencidas[Vencida.ERROR] += 1
+            logger.warning("Respuesta vencida de %s (%d s) por error de base de datos: %s", clave, edad, error)
+            return guardada[0], Vencida(edad, Vencida.ERROR)
+
+    def _revalidar(self, clave: str, cargar_y_guardar: Callable[[], Awaitable[bytes]]) -> None:
+        """Actualiza una entrada en segundo plano (una sola carga por clave)"""
+        async def revalidar():
+            try:
+                await self._singleflight.do(clave, cargar_y_guardar)
+            except Exception as error:
+                self.revalidaciones_fallidas += 1
+                logger.warning("No se pudo actualizar %s en segundo plano: %s", clave, error)
+
+        tarea = asyncio.ensure_future(revalidar())
+        # Referencia hasta que termine para que no la recolecte el GC
+        self._revalidaciones.add(tarea)
+        tarea.add_done_callback(self._revalidaciones.discard)
+
+    async def obtener_derivado(
+        self,
+        variante: str,
+        id_credito: int,
+        sufijo: str,
+        generar: Callable[[], Awaitable[bytes]]
+    ) -> bytes:
+        """
+        Retorna una versión derivada de una respuesta (p. ej. comprimida) o la
+        genera y la guarda. El sufijo debe identificar el contenido de origen
+        (su ETag) para que nunca se sirva una derivada de otra versión.
+        """
+        if not self.enabled:
+            return await generar()
+
+        clave = clave_cache(variante, id_credito, sufijo)
+        valor = await self.backend.get(clave)
+        if valor is not None:
+            self.derivadas_reusadas += 1
+            return valor
+
+        async def generar_y_guardar() -> bytes:
+            contenido = await generar()
+            await self.backend.set(clave, id_credito, contenido, self.ttl)
+            return contenido
+
+        return await self._singleflight.do(clave, generar_y_guardar)
+
+    async def invalidar(self, id_credito: int) -> int:
+        """Elimina todas las respuestas en caché de un crédito"""
+        return await self.backend.invalidar_credito(id_credito)
+
+    def stats(self) -> dict:
+        """Contadores de aciertos, fallos, desalojos y respuestas vencidas"""
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "coalescing": self.coalescing,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "cargas_compartidas": self._singleflight.compartidas,
+            "derivadas_reusadas": self.derivadas_reusadas,
+            "vencidas": dict(self.vencidas),
+            "revalidaciones_fallidas": self.revalidaciones_fallidas,
+            **self.backend.stats()
+        }
+
+
+def crear_backend() -> CacheBackend:
+    """Crea el backend configurado en CACHE_BACKEND"""
+    if CacheConfig.BACKEND == "redis":
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError(
+                "CACHE_BACKEND=redis requiere el paquete 'redis' (pip install redis)"
+            ) from exc
+        return RedisCacheBackend(redis_asyncio.from_url(CacheConfig.REDIS_URL))
+    return MemoryCacheBackend(CacheConfig.MAX_ENTRIES, CacheConfig.MAX_BYTES)
+
+
+# Instancia compartida por la API
+response_cache = ResponseCache(crear_backend(), CacheConfig.TTL, CacheConfig.ENABLED, CacheConfig.COALESCING)
@@ -0,0 +1,795 @@
+"""
+Servicio de acceso a datos de Condonaciones
+Consultas a tbl_segundometro_semana y gastos_cobranza
+
+Todas las consultas se construyen a partir de un FiltroGastos. El texto SQL
+depende solo de la "forma" del filtro (qué criterios están presentes, orden,
+paginación), por lo que se genera una sola vez por forma y se reutiliza; los
+valores siempre viajan como parámetros.
+"""
+
+import base64
+import json
+import logging
+import os
+from dataclasses import dataclass
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import pymysql
+from dotenv import load_dotenv
+
+from config.database import (
+    circuito,
+    con_limite_ejecucion,
+    elegir_pool,
+    get_db_connection,
+    misma_ubicacion,
+    registrar_lectura
+)
+from utils.metricas import medir, registrar_error_db, registrar_filas
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class BatchConfig:
+    """Límites de la consulta por lotes"""
+
+    MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "1000"))
+    CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "500"))
+
+
+class SnapshotConfig:
+    """Snapshots semanales de tbl_segundometro_semana"""
+
+    # Columna que identifica la semana del snapshot; el más reciente es el de mayor valor
+    COLUMNA_SEMANA = os.getenv("SEGUNDOMETRO_COLUMNA_SEMANA", "semana")
+
+    if not COLUMNA_SEMANA.replace("_", "").isalnum():
+        raise ValueError(f"SEGUNDOMETRO_COLUMNA_SEMANA no es un nombre de columna válido: {COLUMNA_SEMANA}")
+
+    # Índice en memoria de los datos generales de la última semana
+    INDICE_ENABLED = os.getenv("SNAPSHOT_INDICE_ENABLED", "False").lower() == "true"
+    # Segundos entre revisiones de si hay una semana nueva
+    INDICE_INTERVALO = float(os.getenv("SNAPSHOT_INDICE_INTERVALO", "300"))
+    # Columna opcional con la fecha de carga de cada fila; su máximo en la
+    # semana vigente detecta correcciones que no cambian el número de filas
+    COLUMNA_CARGA = os.getenv("SEGUNDOMETRO_COLUMNA_CARGA", "")
+
+    if COLUMNA_CARGA and not COLUMNA_CARGA.replace("_", "").isalnum():
+        raise ValueError(f"SEGUNDOMETRO_COLUMNA_CARGA no es un nombre de columna válido: {COLUMNA_CARGA}")
+
+
+class PaginacionConfig:
+    """Límites de la paginación del detalle de gastos"""
+
+    MAX_LIMIT = int(os.getenv("PAGINACION_MAX_LIMIT", "1000"))
+    # Clave primaria de gastos_cobranza: último desempate del cursor, porque
+    # (periodo_inicio, parcialidad) se repite entre gastos de un crédito
+    COLUMNA_ID = os.getenv("GASTOS_COLUMNA_ID", "id")
+
+    if not COLUMNA_ID.replace("_", "").isalnum():
+        raise ValueError(f"GASTOS_COLUMNA_ID no es un nombre de columna válido: {COLUMNA_ID}")
+
+
+class ExportConfig:
+    """Configuración de la exportación masiva"""
+
+    FETCH_SIZE = int(os.getenv("EXPORT_FETCH_SIZE", "1000"))
+    # Límite de ejecución de la consulta (ms; 0 = sin límite). En MySQL incluye
+    # el tiempo que el cliente tarda en leer las filas del cursor sin buffer.
+    MAX_EXECUTION_TIME = int(os.getenv("EXPORT_MAX_EXECUTION_TIME", "0"))
+
+
+# Base de datos con tbl_segundometro_semana y gastos_cobranza
+DATABASE_CONDONACIONES = "db-mega-reporte"
+
+# Bases lógicas de lectura de cada tabla; DB_REPLICAS_SEGUNDOMETRO y
+# DB_REPLICAS_GASTOS las reparten entre réplicas, servidores o esquemas
+LECTURA_SEGUNDOMETRO = registrar_lectura("segundometro", DATABASE_CONDONACIONES)
+LECTURA_GASTOS = registrar_lectura("gastos", DATABASE_CONDONACIONES)
+LECTURA_POR_TABLA = {
+    "tbl_segundometro_semana": LECTURA_SEGUNDOMETRO,
+    "gastos_cobranza": LECTURA_GASTOS
+}
+
+# Con ambas tablas en los mismos destinos, datos generales y gastos se
+# resuelven en una sola sentencia (JOIN); si no, en una consulta por tabla
+TABLAS_JUNTAS = misma_ubicacion(LECTURA_SEGUNDOMETRO, LECTURA_GASTOS)
+
+# Condición sobre la columna condonado de gastos_cobranza (alias g) por estado
+CONDICIONES_ESTADO = {
+    "condonados": "g.condonado = 1",
+    "pendientes": "(g.condonado IS NULL OR g.condonado = 0)",
+    "todos": "1 = 1",
+}
+
+# Columnas de DatosGenerales: (alias, expresión en tbl_segundometro_semana)
+COLUMNAS_DATOS_GENERALES = (
+    ("id_credito", "Id_credito"),
+    ("nombre_cliente", "Nombre_cliente"),
+    ("id_cliente", "Id_cliente"),
+    ("domicilio_completo", "Domicilio_Completo"),
+    ("bucket_morosidad", "Bucket_Morosidad_Real"),
+    ("dias_mora", "Dias_mora"),
+    ("saldo_vencido", "saldo_vencido_inicio"),
+)
+
+# Columnas de DetalleCondonacion: (alias, expresión en gastos_cobranza g)
+COLUMNAS_DETALLE = (
+    ("periodoinicio", "g.periodo_inicio"),
+    ("periodofin", "g.periodo_fin"),
+    ("semana", "g.SEMANA"),
+    ("parcialidad", "g.parcialidad"),
+    ("monto_valor", "g.monto_valor"),
+    ("cuota", "g.cuota"),
+    ("condonado", "g.condonado"),
+    ("fecha_condonacion", "g.fecha_condonacion"),
+)
+
+CAMPOS_DATOS_GENERALES = tuple(alias for alias, _ in COLUMNAS_DATOS_GENERALES)
+CAMPOS_DETALLE = tuple(alias for alias, _ in COLUMNAS_DETALLE)
+
+# Clave única de cada gasto; se lee y se ordena por ella solo al paginar, y
+# no forma parte del detalle
+COLUMNA_ID_GASTO = ("id_gasto", f"g.{PaginacionConfig.COLUMNA_ID}")
+
+# Columnas que forman la clave del cursor de paginación
+CAMPOS_CURSOR = ("periodoinicio", "parcialidad", "id_gasto")
+
+# parcialidad admite NULL: en el orden y en el cursor cuenta como cadena vacía
+# para que esas filas no queden fuera de la comparación del cursor
+ORDEN_PARCIALIDAD = "COALESCE(g.parcialidad, '')"
+
+
+@dataclass(frozen=True)
+class FiltroGastos:
+    """
+    Criterios de consulta sobre gastos_cobranza.
+
+    El orden y la paginación por cursor (keyset) usan periodo_inicio con
+    parcialidad y la clave primaria del gasto como desempates. `despues_de`
+    es la clave (periodo_inicio, parcialidad, id_gasto) de la última fila de
+    la página anterior.
+    `campos` limita las columnas del detalle que se leen (None = todas).
+    """
+
+    estado: str = "condonados"
+    fecha_condonacion_desde: Optional[date] = None
+    fecha_condonacion_hasta: Optional[date] = None
+    semana: Optional[str] = None
+    parcialidad: Optional[str] = None
+    orden: str = "asc"
+    limite: Optional[int] = None
+    despues_de: Optional[Tuple[date, Optional[str], int]] = None
+    campos: Optional[Tuple[str, ...]] = None
+
+    def forma(self) -> tuple:
+        """Criterios presentes; determina el texto SQL de la consulta"""
+        return (
+            self.estado,
+            self.fecha_condonacion_desde is not None,
+            self.fecha_condonacion_hasta is not None,
+            self.semana is not None,
+            self.parcialidad is not None,
+            self.orden,
+            self.despues_de is not None,
+            self.limite is not None,
+            self.campos,
+        )
+
+    def parametros(self) -> list:
+        """Valores de los criterios, en el orden de los marcadores de la consulta"""
+        parametros = []
+        if self.fecha_condonacion_desde is not None:
+            parametros.append(self.fecha_condonacion_desde)
+        if self.fecha_condonacion_hasta is not None:
+            # `hasta` es inclusivo
+            parametros.append(self.fecha_condonacion_hasta + timedelta(days=1))
+        if self.semana is not None:
+            parametros.append(self.semana)
+        if self.parcialidad is not None:
+            parametros.append(self.parcialidad)
+        if self.despues_de is not None:
+            periodo_inicio, parcialidad, id_gasto = self.despues_de
+            parcialidad = "" if parcialidad is None else parcialidad
+            parametros.extend((periodo_inicio, periodo_inicio, parcialidad, parcialidad, id_gasto))
+        return parametros
+
+    def clave_cache(self) -> str:
+        """Distingue en la caché respuestas del mismo crédito con distintos criterios"""
+        partes = [
+            f"{nombre}={valor}"
+            for nombre, valor in (
+                ("fd", self.fecha_condonacion_desde),
+                ("fh", self.fecha_condonacion_hasta),
+                ("s", self.semana),
+                ("p", self.parcialidad),
+                ("l", self.limite),
+                ("c", "|".join(map(str, self.despues_de)) if self.despues_de else None),
+                ("f", ",".join(self.campos) if self.campos is not None else None),
+            )
+            if valor is not None
+        ]
+        if self.orden != "asc":
+            partes.append(f"o={self.orden}")
+        return "&".join(partes)
+
+
+@lru_cache(maxsize=None)
+def _condiciones(forma: tuple) -> str:
+    """Condiciones sobre gastos_cobranza g para una forma de filtro"""
+    estado, desde, hasta, semana, parcialidad, orden, cursor = forma[:7]
+    if estado not in CONDICIONES_ESTADO:
+        raise ValueError(f"Estado de condonación no válido: {estado}")
+
+    condiciones = [CONDICIONES_ESTADO[estado]]
+    if desde:
+        condiciones.append("g.fecha_condonacion >= %s")
+    if hasta:
+        condiciones.append("g.fecha_condonacion < %s")
+    if semana:
+        condiciones.append("g.SEMANA = %s")
+    if parcialidad:
+        condiciones.append("g.parcialidad = %s")
+    if cursor:
+        comparador = ">" if orden == "asc" else "<"
+        condiciones.append(
+            f"(g.periodo_inicio {comparador} %s"
+            f" OR (g.periodo_inicio = %s AND ({ORDEN_PARCIALIDAD} {comparador} %s"
+            f" OR ({ORDEN_PARCIALIDAD} = %s AND {COLUMNA_ID_GASTO[1]} {comparador} %s))))"
+        )
+    return "\n       AND ".join(condiciones)
+
+
+def _orden(forma: tuple) -> str:
+    """Orden del detalle; al paginar termina en la clave del cursor"""
+    orden, cursor, paginado = forma[5], forma[6], forma[7]
+    if orden not in ("asc", "desc"):
+        raise ValueError(f"Orden no válido: {orden}")
+    direccion = orden.upper()
+    if not (cursor or paginado):
+        return f"g.periodo_inicio {direccion}, g.parcialidad {direccion}"
+    return f"g.periodo_inicio {direccion}, {ORDEN_PARCIALIDAD} {direccion}, {COLUMNA_ID_GASTO[1]} {direccion}"
+
+
+def _columnas_detalle(forma: tuple) -> tuple:
+    """Columnas del detalle a leer: las pedidas más la clave del cursor al paginar"""
+    campos, paginado = forma[8], forma[7]
+    columnas = COLUMNAS_DETALLE
+    if campos is not None:
+        requeridos = set(campos) | (set(CAMPOS_CURSOR) if paginado else set())
+        columnas = tuple((alias, expresion) for alias, expresion in COLUMNAS_DETALLE if alias in requeridos)
+    return columnas + (COLUMNA_ID_GASTO,) if paginado else columnas
+
+
+def _select(columnas) -> str:
+    return ",\n        ".join(f"{expresion} as {alias}" for alias, expresion in columnas)
+
+
+@lru_cache(maxsize=None)
+def _sql_condonacion(forma: tuple) -> str:
+    """Datos generales + detalle de un crédito en una sola sentencia"""
+    limite = "\n    LIMIT %s" if forma[7] else ""
+    return f"""
+    SELECT
+        {", ".join(f"dg.{alias}" for alias in CAMPOS_DATOS_GENERALES)},
+        g.Id_credito IS NOT NULL as tiene_gasto,
+        {_select(_columnas_detalle(forma))}
+    FROM (
+        SELECT
+            {_select(COLUMNAS_DATOS_GENERALES)}
+        FROM tbl_segundometro_semana
+        WHERE Id_credito = %s
+        ORDER BY {SnapshotConfig.COLUMNA_SEMANA} DESC
+        LIMIT 1
+    ) dg
+    LEFT JOIN gastos_cobranza g
+        ON g.Id_credito = dg.id_credito
+       AND {_condiciones(forma)}
+    ORDER BY {_orden(forma)}{limite}
+"""
+
+
+@lru_cache(maxsize=None)
+def _sql_gastos(forma: tuple) -> str:
+    """Detalle de un crédito cuyos datos generales ya se conocen"""
+    limite = "\n    LIMIT %s" if forma[7] else ""
+    return f"""
+    SELECT
+        {_select(_columnas_detalle(forma))}
+    FROM gastos_cobranza g
+    WHERE g.Id_credito = %s
+      AND {_condiciones(forma)}
+    ORDER BY {_orden(forma)}{limite}
+"""
+
+
+@lru_cache(maxsize=None)
+def _sql_datos_generales_lote(cantidad: int) -> str:
+    # Último snapshot de cada crédito; con el índice (Id_credito, semana)
+    # el MAX se resuelve sin recorrer las semanas anteriores
+    semana = SnapshotConfig.COLUMNA_SEMANA
+    return f"""
+    SELECT
+        {_select(COLUMNAS_DATOS_GENERALES)}
+    FROM tbl_segundometro_semana
+    JOIN (
+        SELECT Id_credito as ultimo_credito, MAX({semana}) as ultima_semana
+        FROM tbl_segundometro_semana
+        WHERE Id_credito IN ({", ".join(["%s"] * cantidad)})
+        GROUP BY Id_credito
+    ) ultimo
+        ON Id_credito = ultimo.ultimo_credito
+       AND {semana} = ultimo.ultima_semana
+"""
+
+
+@lru_cache(maxsize=None)
+def _sql_gastos_lote(forma: tuple, cantidad: int) -> str:
+    return f"""
+    SELECT
+        g.Id_credito as id_credito,
+        {_select(COLUMNAS_DETALLE)}
+    FROM gastos_cobranza g
+    WHERE g.Id_credito IN ({", ".join(["%s"] * cantidad)})
+      AND {_condiciones(forma)}
+    ORDER BY g.Id_credito, {_orden(forma)}
+"""
+
+
+@lru_cache(maxsize=None)
+def _sql_exportacion(forma: tuple, columna_fecha: str) -> str:
+    # Sin ORDER BY para que MySQL empiece a enviar filas sin ordenar el rango
+    return f"""
+    SELECT
+        g.Id_credito as id_credito,
+        {_select(COLUMNAS_DETALLE)}
+    FROM gastos_cobranza g
+    WHERE g.{columna_fecha} >= %s
+      AND g.{columna_fecha} < %s
+      AND {_condiciones(forma)}
+"""
+
+
+def _consultar(cursor, etapa: str, sql: str, parametros) -> List[dict]:
+    """Ejecuta una consulta y registra su duración y filas como etapa de la petición"""
+    with medir(etapa):
+        cursor.execute(con_limite_ejecucion(sql), parametros)
+        rows = cursor.fetchall()
+    registrar_filas(etapa, len(rows))
+    return rows
+
+
+def codificar_cursor(row: dict) -> str:
+    """Cursor opaco con la clave (periodo_inicio, parcialidad, id_gasto) de una fila"""
+    periodo_inicio = row["periodoinicio"]
+    clave = [
+        periodo_inicio.isoformat() if isinstance(periodo_inicio, date) else periodo_inicio,
+        row["parcialidad"],
+        row["id_gasto"],
+    ]
+    return base64.urlsafe_b64encode(json.dumps(clave).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[date, Optional[str], int]:
+    """
+    Recupera la clave (periodo_inicio, parcialidad, id_gasto) de un cursor.
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        periodo_inicio, parcialidad, id_gasto = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if periodo_inicio is not None:
+            periodo_inicio = (
+                date.fromisoformat(periodo_inicio) if len(periodo_inicio) == 10
+                else datetime.fromisoformat(periodo_inicio)
+            )
+        return periodo_inicio, parcialidad, id_gasto
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Cursor de paginación inválido") from exc
+
+
+def obtener_condonacion(
+    id_credito: int,
+    filtro: FiltroGastos,
+    datos_generales: Optional[dict] = None
+) -> Tuple[Optional[dict], List[dict]]:
+    """
+    Obtiene los datos generales y los gastos de cobranza de un crédito en
+    una sola consulta.
+
+    Al ser una sola sentencia, ambos resultados provienen del mismo snapshot
+    de la base de datos y se resuelven en un único viaje de red. Si los datos
+    generales ya se conocen (índice en memoria) solo se consultan los gastos;
+    si las tablas se leen de destinos distintos se consulta cada una aparte.
+    Función bloqueante: se ejecuta en un hilo mediante run_db.
+
+    Args:
+        id_credito: ID del crédito a consultar
+        filtro: Criterios sobre los gastos de cobranza
+        datos_generales: Datos generales ya resueltos (opcional)
+
+    Returns:
+        Tupla (datos generales, filas de detalle). Los datos generales son
+        None si el crédito no existe en tbl_segundometro_semana.
+    """
+    forma = filtro.forma()
+    parametros = [id_credito, *filtro.parametros()]
+    if filtro.limite is not None:
+        parametros.append(filtro.limite)
+
+    if datos_generales is None and not TABLAS_JUNTAS:
+        with get_db_connection(database=LECTURA_SEGUNDOMETRO) as conn:
+            with conn.cursor() as cursor:
+                datos_generales = _datos_generales_bloque(cursor, [id_credito], None).get(id_credito)
+        if datos_generales is None:
+            return None, []
+
+    if datos_generales is not None:
+        with get_db_connection(database=LECTURA_GASTOS) as conn:
+            with conn.cursor() as cursor:
+                return datos_generales, list(_consultar(cursor, "consulta_gastos", _sql_gastos(forma), parametros))
+
+    with get_db_connection(database=LECTURA_GASTOS) as conn:
+        with conn.cursor() as cursor:
+            # Una sola sentencia: datos generales y gastos
+            rows = _consultar(cursor, "consulta_condonacion", _sql_condonacion(forma), parametros)
+
+    if not rows:
+        return None, []
+
+    campos_detalle = [alias for alias, _ in _columnas_detalle(forma)]
+    datos_generales = {campo: rows[0][campo] for campo in CAMPOS_DATOS_GENERALES}
+    detalles = [
+        {campo: row[campo] for campo in campos_detalle}
+        for row in rows
+        if row["tiene_gasto"]
+    ]
+    return datos_generales, detalles
+
+
+@contextmanager
+def _cursores():
+    """
+    Cursores (tbl_segundometro_semana, gastos_cobranza) de las consultas por
+    lotes: uno solo si ambas tablas están en los mismos destinos.
+    """
+    with get_db_connection(database=LECTURA_GASTOS) as conn:
+        with conn.cursor() as cursor_gastos:
+            if TABLAS_JUNTAS:
+                yield cursor_gastos, cursor_gastos
+                return
+            with get_db_connection(database=LECTURA_SEGUNDOMETRO) as conn_segundometro:
+                with conn_segundometro.cursor() as cursor_segundometro:
+                    yield cursor_segundometro, cursor_gastos
+
+
+def _datos_generales_bloque(
+    cursor,
+    bloque: List[int],
+    conocidos: Optional[Dict[int, dict]]
+) -> Dict[int, dict]:
+    """Datos generales de un bloque de créditos, consultando solo los no conocidos"""
+    conocidos = conocidos or {}
+    encontrados = {id_credito: conocidos[id_credito] for id_credito in bloque if id_credito in conocidos}
+    faltantes = [id_credito for id_credito in bloque if id_credito not in encontrados]
+    if faltantes:
+        for row in _consultar(cursor, "consulta_datos_generales", _sql_datos_generales_lote(len(faltantes)), faltantes):
+            # Una fila por crédito aunque la semana tenga filas repetidas
+            encontrados.setdefault(row["id_credito"], row)
+    return encontrados
+
+
+def obtener_condonaciones_lote(
+    ids_credito: List[int],
+    filtro: FiltroGastos,
+    chunk_size: Optional[int] = None,
+    datos_generales: Optional[Dict[int, dict]] = None
+) -> Dict[int, Tuple[dict, List[dict]]]:
+    """
+    Obtiene datos generales y gastos de cobranza de varios créditos con
+    consultas por conjunto (`WHERE Id_credito IN (...)`).
+
+    Los IDs se procesan en bloques de `chunk_size`, con dos consultas por
+    bloque sobre una misma conexión (una por tabla si se leen de destinos
+    distintos). La paginación del filtro no aplica.
+    Función bloqueante: se ejecuta en un hilo mediante run_db.
+
+    Args:
+        ids_credito: IDs de crédito (sin duplicados)
+        filtro: Criterios sobre los gastos de cobranza
+        chunk_size: Tamaño de bloque (por defecto BATCH_CHUNK_SIZE)
+        datos_generales: Datos generales ya resueltos por crédito (opcional);
+            solo se consultan los de los créditos que falten
+
+    Returns:
+        Diccionario id_credito -> (datos generales, filas de detalle). Los
+        créditos que no existen en tbl_segundometro_semana no se incluyen.
+    """
+    chunk_size = chunk_size or BatchConfig.CHUNK_SIZE
+    filtro_lote = FiltroGastos(
+        estado=filtro.estado,
+        fecha_condonacion_desde=filtro.fecha_condonacion_desde,
+        fecha_condonacion_hasta=filtro.fecha_condonacion_hasta,
+        semana=filtro.semana,
+        parcialidad=filtro.parcialidad,
+        orden=filtro.orden
+    )
+    forma = filtro_lote.forma()
+    parametros_filtro = filtro_lote.parametros()
+    resultados: Dict[int, Tuple[dict, List[dict]]] = {}
+
+    with _cursores() as (cursor_segundometro, cursor_gastos):
+        for inicio in range(0, len(ids_credito), chunk_size):
+            bloque = ids_credito[inicio:inicio + chunk_size]
+
+            for id_credito, row in _datos_generales_bloque(cursor_segundometro, bloque, datos_generales).items():
+                resultados[id_credito] = (row, [])
+
+            filas = _consultar(
+                cursor_gastos, "consulta_gastos", _sql_gastos_lote(forma, len(bloque)), [*bloque, *parametros_filtro]
+            )
+            # Agrupación por crédito en una sola pasada
+            for row in filas:
+                credito = resultados.get(row.pop("id_credito"))
+                if credito is not None:
+                    credito[1].append(row)
+
+    return resultados
+
+
+# Agregados de gastos_cobranza por crédito, separados en condonados y pendientes
+_SELECT_RESUMEN = """
+        COALESCE(g.condonado, 0) = 1 as es_condonado,
+        COUNT(*) as cantidad,
+        SUM(g.monto_valor) as monto_valor,
+        SUM(g.cuota) as cuota,
+        MIN(g.fecha_condonacion) as primera_fecha_condonacion,
+        MAX(g.fecha_condonacion) as ultima_fecha_condonacion"""
+
+_SQL_RESUMEN = f"""
+    SELECT
+        {", ".join(f"dg.{alias}" for alias in CAMPOS_DATOS_GENERALES)},
+        r.es_condonado,
+        r.cantidad,
+        r.monto_valor,
+        r.cuota,
+        r.primera_fecha_condonacion,
+        r.ultima_fecha_condonacion
+    FROM (
+        SELECT
+            {_select(COLUMNAS_DATOS_GENERALES)}
+        FROM tbl_segundometro_semana
+        WHERE Id_credito = %s
+        ORDER BY {SnapshotConfig.COLUMNA_SEMANA} DESC
+        LIMIT 1
+    ) dg
+    LEFT JOIN (
+        SELECT{_SELECT_RESUMEN}
+        FROM gastos_cobranza g
+        WHERE g.Id_credito = %s
+        GROUP BY es_condonado
+    ) r ON 1 = 1
+"""
+
+
+@lru_cache(maxsize=None)
+def _sql_resumen_lote(cantidad: int) -> str:
+    return f"""
+    SELECT
+        g.Id_credito as id_credito,{_SELECT_RESUMEN}
+    FROM gastos_cobranza g
+    WHERE g.Id_credito IN ({", ".join(["%s"] * cantidad)})
+    GROUP BY g.Id_credito, es_condonado
+"""
+
+
+def _resumen(grupos: List[dict]) -> dict:
+    """Combina las filas agregadas (una por estado) de un crédito"""
+    resumen = {
+        "condonados": {"cantidad": 0, "monto_valor": 0, "cuota": 0},
+        "pendientes": {"cantidad": 0, "monto_valor": 0, "cuota": 0},
+        "primera_fecha_condonacion": None,
+        "ultima_fecha_condonacion": None,
+    }
+    for grupo in grupos:
+        totales = resumen["condonados" if grupo["es_condonado"] else "pendientes"]
+        totales["cantidad"] = grupo["cantidad"]
+        totales["monto_valor"] = grupo["monto_valor"] or 0
+        totales["cuota"] = grupo["cuota"] or 0
+        primera, ultima = grupo["primera_fecha_condonacion"], grupo["ultima_fecha_condonacion"]
+        if primera is not None and (resumen["primera_fecha_condonacion"] is None or primera < resumen["primera_fecha_condonacion"]):
+            resumen["primera_fecha_condonacion"] = primera
+        if ultima is not None and (resumen["ultima_fecha_condonacion"] is None or ultima > resumen["ultima_fecha_condonacion"]):
+            resumen["ultima_fecha_condonacion"] = ultima
+    return resumen
+
+
+def obtener_resumen(
+    id_credito: int,
+    datos_generales: Optional[dict] = None
+) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Obtiene los datos generales y los totales de gastos de cobranza de un
+    crédito, agregados en MySQL (a lo más dos filas: condonados y pendientes).
+    Función bloqueante: se ejecuta en un hilo mediante run_db.
+
+    Args:
+        id_credito: ID del crédito a consultar
+        datos_generales: Datos generales ya resueltos (opcional)
+
+    Returns:
+        Tupla (datos generales, resumen). Ambos son None si el crédito no
+        existe en tbl_segundometro_semana.
+    """
+    if datos_generales is None and not TABLAS_JUNTAS:
+        with get_db_connection(database=LECTURA_SEGUNDOMETRO) as conn:
+            with conn.cursor() as cursor:
+                datos_generales = _datos_generales_bloque(cursor, [id_credito], None).get(id_credito)
+        if datos_generales is None:
+            return None, None
+
+    if datos_generales is not None:
+        with get_db_connection(database=LECTURA_GASTOS) as conn:
+            with conn.cursor() as cursor:
+                return datos_generales, _resumen(
+                    _consultar(cursor, "consulta_resumen", _sql_resumen_lote(1), (id_credito,))
+                )
+
+    with get_db_connection(database=LECTURA_GASTOS) as conn:
+        with conn.cursor() as cursor:
+            rows = _consultar(cursor, "consulta_resumen", _SQL_RESUMEN, (id_credito, id_credito))
+
+    if not rows:
+        return None, None
+
+    datos_generales = {campo: rows[0][campo] for campo in CAMPOS_DATOS_GENERALES}
+    return datos_generales, _resumen([row for row in rows if row["cantidad"] is not None])
+
+
+def obtener_resumenes_lote(
+    ids_credito: List[int],
+    chunk_size: Optional[int] = None,
+    datos_generales: Optional[Dict[int, dict]] = None
+) -> Dict[int, Tuple[dict, dict]]:
+    """
+    Obtiene datos generales y totales de gastos de varios créditos con
+    consultas por conjunto, en bloques de `chunk_size`.
+    Función bloqueante: se ejecuta en un hilo mediante run_db.
+
+    Args:
+        ids_credito: IDs de crédito (sin duplicados)
+        chunk_size: Tamaño de bloque (por defecto BATCH_CHUNK_SIZE)
+        datos_generales: Datos generales ya resueltos por crédito (opcional)
+
+    Returns:
+        Diccionario id_credito -> (datos generales, resumen). Los créditos
+        que no existen en tbl_segundometro_semana no se incluyen.
+    """
+    chunk_size = chunk_size or BatchConfig.CHUNK_SIZE
+    encontrados: Dict[int, dict] = {}
+    grupos: Dict[int, List[dict]] = {}
+
+    with _cursores() as (cursor_segundometro, cursor_gastos):
+        for inicio in range(0, len(ids_credito), chunk_size):
+            bloque = ids_credito[inicio:inicio + chunk_size]
+
+            encontrados.update(_datos_generales_bloque(cursor_segundometro, bloque, datos_generales))
+
+            for row in _consultar(cursor_gastos, "consulta_resumen", _sql_resumen_lote(len(bloque)), bloque):
+                grupos.setdefault(row["id_credito"], []).append(row)
+
+    return {
+        id_credito: (row, _resumen(grupos.get(id_credito, [])))
+        for id_credito, row in encontrados.items()
+    }
+
+
+# Columnas de fecha por las que se puede acotar la exportación
+COLUMNAS_FECHA_EXPORTACION = ("fecha_condonacion", "periodo_inicio")
+
+
+class ExportacionGastos:
+    """
+    Lectura en streaming de gastos_cobranza para un rango de fechas.
+
+    Usa un cursor del lado del servidor (sin buffer), de modo que las filas se
+    leen de MySQL por bloques a medida que se envían al cliente y la memoria
+    no crece con el tamaño del resultado.
+
+    Todos los métodos son bloqueantes: se ejecutan en un hilo mediante run_db.
+    """
+
+    def __init__(
+        self,
+        desde: date,
+        hasta: date,
+        filtro: FiltroGastos,
+        columna_fecha: str = "fecha_condonacion",
+        fetch_size: Optional[int] = None
+    ):
+        if columna_fecha not in COLUMNAS_FECHA_EXPORTACION:
+            raise ValueError(f"Columna de fecha no permitida: {columna_fecha}")
+        self.desde = desde
+        self.hasta = hasta
+        self.filtro = filtro
+        self.columna_fecha = columna_fecha
+        self.fetch_size = fetch_size or ExportConfig.FETCH_SIZE
+        self.filas_leidas = 0
+        self._pool = elegir_pool(LECTURA_GASTOS)
+        self._conn = None
+        self._cursor = None
+        self._terminada = False
+
+    def abrir(self) -> None:
+        """Toma una conexión del pool y lanza la consulta"""
+        query = _sql_exportacion(self.filtro.forma(), self.columna_fecha)
+        # `hasta` es inclusivo
+        parametros = [self.desde, self.hasta + timedelta(days=1), *self.filtro.parametros()]
+
+        circuito.permitir()
+        try:
+            self._conn = self._pool.acquire()
+        except Exception as error:
+            circuito.registrar(error)
+            raise
+        try:
+            self._cursor = self._conn.cursor(pymysql.cursors.SSDictCursor)
+            with medir("consulta_exportacion"):
+                self._cursor.execute(con_limite_ejecucion(query, ExportConfig.MAX_EXECUTION_TIME), parametros)
+        except Exception as error:
+            if isinstance(error, pymysql.Error):
+                registrar_error_db(error)
+            circuito.registrar(error)
+            self._pool.release(self._conn, discard=True)
+            self._conn = None
+            raise
+        circuito.registrar()
+
+    def siguiente_bloque(self) -> List[dict]:
+        """Lee el siguiente bloque de filas; lista vacía al terminar"""
+        filas = self._cursor.fetchmany(self.fetch_size)
+        if not filas:
+            self._terminada = True
+        self.filas_leidas += len(filas)
+        return filas
+
+    def cerrar(self) -> None:
+        """
+        Libera la conexión. Si la lectura no terminó (p. ej. el cliente se
+        desconectó) se cancela la consulta en el servidor y la conexión se
+        descarta en lugar de devolverse al pool.
+        """
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+
+        descartar = not self._terminada
+        try:
+            if self._terminada:
+                self._cursor.close()
+            else:
+                self._cancelar_consulta(conn)
+        except Exception:
+            descartar = True
+            raise
+        finally:
+            # La conexión vuelve al pool (o se descarta) pase lo que pase
+            self._pool.release(conn, discard=descartar)
+
+    def _cancelar_consulta(self, conn) -> None:
+        try:
+            # KILL QUERY solo aplica en el mismo servidor de la consulta
+            with get_db_connection(pool=self._pool) as otra:
+                with otra.cursor() as cursor:
+                    cursor.execute("KILL QUERY %s", (conn.thread_id(),))
+        except Exception as exc:
+            # La consulta pudo haber terminado entre tanto; si sigue corriendo,
+            # descartar la conexión la termina cuando MySQL note el cierre
+            logger.warning("No se pudo cancelar la consulta de exportación %s: %s", conn.thread_id(), exc)
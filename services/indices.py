@@ -0,0 +1,161 @@
+"""
+Verificación de índices y columnas requeridos por las consultas de Condonaciones
+
+Las consultas por crédito dependen de índices compuestos que no administra
+la API. Al iniciar se revisa information_schema y, si falta alguno, se emite
+una advertencia con la sentencia DDL para crearlo. También se advierte si
+falta una columna configurable (p. ej. GASTOS_COLUMNA_ID), que de otro modo
+solo se descubriría con errores en las peticiones.
+
+Uso manual (imprime el estado y el DDL de los índices faltantes):
+    python -m services.indices
+"""
+
+import logging
+import os
+from typing import Dict, List, Tuple
+from dotenv import load_dotenv
+
+from config.database import get_db_connection
+from services.condonaciones import DATABASE_CONDONACIONES, LECTURA_POR_TABLA, PaginacionConfig, SnapshotConfig
+from services.invalidacion import InvalidacionConfig
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class IndicesConfig:
+    """Configuración de la verificación de índices"""
+
+    VERIFICAR_AL_INICIAR = os.getenv("VERIFICAR_INDICES", "True").lower() == "true"
+
+
+# (tabla, columnas en orden, nombre sugerido del índice)
+INDICES_REQUERIDOS: Tuple[Tuple[str, Tuple[str, ...], str], ...] = (
+    # Último snapshot de un crédito: WHERE Id_credito = ? ORDER BY semana DESC LIMIT 1
+    ("tbl_segundometro_semana", ("Id_credito", SnapshotConfig.COLUMNA_SEMANA), "idx_segundometro_credito_semana"),
+    # Detalle por crédito y estado, ordenado por periodo de inicio
+    ("gastos_cobranza", ("Id_credito", "condonado", "periodo_inicio"), "idx_gastos_credito_condonado_periodo"),
+)
+
+# Índice de datos generales: MAX(semana) y COUNT(*) / MAX(<carga>) WHERE semana = ?
+if SnapshotConfig.INDICE_ENABLED:
+    _columnas_semana = (SnapshotConfig.COLUMNA_SEMANA,) + (
+        (SnapshotConfig.COLUMNA_CARGA,) if SnapshotConfig.COLUMNA_CARGA else ()
+    )
+    INDICES_REQUERIDOS += (
+        ("tbl_segundometro_semana", _columnas_semana, f"idx_segundometro_{SnapshotConfig.COLUMNA_SEMANA.lower()}"),
+    )
+
+# Lecturas de la fuente de cambios: WHERE <columna> > ? ... ORDER BY <columna> DESC LIMIT 1
+if InvalidacionConfig.ENABLED:
+    INDICES_REQUERIDOS += (
+        ("gastos_cobranza", (InvalidacionConfig.COLUMNA,), f"idx_gastos_{InvalidacionConfig.COLUMNA.lower()}"),
+    )
+
+# (tabla, columna, uso) de columnas configurables
+COLUMNAS_REQUERIDAS: Tuple[Tuple[str, str, str], ...] = (
+    ("gastos_cobranza", PaginacionConfig.COLUMNA_ID, "la paginación con cursor (GASTOS_COLUMNA_ID)"),
+)
+
+_SQL_COLUMNAS = """
+    SELECT COLUMN_NAME as columna
+    FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE()
+      AND TABLE_NAME = %s
+"""
+
+_SQL_INDICES = """
+    SELECT INDEX_NAME as indice, COLUMN_NAME as columna
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE()
+      AND TABLE_NAME = %s
+    ORDER BY INDEX_NAME, SEQ_IN_INDEX
+"""
+
+
+def ddl_indice(tabla: str, columnas: Tuple[str, ...], nombre: str) -> str:
+    """Sentencia CREATE INDEX de un índice requerido"""
+    return f"CREATE INDEX {nombre} ON {tabla} ({', '.join(columnas)});"
+
+
+def _cubierto(columnas: Tuple[str, ...], indices: Dict[str, List[str]]) -> bool:
+    """Algún índice existente empieza por las columnas requeridas (en orden)"""
+    requeridas = [columna.lower() for columna in columnas]
+    return any(
+        [columna.lower() for columna in existentes[:len(requeridas)]] == requeridas
+        for existentes in indices.values()
+    )
+
+
+def indices_faltantes() -> List[Tuple[str, Tuple[str, ...], str]]:
+    """
+    Consulta information_schema y retorna los índices requeridos que faltan.
+    Función bloqueante: se ejecuta en un hilo mediante run_db.
+    """
+    faltantes = []
+    for tabla, columnas, nombre in INDICES_REQUERIDOS:
+        # Cada tabla se revisa en el destino del que se lee
+        with get_db_connection(database=LECTURA_POR_TABLA[tabla]) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(_SQL_INDICES, (tabla,))
+                indices: Dict[str, List[str]] = {}
+                for row in cursor.fetchall():
+                    indices.setdefault(row["indice"], []).append(row["columna"])
+        if not _cubierto(columnas, indices):
+            faltantes.append((tabla, columnas, nombre))
+    return faltantes
+
+
+def columnas_faltantes() -> List[Tuple[str, str, str]]:
+    """
+    Consulta information_schema y retorna las columnas requeridas que faltan.
+    Función bloqueante: se ejecuta en un hilo mediante run_db.
+    """
+    faltantes = []
+    for tabla, columna, uso in COLUMNAS_REQUERIDAS:
+        with get_db_connection(database=LECTURA_POR_TABLA[tabla]) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(_SQL_COLUMNAS, (tabla,))
+                existentes = {row["columna"].lower() for row in cursor.fetchall()}
+        if columna.lower() not in existentes:
+            faltantes.append((tabla, columna, uso))
+    return faltantes
+
+
+def verificar_indices() -> int:
+    """
+    Advierte en el log por cada índice o columna requerido que no existe.
+    Nunca detiene el arranque de la API: si la verificación falla solo se
+    registra la advertencia.
+
+    Returns:
+        Número de índices y columnas faltantes (0 si no se pudo verificar)
+    """
+    try:
+        faltantes = indices_faltantes()
+        columnas = columnas_faltantes()
+    except Exception as exc:
+        logger.warning("No se pudieron verificar los índices de %s: %s", DATABASE_CONDONACIONES, exc)
+        return 0
+
+    for tabla, columnas_indice, nombre in faltantes:
+        logger.warning(
+            "Falta un índice en %s(%s); las consultas por crédito harán recorridos completos. Crear con: %s",
+            tabla, ", ".join(columnas_indice), ddl_indice(tabla, columnas_indice, nombre)
+        )
+    for tabla, columna, uso in columnas:
+        logger.warning("Falta la columna %s.%s que usa %s; esas peticiones fallarán", tabla, columna, uso)
+    return len(faltantes) + len(columnas)
+
+
+if __name__ == "__main__":
+    faltantes = indices_faltantes()
+    for tabla, columnas, nombre in INDICES_REQUERIDOS:
+        estado = "FALTA" if (tabla, columnas, nombre) in faltantes else "OK"
+        print(f"[{estado}] {tabla}({', '.join(columnas)})")
+    for indice in faltantes:
+        print(ddl_indice(*indice))
+    for tabla, columna, uso in columnas_faltantes():
+        print(f"[FALTA] columna {tabla}.{columna} ({uso})")
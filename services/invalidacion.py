@@ -0,0 +1,259 @@
+"""
+Invalidación de la caché por cambios en gastos_cobranza
+
+Una tarea de fondo lee periódicamente los créditos cuyos gastos cambiaron y
+elimina (o reconstruye) solo sus respuestas en caché. Así CACHE_TTL puede ser
+largo sin servir un `condonado` desactualizado por más de un intervalo.
+
+La fuente de cambios por defecto es una marca de agua sobre una columna de
+fecha de gastos_cobranza (`fecha_condonacion` o una columna de última
+modificación). Cualquier otra fuente (p. ej. un lector del binlog) implementa
+`FuenteCambios`; `FuenteMemoria` la sustituye en pruebas y entornos locales.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from datetime import date, timedelta
+from typing import Any, Awaitable, Callable, Iterable, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+
+from config.database import con_limite_ejecucion, get_db_connection, run_db
+from services.cache import ResponseCache, response_cache
+from services.condonaciones import LECTURA_GASTOS
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+
+class InvalidacionConfig:
+    """Configuración de la invalidación por cambios"""
+
+    ENABLED = os.getenv("INVALIDACION_ENABLED", "False").lower() == "true"
+    # Segundos entre lecturas de la fuente de cambios
+    INTERVALO = float(os.getenv("INVALIDACION_INTERVALO", "5"))
+    # Columna de gastos_cobranza que avanza con cada cambio relevante
+    COLUMNA = os.getenv("INVALIDACION_COLUMNA", "fecha_condonacion")
+
+    if not COLUMNA.replace("_", "").isalnum():
+        raise ValueError(f"INVALIDACION_COLUMNA no es un nombre de columna válido: {COLUMNA}")
+
+    # Segundos hacia atrás que se vuelven a revisar en cada lectura, para
+    # cambios que se confirman con una fecha anterior a la última vista
+    MARGEN = float(os.getenv("INVALIDACION_MARGEN", "5"))
+    # Reconstruir las respuestas sin filtros de los créditos modificados
+    REFRESCAR = os.getenv("INVALIDACION_REFRESCAR", "False").lower() == "true"
+    # Máximo de créditos que se reconstruyen por lectura (el resto solo se invalida)
+    REFRESCAR_MAX = int(os.getenv("INVALIDACION_REFRESCAR_MAX", "100"))
+
+
+class FuenteCambios:
+    """Interfaz de una fuente de créditos modificados"""
+
+    def leer(self) -> List[int]:
+        """
+        IDs de crédito con cambios desde la lectura anterior.
+        Función bloqueante: se ejecuta en un hilo mediante run_db.
+        """
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class FuenteMemoria(FuenteCambios):
+    """Fuente local: los cambios se publican desde el mismo proceso"""
+
+    def __init__(self):
+        self._cambios: List[int] = []
+        self._lock = threading.Lock()
+
+    def publicar(self, *ids_credito: int) -> None:
+        with self._lock:
+            self._cambios.extend(ids_credito)
+
+    def leer(self) -> List[int]:
+        with self._lock:
+            cambios, self._cambios = self._cambios, []
+        return list(dict.fromkeys(cambios))
+
+    def stats(self) -> dict:
+        return {"fuente": "memoria"}
+
+
+def _restar(marca: Any, segundos: float) -> Any:
+    """Marca menos el margen; las marcas que no son fechas ni números no se ajustan"""
+    if isinstance(marca, date):
+        return marca - timedelta(seconds=segundos)
+    if isinstance(marca, (int, float)):
+        return marca - segundos
+    return marca
+
+
+class FuenteMarcaAgua(FuenteCambios):
+    """
+    Créditos con filas de gastos_cobranza cuya columna `columna` pasó la
+    última marca vista.
+
+    Cada lectura toma el valor máximo actual de la columna como tope y
+    consulta los créditos con cambios en (marca - margen, tope]. Los
+    (crédito, marca) ya reportados en la lectura anterior no se repiten, de
+    modo que el margen solo agrega los cambios confirmados tarde. La primera
+    lectura solo fija la marca y la ventana: la caché aún está vacía.
+
+    La columna debe tener índice; sin él cada lectura recorre la tabla.
+    """
+
+    def __init__(self, columna: str, margen: float, database: str = LECTURA_GASTOS):
+        self.columna = columna
+        self.margen = margen
+        self.database = database
+        self.marca: Any = None
+        self._iniciada = False
+        self._vistos: Set[Tuple[int, Any]] = set()
+        self._sql_tope = f"""
+            SELECT {columna} as marca
+            FROM gastos_cobranza
+            WHERE {columna} IS NOT NULL
+            ORDER BY {columna} DESC
+            LIMIT 1
+        """
+        self._sql_cambios = f"""
+            SELECT Id_credito as id_credito, MAX({columna}) as marca
+            FROM gastos_cobranza
+            WHERE {columna} > %s AND {columna} <= %s
+            GROUP BY Id_credito
+        """
+        # Sin marca previa (tabla sin valores al iniciar) todo es nuevo
+        self._sql_cambios_desde_inicio = f"""
+            SELECT Id_credito as id_credito, MAX({columna}) as marca
+            FROM gastos_cobranza
+            WHERE {columna} <= %s
+            GROUP BY Id_credito
+        """
+
+    def leer(self) -> List[int]:
+        with get_db_connection(database=self.database) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(con_limite_ejecucion(self._sql_tope))
+                row = cursor.fetchone()
+                tope = row["marca"] if row else None
+                if tope is None:
+                    self._iniciada = True
+                    return []
+                if not self._iniciada:
+                    # La ventana del margen al iniciar ya está reflejada en la caché
+                    cursor.execute(con_limite_ejecucion(self._sql_cambios), (_restar(tope, self.margen), tope))
+                elif self.marca is None:
+                    cursor.execute(con_limite_ejecucion(self._sql_cambios_desde_inicio), (tope,))
+                else:
+                    cursor.execute(con_limite_ejecucion(self._sql_cambios), (_restar(self.marca, self.margen), tope))
+                filas = cursor.fetchall()
+        nuevos = self._nuevos(filas, tope)
+        if not self._iniciada:
+            self._iniciada = True
+            return []
+        return nuevos
+
+    def _nuevos(self, filas: Iterable[dict], tope: Any) -> List[int]:
+        """Créditos de `filas` que no se reportaron en la lectura anterior; avanza la marca"""
+        vistos = {(row["id_credito"], row["marca"]) for row in filas}
+        nuevos = sorted({id_credito for id_credito, marca in vistos if (id_credito, marca) not in self._vistos})
+        # Solo hace falta recordar la ventana de la última lectura
+        self._vistos = vistos
+        if self.marca is None or tope > self.marca:
+            self.marca = tope
+        return nuevos
+
+    def stats(self) -> dict:
+        return {
+            "fuente": "marca_de_agua",
+            "columna": self.columna,
+            "marca": str(self.marca) if self.marca is not None else None
+        }
+
+
+class InvalidadorCache:
+    """
+    Aplica a la caché de respuestas los cambios de una fuente (tarea de fondo).
+
+    Los créditos de cada lectura se invalidan (y reconstruyen) de nuevo en la
+    lectura siguiente: una carga que empezó antes del cambio, o que leyó una
+    réplica atrasada, pudo guardar la versión anterior después de la
+    invalidación.
+    """
+
+    def __init__(self, cache: ResponseCache, fuente: FuenteCambios, enabled: bool, intervalo: float):
+        self.cache = cache
+        self.fuente = fuente
+        self.enabled = enabled
+        self.intervalo = intervalo
+        self._anteriores: List[int] = []
+        self.lecturas = 0
+        self.creditos_modificados = 0
+        self.entradas_eliminadas = 0
+        self.refrescadas = 0
+        self.errores = 0
+        self.ultimo_error: Optional[str] = None
+
+    async def procesar(self, refrescar: Optional[Callable[[List[int]], Awaitable[int]]] = None) -> List[int]:
+        """
+        Lee la fuente una vez e invalida los créditos modificados.
+
+        Args:
+            refrescar: Función que reconstruye las respuestas de los créditos
+                indicados (opcional; sin ella solo se invalidan)
+
+        Returns:
+            IDs de crédito modificados en esta lectura
+        """
+        modificados = await run_db(self.fuente.leer)
+        self.lecturas += 1
+        self.creditos_modificados += len(modificados)
+
+        afectados = list(dict.fromkeys([*modificados, *self._anteriores]))
+        for id_credito in afectados:
+            self.entradas_eliminadas += await self.cache.invalidar(id_credito)
+        self._anteriores = modificados
+
+        if modificados:
+            logger.info("Caché invalidada para %d créditos modificados", len(modificados))
+        if afectados and refrescar is not None:
+            self.refrescadas += await refrescar(afectados[:InvalidacionConfig.REFRESCAR_MAX])
+        return modificados
+
+    async def ejecutar(self, refrescar: Optional[Callable[[List[int]], Awaitable[int]]] = None) -> None:
+        """Lee la fuente cada `intervalo` segundos (tarea de fondo)"""
+        while True:
+            try:
+                await self.procesar(refrescar)
+            except Exception as exc:
+                self.errores += 1
+                self.ultimo_error = str(exc)
+                logger.warning("No se pudieron leer los cambios de gastos_cobranza: %s", exc)
+            await asyncio.sleep(self.intervalo)
+
+    def stats(self) -> dict:
+        """Lecturas de la fuente y créditos invalidados"""
+        return {
+            "enabled": self.enabled,
+            "intervalo": self.intervalo,
+            "lecturas": self.lecturas,
+            "creditos_modificados": self.creditos_modificados,
+            "entradas_eliminadas": self.entradas_eliminadas,
+            "refrescadas": self.refrescadas,
+            "errores": self.errores,
+            "ultimo_error": self.ultimo_error,
+            **self.fuente.stats()
+        }
+
+
+# Instancia compartida por la API
+invalidador_cache = InvalidadorCache(
+    response_cache,
+    FuenteMarcaAgua(InvalidacionConfig.COLUMNA, InvalidacionConfig.MARGEN),
+    InvalidacionConfig.ENABLED,
+    InvalidacionConfig.INTERVALO
+)
@@ -0,0 +1,292 @@
+"""
+Límites de peticiones por API Key
+
+Cada cliente (resuelto por verify_api_key) tiene una cubeta de tokens que se
+rellena a `rate_limit` tokens por segundo hasta `burst`, y un máximo de
+peticiones en vuelo. Al exceder cualquiera de los dos la petición se rechaza
+con 429 y Retry-After antes de pedir una conexión al pool.
+
+Los límites por cliente vienen de API_KEYS_FILE; las claves sin límites usan
+los valores por defecto de RATE_LIMIT_*. El estado vive en el proceso
+(`memoria`) o en Redis (`redis`) para compartirlo entre instancias.
+"""
+
+import math
+import os
+import time
+from typing import Dict, List, Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request, Security
+
+from config.security import ClienteApiKey, verify_api_key
+from utils.metricas import registro
+
+load_dotenv()
+
+
+class LimitesConfig:
+    """Configuración de los límites por API Key"""
+
+    ENABLED = os.getenv("RATE_LIMIT_ENABLED", "True").lower() == "true"
+    BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memoria")  # memoria | redis
+    REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+    # Valores por defecto para claves sin límites propios (0 = sin límite)
+    POR_SEGUNDO = float(os.getenv("RATE_LIMIT_POR_SEGUNDO", "20"))
+    BURST = int(os.getenv("RATE_LIMIT_BURST", "40"))
+    MAX_EN_VUELO = int(os.getenv("RATE_LIMIT_MAX_EN_VUELO", "10"))
+
+
+rechazos = registro.contador(
+    "condonaciones_rate_limited_total",
+    "Peticiones rechazadas con 429 por cliente y motivo",
+    ("cliente", "motivo")
+)
+
+
+class LimitesBackend:
+    """Interfaz de almacenamiento del estado de los límites"""
+
+    async def tomar(self, clave: str, por_segundo: float, burst: int) -> float:
+        """
+        Consume un token de la cubeta del cliente.
+
+        Returns:
+            0 si había token; si no, segundos hasta que haya uno
+        """
+        raise NotImplementedError
+
+    async def entrar(self, clave: str, maximo: int) -> bool:
+        """Registra una petición en vuelo; False si ya hay `maximo`"""
+        raise NotImplementedError
+
+    async def salir(self, clave: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class MemoryLimitesBackend(LimitesBackend):
+    """
+    Estado en memoria del proceso.
+
+    Todas las operaciones corren en el event loop y ninguna cede el control a
+    la mitad, por lo que no necesitan lock: cada una son unas cuantas
+    operaciones aritméticas sobre una lista por cliente.
+    """
+
+    def __init__(self):
+        # clave -> [tokens, última actualización]
+        self._cubetas: Dict[str, List[float]] = {}
+        self._en_vuelo: Dict[str, int] = {}
+
+    async def tomar(self, clave: str, por_segundo: float, burst: int) -> float:
+        ahora = time.monotonic()
+        cubeta = self._cubetas.get(clave)
+        if cubeta is None:
+            self._cubetas[clave] = [burst - 1, ahora]
+            return 0.0
+        tokens = min(burst, cubeta[0] + (ahora - cubeta[1]) * por_segundo)
+        cubeta[1] = ahora
+        if tokens >= 1:
+            cubeta[0] = tokens - 1
+            return 0.0
+        cubeta[0] = tokens
+        return (1 - tokens) / por_segundo
+
+    async def entrar(self, clave: str, maximo: int) -> bool:
+        actuales = self._en_vuelo.get(clave, 0)
+        if actuales >= maximo:
+            return False
+        self._en_vuelo[clave] = actuales + 1
+        return True
+
+    async def salir(self, clave: str) -> None:
+        actuales = self._en_vuelo.get(clave, 0) - 1
+        if actuales > 0:
+            self._en_vuelo[clave] = actuales
+        else:
+            self._en_vuelo.pop(clave, None)
+
+    def stats(self) -> dict:
+        return {"backend": "memoria", "en_vuelo": dict(self._en_vuelo)}
+
+
+# Cubeta de tokens atómica en Redis: KEYS[1] = cubeta; ARGV = por_segundo, burst, ahora
+_SCRIPT_TOMAR = """
+local por_segundo = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local ahora = tonumber(ARGV[3])
+local estado = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens = tonumber(estado[1]) or burst
+local anterior = tonumber(estado[2]) or ahora
+tokens = math.min(burst, tokens + math.max(0, ahora - anterior) * por_segundo)
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    espera = (1 - tokens) / por_segundo
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', ahora)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / por_segundo) + 1)
+return tostring(espera)
+"""
+
+
+class RedisLimitesBackend(LimitesBackend):
+    """
+    Estado compartido entre instancias sobre Redis.
+
+    Recibe un cliente asíncrono compatible con `redis.asyncio.Redis` (eval,
+    incr, decr, expire). La cubeta se actualiza con un script Lua para que
+    sea atómica; el contador en vuelo expira a los `ttl_en_vuelo` segundos
+    por si una instancia termina sin liberar sus peticiones.
+    """
+
+    def __init__(self, client, prefijo: str = "condonaciones:limite:", ttl_en_vuelo: int = 300):
+        self.client = client
+        self.prefijo = prefijo
+        self.ttl_en_vuelo = ttl_en_vuelo
+
+    async def tomar(self, clave: str, por_segundo: float, burst: int) -> float:
+        espera = await self.client.eval(
+            _SCRIPT_TOMAR, 1, f"{self.prefijo}cubeta:{clave}", por_segundo, burst, time.time()
+        )
+        return float(espera)
+
+    async def entrar(self, clave: str, maximo: int) -> bool:
+        llave = f"{self.prefijo}en_vuelo:{clave}"
+        actuales = await self.client.incr(llave)
+        await self.client.expire(llave, self.ttl_en_vuelo)
+        if actuales > maximo:
+            await self.client.decr(llave)
+            return False
+        return True
+
+    async def salir(self, clave: str) -> None:
+        await self.client.decr(f"{self.prefijo}en_vuelo:{clave}")
+
+    def stats(self) -> dict:
+        return {"backend": "redis"}
+
+
+class Permiso:
+    """Lugar en vuelo de una petición; se libera una sola vez"""
+
+    __slots__ = ("backend", "clave")
+
+    def __init__(self, backend: Optional[LimitesBackend], clave: str):
+        self.backend = backend
+        self.clave = clave
+
+    async def liberar(self) -> None:
+        backend, self.backend = self.backend, None
+        if backend is not None:
+            await backend.salir(self.clave)
+
+    def transferir(self) -> "Permiso":
+        """
+        Entrega el lugar a quien lo liberará más tarde. Las dependencias con
+        yield terminan antes de enviar el cuerpo, por lo que una respuesta en
+        streaming debe liberar el permiso transferido al terminar de enviarse.
+        """
+        permiso = Permiso(self.backend, self.clave)
+        self.backend = None
+        return permiso
+
+
+class LimitadorPeticiones:
+    """Aplica la cubeta de tokens y el máximo en vuelo de cada cliente"""
+
+    def __init__(
+        self,
+        backend: LimitesBackend,
+        por_segundo: float,
+        burst: int,
+        max_en_vuelo: int,
+        enabled: bool = True
+    ):
+        self.backend = backend
+        self.por_segundo = por_segundo
+        self.burst = burst
+        self.max_en_vuelo = max_en_vuelo
+        self.enabled = enabled
+
+    async def adquirir(self, cliente: ClienteApiKey) -> Permiso:
+        """
+        Reserva la petición del cliente.
+
+        Raises:
+            HTTPException: 429 con Retry-After si excede su tasa o su máximo en vuelo
+        """
+        if not self.enabled:
+            return Permiso(None, cliente.nombre)
+
+        por_segundo = cliente.rate_limit if cliente.rate_limit is not None else self.por_segundo
+        if por_segundo > 0:
+            burst = cliente.burst if cliente.burst is not None else max(self.burst, 1)
+            espera = await self.backend.tomar(cliente.nombre, por_segundo, max(burst, 1))
+            if espera > 0:
+                rechazos.inc(cliente.nombre, "tasa")
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Límite de {por_segundo:g} peticiones por segundo excedido para el cliente '{cliente.nombre}'",
+                    headers={"Retry-After": str(max(1, math.ceil(espera)))}
+                )
+
+        maximo = cliente.max_en_vuelo if cliente.max_en_vuelo is not None else self.max_en_vuelo
+        if maximo <= 0:
+            return Permiso(None, cliente.nombre)
+        if not await self.backend.entrar(cliente.nombre, maximo):
+            rechazos.inc(cliente.nombre, "en_vuelo")
+            raise HTTPException(
+                status_code=429,
+                detail=f"Máximo de {maximo} peticiones simultáneas excedido para el cliente '{cliente.nombre}'",
+                headers={"Retry-After": "1"}
+            )
+        return Permiso(self.backend, cliente.nombre)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "por_segundo": self.por_segundo,
+            "burst": self.burst,
+            "max_en_vuelo": self.max_en_vuelo,
+            **self.backend.stats()
+        }
+
+
+def crear_backend() -> LimitesBackend:
+    """Crea el backend configurado en RATE_LIMIT_BACKEND"""
+    if LimitesConfig.BACKEND == "redis":
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as exc:
+            raise RuntimeError(
+                "RATE_LIMIT_BACKEND=redis requiere el paquete 'redis' (pip install redis)"
+            ) from exc
+        return RedisLimitesBackend(redis_asyncio.from_url(LimitesConfig.REDIS_URL))
+    return MemoryLimitesBackend()
+
+
+# Instancia compartida por la API
+limitador = LimitadorPeticiones(
+    crear_backend(),
+    LimitesConfig.POR_SEGUNDO,
+    LimitesConfig.BURST,
+    LimitesConfig.MAX_EN_VUELO,
+    LimitesConfig.ENABLED
+)
+
+
+async def limitar_peticion(request: Request, api_key: str = Security(verify_api_key)):
+    """
+    Dependencia del router: autentica, aplica los límites del cliente y
+    libera su lugar en vuelo al terminar la petición (o al terminar el
+    cuerpo, si la ruta transfiere el permiso a una respuesta en streaming).
+    """
+    permiso = await limitador.adquirir(request.state.cliente_api)
+    try:
+        yield permiso
+    finally:
+        await permiso.liberar()
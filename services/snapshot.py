@@ -0,0 +1,326 @@
+"""
+Índice en memoria de los datos generales de tbl_segundometro_semana
+
+tbl_segundometro_semana solo cambia cuando corre la carga semanal. Con
+SNAPSHOT_INDICE_ENABLED=True la API carga la proyección de DatosGenerales de
+la última semana en un índice compacto por id_credito y resuelve los datos
+generales en memoria; los créditos que no están en el índice se consultan en
+la base de datos como siempre.
+
+El índice se guarda en arreglos por columna (`array`) y los textos en un solo
+bloque de bytes con desplazamientos, en lugar de un diccionario por crédito.
+Una tarea en segundo plano revisa periódicamente la marca de carga de la
+última semana (semana, filas y, si se configura, la última fecha de carga).
+Cuando la marca cambia y se mantiene igual durante un intervalo completo (la
+carga terminó) construye otro índice y lo reemplaza de forma atómica; así un
+índice construido a mitad de la carga semanal se completa después.
+"""
+
+import asyncio
+import logging
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+import pymysql
+
+from config.database import get_db_connection, run_db
+from services.condonaciones import (
+    CAMPOS_DATOS_GENERALES,
+    COLUMNAS_DATOS_GENERALES,
+    ExportConfig,
+    LECTURA_SEGUNDOMETRO,
+    SnapshotConfig,
+    _select
+)
+
+logger = logging.getLogger(__name__)
+
+# Almacenamiento de cada campo de DatosGenerales (id_credito es la clave)
+TIPOS_CAMPO = {
+    "nombre_cliente": "texto",
+    "id_cliente": "entero",
+    "domicilio_completo": "texto",
+    "bucket_morosidad": "texto",
+    "dias_mora": "entero",
+    "saldo_vencido": "real",
+}
+
+if set(TIPOS_CAMPO) | {"id_credito"} != set(CAMPOS_DATOS_GENERALES):
+    raise RuntimeError("TIPOS_CAMPO no coincide con las columnas de DatosGenerales")
+
+_CAMPOS = tuple(campo for campo in CAMPOS_DATOS_GENERALES if campo != "id_credito")
+
+# Con un índice que empiece por la columna de semana (ver services/indices.py)
+# el MAX y el conteo de la semana se resuelven sin recorrer la tabla
+_SQL_ULTIMA_SEMANA = f"""
+    SELECT MAX({SnapshotConfig.COLUMNA_SEMANA}) as semana
+    FROM tbl_segundometro_semana
+"""
+
+_SQL_CARGA_SEMANA = f"""
+    SELECT
+        COUNT(*) as filas,
+        {f"MAX({SnapshotConfig.COLUMNA_CARGA})" if SnapshotConfig.COLUMNA_CARGA else "NULL"} as carga
+    FROM tbl_segundometro_semana
+    WHERE {SnapshotConfig.COLUMNA_SEMANA} = %s
+"""
+
+# (semana, filas de la semana, última fecha de carga o None)
+MarcaCarga = Tuple[object, int, object]
+
+_SQL_SNAPSHOT = f"""
+    SELECT
+        {_select(COLUMNAS_DATOS_GENERALES)}
+    FROM tbl_segundometro_semana
+    WHERE {SnapshotConfig.COLUMNA_SEMANA} = %s
+    ORDER BY Id_credito
+"""
+
+
+class _Columna:
+    """Valores de un campo para todos los créditos del índice"""
+
+    __slots__ = ("tipo", "valores", "desplazamientos")
+
+    def __init__(self, tipo: str):
+        self.tipo = tipo
+        if tipo == "texto":
+            self.valores = bytearray()
+            self.desplazamientos = array("Q", [0])
+        else:
+            self.valores = array("q" if tipo == "entero" else "d")
+            self.desplazamientos = None
+
+    def agregar(self, valor) -> None:
+        if self.tipo == "texto":
+            if valor is not None:
+                self.valores += valor if isinstance(valor, (bytes, bytearray)) else str(valor).encode()
+            self.desplazamientos.append(len(self.valores))
+        elif self.tipo == "entero":
+            self.valores.append(int(valor) if valor is not None else 0)
+        else:
+            self.valores.append(float(valor) if valor is not None else 0.0)
+
+    def cerrar(self) -> None:
+        if self.tipo == "texto":
+            self.valores = bytes(self.valores)
+
+    def leer(self, posicion: int):
+        if self.tipo == "texto":
+            return self.valores[self.desplazamientos[posicion]:self.desplazamientos[posicion + 1]].decode()
+        return self.valores[posicion]
+
+    def bytes(self) -> int:
+        tamano = len(self.valores) * (1 if self.tipo == "texto" else self.valores.itemsize)
+        if self.desplazamientos is not None:
+            tamano += len(self.desplazamientos) * self.desplazamientos.itemsize
+        return tamano
+
+
+class IndiceDatosGenerales:
+    """
+    Datos generales de una semana de tbl_segundometro_semana ordenados por
+    id_credito. La búsqueda es binaria sobre el arreglo de IDs. Inmutable una
+    vez construido, por lo que se puede leer sin bloqueos.
+    """
+
+    def __init__(self, semana, marca: Optional[MarcaCarga] = None):
+        self.semana = semana
+        self.marca = marca
+        self.ids = array("q")
+        self.columnas = {campo: _Columna(TIPOS_CAMPO[campo]) for campo in _CAMPOS}
+        # Un bit por campo nulo (en el orden de _CAMPOS)
+        self.nulos = array("B")
+        self.duracion_ms = 0.0
+
+    def _agregar(self, row: dict) -> None:
+        id_credito = row["id_credito"]
+        # Filas ordenadas por Id_credito: se conserva la primera de cada crédito
+        if id_credito is None or (self.ids and self.ids[-1] == id_credito):
+            return
+        mascara = 0
+        for bit, campo in enumerate(_CAMPOS):
+            valor = row[campo]
+            if valor is None:
+                mascara |= 1 << bit
+            self.columnas[campo].agregar(valor)
+        self.ids.append(id_credito)
+        self.nulos.append(mascara)
+
+    def _cerrar(self) -> None:
+        for columna in self.columnas.values():
+            columna.cerrar()
+
+    def obtener(self, id_credito: int) -> Optional[dict]:
+        """Datos generales del crédito o None si no está en el índice"""
+        posicion = bisect_left(self.ids, id_credito)
+        if posicion == len(self.ids) or self.ids[posicion] != id_credito:
+            return None
+        mascara = self.nulos[posicion]
+        fila = {"id_credito": id_credito}
+        for bit, campo in enumerate(_CAMPOS):
+            fila[campo] = None if mascara & (1 << bit) else self.columnas[campo].leer(posicion)
+        return fila
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def bytes(self) -> int:
+        """Memoria aproximada de los datos del índice"""
+        return (
+            len(self.ids) * self.ids.itemsize
+            + len(self.nulos) * self.nulos.itemsize
+            + sum(columna.bytes() for columna in self.columnas.values())
+        )
+
+
+def marca_carga() -> Optional[MarcaCarga]:
+    """Marca de carga de la semana más reciente de tbl_segundometro_semana (None si está vacía)"""
+    with get_db_connection(database=LECTURA_SEGUNDOMETRO) as conn:
+        with conn.cursor() as cursor:
+            cursor.execute(_SQL_ULTIMA_SEMANA)
+            row = cursor.fetchone()
+            semana = row["semana"] if row else None
+            if semana is None:
+                return None
+            cursor.execute(_SQL_CARGA_SEMANA, (semana,))
+            row = cursor.fetchone()
+    return semana, row["filas"], row["carga"]
+
+
+def construir_indice(semana, marca: Optional[MarcaCarga] = None) -> IndiceDatosGenerales:
+    """
+    Lee la semana indicada con un cursor del lado del servidor y construye
+    su índice. Función bloqueante: se ejecuta en un hilo mediante run_db.
+    """
+    inicio = time.perf_counter()
+    indice = IndiceDatosGenerales(semana, marca)
+
+    with get_db_connection(database=LECTURA_SEGUNDOMETRO) as conn:
+        cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+        try:
+            cursor.execute(_SQL_SNAPSHOT, (semana,))
+            while True:
+                filas = cursor.fetchmany(ExportConfig.FETCH_SIZE)
+                if not filas:
+                    break
+                for row in filas:
+                    indice._agregar(row)
+        finally:
+            cursor.close()
+
+    indice._cerrar()
+    indice.duracion_ms = (time.perf_counter() - inicio) * 1000
+    return indice
+
+
+class IndiceSnapshot:
+    """
+    Índice vigente y su actualización en segundo plano.
+
+    Las consultas leen `self._indice` sin bloqueos; al construir uno nuevo la
+    referencia se reemplaza en una sola asignación, por lo que cada consulta
+    ve el índice anterior completo o el nuevo completo.
+    """
+
+    def __init__(self, enabled: bool, intervalo: float):
+        self.enabled = enabled
+        self.intervalo = intervalo
+        self._indice: Optional[IndiceDatosGenerales] = None
+        # Última marca vista que difiere de la del índice vigente
+        self._pendiente: Optional[MarcaCarga] = None
+        self.aciertos = 0
+        self.fallos = 0
+        self.reconstrucciones = 0
+        self.errores = 0
+        self.ultimo_error: Optional[str] = None
+
+    def obtener(self, id_credito: int) -> Optional[dict]:
+        """Datos generales desde memoria; None si hay que consultar la base de datos"""
+        indice = self._indice
+        if indice is None:
+            return None
+        fila = indice.obtener(id_credito)
+        if fila is None:
+            self.fallos += 1
+        else:
+            self.aciertos += 1
+        return fila
+
+    def obtener_varios(self, ids_credito: Iterable[int]) -> Dict[int, dict]:
+        """Datos generales de los créditos que están en el índice"""
+        encontrados = {}
+        for id_credito in ids_credito:
+            fila = self.obtener(id_credito)
+            if fila is not None:
+                encontrados[id_credito] = fila
+        return encontrados
+
+    def refrescar(self) -> bool:
+        """
+        Reconstruye el índice si la marca de carga cambió y no volvió a
+        cambiar desde la revisión anterior (la carga semanal terminó). Sin
+        índice se construye de inmediato aunque la carga siga en curso.
+        Función bloqueante: se ejecuta en un hilo mediante run_db.
+
+        Returns:
+            True si se reemplazó el índice
+        """
+        return self._aplicar_marca(marca_carga(), construir_indice)
+
+    def _aplicar_marca(self, marca: Optional[MarcaCarga], construir) -> bool:
+        actual = self._indice
+        if marca is None or (actual is not None and actual.marca == marca):
+            self._pendiente = None
+            return False
+        if actual is not None and marca != self._pendiente:
+            # La carga puede seguir en curso: se espera un intervalo sin cambios
+            self._pendiente = marca
+            return False
+
+        semana = marca[0]
+        nuevo = construir(semana, marca)
+        self._indice = nuevo
+        self._pendiente = None
+        self.reconstrucciones += 1
+        logger.info(
+            "Índice de datos generales de la semana %s: %d créditos, %d bytes, %.0f ms",
+            semana, len(nuevo), nuevo.bytes(), nuevo.duracion_ms
+        )
+        return True
+
+    async def ejecutar(self) -> None:
+        """Revisa cada `intervalo` segundos si cambió la carga de la última semana (tarea de fondo)"""
+        while True:
+            try:
+                await run_db(self.refrescar)
+            except Exception as exc:
+                self.errores += 1
+                self.ultimo_error = str(exc)
+                logger.warning("No se pudo actualizar el índice de datos generales: %s", exc)
+            await asyncio.sleep(self.intervalo)
+
+    def stats(self) -> dict:
+        """Tamaño, memoria y tiempo de construcción del índice vigente"""
+        indice = self._indice
+        total = self.aciertos + self.fallos
+        return {
+            "enabled": self.enabled,
+            "semana": indice.semana if indice else None,
+            "filas_semana": indice.marca[1] if indice and indice.marca else None,
+            "carga_pendiente": self._pendiente is not None,
+            "creditos": len(indice) if indice else 0,
+            "bytes": indice.bytes() if indice else 0,
+            "construccion_ms": round(indice.duracion_ms, 3) if indice else None,
+            "reconstrucciones": self.reconstrucciones,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "hit_ratio": round(self.aciertos / total, 4) if total else 0.0,
+            "errores": self.errores,
+            "ultimo_error": self.ultimo_error
+        }
+
+
+# Instancia compartida por la API
+indice_snapshot = IndiceSnapshot(SnapshotConfig.INDICE_ENABLED, SnapshotConfig.INDICE_INTERVALO)
@@ -0,0 +1,243 @@
+"""
+Pruebas de la caché de respuestas
+
+Usan la caché en memoria con un reloj falso y, para Redis, un cliente
+falso con los mismos métodos.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from config.database import CircuitoAbiertoError
+from services import cache as modulo_cache
+from services.cache import (
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    ResponseCache,
+    VARIANTE_CONDONACIONES,
+    VARIANTE_RESUMEN,
+    Vencida,
+    clave_cache
+)
+
+
+class Reloj:
+    """Módulo time con monotonic y time controlados por la prueba"""
+
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def monotonic(self) -> float:
+        return self.ahora
+
+    def time(self) -> float:
+        return self.ahora
+
+    def __getattr__(self, nombre):
+        return getattr(time, nombre)
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    falso = Reloj()
+    monkeypatch.setattr(modulo_cache, "time", falso)
+    return falso
+
+
+def tamano(clave: str, valor: bytes) -> int:
+    return len(valor) + len(clave) + modulo_cache._OVERHEAD_ENTRADA
+
+
+def test_lru_por_entradas_desaloja_la_menos_usada(reloj):
+    async def prueba():
+        backend = MemoryCacheBackend(max_entries=2, max_bytes=1024 * 1024)
+        await backend.set("a", 1, b"1", 60)
+        await backend.set("b", 2, b"2", 60)
+        # Leer "a" la vuelve la más reciente
+        assert await backend.get("a") == b"1"
+        await backend.set("c", 3, b"3", 60)
+
+        assert await backend.get("b") is None
+        assert await backend.get("a") == b"1"
+        assert await backend.get("c") == b"3"
+        assert backend.stats()["desalojos"] == 1
+
+    asyncio.run(prueba())
+
+
+def test_limite_de_bytes(reloj):
+    async def prueba():
+        valor = b"x" * 100
+        backend = MemoryCacheBackend(max_entries=100, max_bytes=2 * tamano("k1", valor))
+        await backend.set("k1", 1, valor, 60)
+        await backend.set("k2", 2, valor, 60)
+        assert backend.stats()["bytes"] == 2 * tamano("k1", valor)
+
+        await backend.set("k3", 3, valor, 60)
+        assert await backend.get("k1") is None
+        assert backend.stats()["entradas"] == 2
+        assert backend.stats()["bytes"] <= backend.max_bytes
+
+        # Reemplazar una clave no cuenta sus bytes dos veces
+        await backend.set("k3", 3, valor, 60)
+        assert backend.stats()["bytes"] == 2 * tamano("k1", valor)
+
+        # Una entrada mayor que la caché completa no se guarda ni desaloja nada
+        await backend.set("grande", 4, b"x" * backend.max_bytes, 60)
+        assert await backend.get("grande") is None
+        assert backend.stats()["entradas"] == 2
+
+    asyncio.run(prueba())
+
+
+def test_expiracion_por_ttl(reloj):
+    async def prueba():
+        backend = MemoryCacheBackend(max_entries=10, max_bytes=1024 * 1024)
+        await backend.set("a", 1, b"1", 60)
+        reloj.ahora += 59
+        assert await backend.get("a") == b"1"
+        reloj.ahora += 1
+        assert await backend.get("a") is None
+        stats = backend.stats()
+        assert stats["expiradas"] == 1 and stats["entradas"] == 0 and stats["bytes"] == 0
+
+    asyncio.run(prueba())
+
+
+def test_invalidar_credito_elimina_todas_sus_variantes(reloj):
+    async def prueba():
+        backend = MemoryCacheBackend(max_entries=100, max_bytes=1024 * 1024)
+        cache = ResponseCache(backend, ttl=60)
+        for clave in (
+            clave_cache(VARIANTE_CONDONACIONES, 1001),
+            clave_cache(VARIANTE_CONDONACIONES, 1001, "l=10"),
+            clave_cache(VARIANTE_RESUMEN, 1001),
+            clave_cache(VARIANTE_CONDONACIONES, 1001, "br:abc"),
+        ):
+            await backend.set(clave, 1001, b"v1", 60)
+        await backend.set(clave_cache(VARIANTE_CONDONACIONES, 1002), 1002, b"v1", 60)
+
+        assert await cache.invalidar(1001) == 4
+        assert await cache.invalidar(1001) == 0
+        assert backend.stats()["entradas"] == 1
+        assert backend.stats()["bytes"] == tamano(clave_cache(VARIANTE_CONDONACIONES, 1002), b"v1")
+        assert await backend.get(clave_cache(VARIANTE_CONDONACIONES, 1002)) == b"v1"
+
+        # Una entrada desalojada ya no cuenta al invalidar su crédito
+        pequena = MemoryCacheBackend(max_entries=1, max_bytes=1024 * 1024)
+        await pequena.set("a", 7, b"1", 60)
+        await pequena.set("b", 8, b"2", 60)
+        assert await pequena.invalidar_credito(7) == 0
+
+    asyncio.run(prueba())
+
+
+def test_respuesta_cache_carga_una_vez_y_agrupa_concurrentes(reloj):
+    async def prueba():
+        cache = ResponseCache(MemoryCacheBackend(100, 1024 * 1024), ttl=60)
+        cargas = []
+
+        async def cargar():
+            cargas.append(1)
+            await asyncio.sleep(0.01)
+            return b"v1"
+
+        resultados = await asyncio.gather(*(cache.obtener(VARIANTE_CONDONACIONES, 1001, cargar) for _ in range(5)))
+        assert resultados == [b"v1"] * 5
+        assert await cache.obtener(VARIANTE_CONDONACIONES, 1001, cargar) == b"v1"
+        assert len(cargas) == 1
+        assert cache.stats()["hits"] == 1
+
+        # Tras invalidar se vuelve a cargar
+        await cache.invalidar(1001)
+        await cache.obtener(VARIANTE_CONDONACIONES, 1001, cargar)
+        assert len(cargas) == 2
+
+    asyncio.run(prueba())
+
+
+def test_desactivada_no_guarda(reloj):
+    async def prueba():
+        cache = ResponseCache(MemoryCacheBackend(100, 1024 * 1024), ttl=60, enabled=False)
+        cargas = []
+
+        async def cargar():
+            cargas.append(1)
+            return b"v1"
+
+        await cache.obtener(VARIANTE_CONDONACIONES, 1001, cargar)
+        await cache.obtener(VARIANTE_CONDONACIONES, 1001, cargar)
+        assert len(cargas) == 2
+        assert cache.backend.stats()["entradas"] == 0
+
+    asyncio.run(prueba())
+
+
+def test_vencida_si_la_base_de_datos_falla(reloj, monkeypatch):
+    monkeypatch.setattr(modulo_cache, "_VENTANAS_STALE", {VARIANTE_CONDONACIONES: (0, 300)})
+
+    async def prueba():
+        cache = ResponseCache(MemoryCacheBackend(100, 1024 * 1024), ttl=60)
+
+        async def cargar():
+            return b"v1"
+
+        async def fallar():
+            raise CircuitoAbiertoError(5)
+
+        await cache.obtener_o_vencida(VARIANTE_CONDONACIONES, 1001, cargar)
+        reloj.ahora += 100
+        contenido, vencida = await cache.obtener_o_vencida(VARIANTE_CONDONACIONES, 1001, fallar)
+        assert contenido == b"v1"
+        assert vencida.motivo == Vencida.ERROR and vencida.edad == 100
+
+        # Fuera de la ventana stale-if-error se propaga el error
+        reloj.ahora += 300
+        with pytest.raises(CircuitoAbiertoError):
+            await cache.obtener_o_vencida(VARIANTE_CONDONACIONES, 1001, fallar)
+
+    asyncio.run(prueba())
+
+
+class RedisFalso:
+    """get/set/sadd/smembers/expire/delete de redis.asyncio en memoria (sin TTL)"""
+
+    def __init__(self):
+        self.valores = {}
+
+    async def get(self, llave):
+        return self.valores.get(llave)
+
+    async def set(self, llave, valor, ex=None):
+        self.valores[llave] = valor
+
+    async def sadd(self, llave, miembro):
+        self.valores.setdefault(llave, set()).add(miembro)
+
+    async def smembers(self, llave):
+        return set(self.valores.get(llave, set()))
+
+    async def expire(self, llave, segundos):
+        return True
+
+    async def delete(self, *llaves):
+        for llave in llaves:
+            self.valores.pop(llave, None)
+
+
+def test_redis_invalida_por_el_indice_del_credito():
+    async def prueba():
+        client = RedisFalso()
+        backend = RedisCacheBackend(client, prefijo="t:")
+        await backend.set("condonaciones:1001", 1001, b"v1", 60)
+        await backend.set("resumen:1001", 1001, b"v1", 60)
+        await backend.set("condonaciones:1002", 1002, b"v1", 60)
+
+        assert await backend.invalidar_credito(1001) == 2
+        assert await backend.get("condonaciones:1001") is None
+        assert "t:credito:1001" not in client.valores
+        assert await backend.get("condonaciones:1002") == b"v1"
+
+    asyncio.run(prueba())
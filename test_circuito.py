@@ -0,0 +1,191 @@
+"""
+Pruebas del circuit breaker de MySQL
+
+Usan un reloj falso y, para get_db_connection, un pool con conexiones
+falsas en lugar de MySQL.
+"""
+
+import time
+
+import pymysql
+import pytest
+
+import config.database as database
+from config.database import (
+    CircuitBreaker,
+    CircuitoAbiertoError,
+    ConnectionPool,
+    ConsultaExcedidaError,
+    PoolTimeoutError,
+    get_db_connection
+)
+
+
+class Reloj:
+    """Módulo time con monotonic controlado por la prueba"""
+
+    def __init__(self, ahora: list):
+        self.ahora = ahora
+
+    def monotonic(self) -> float:
+        return self.ahora[0]
+
+    def __getattr__(self, nombre):
+        return getattr(time, nombre)
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(database, "time", Reloj(ahora))
+    return ahora
+
+
+def caida() -> Exception:
+    return pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+
+
+def abrir(circuito: CircuitBreaker) -> None:
+    for _ in range(circuito.fallos):
+        circuito.permitir()
+        circuito.registrar(caida())
+
+
+def test_se_abre_tras_fallos_seguidos(reloj):
+    circuito = CircuitBreaker(fallos=3, espera=10)
+    for _ in range(2):
+        circuito.permitir()
+        circuito.registrar(caida())
+    # Un éxito reinicia la cuenta
+    circuito.permitir()
+    circuito.registrar()
+    assert circuito.stats()["fallos_consecutivos"] == 0
+
+    abrir(circuito)
+    assert circuito.estado == CircuitBreaker.ABIERTO
+
+    reloj[0] += 4
+    with pytest.raises(CircuitoAbiertoError) as error:
+        circuito.permitir()
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == "6"
+    with pytest.raises(CircuitoAbiertoError):
+        circuito.verificar()
+    assert circuito.stats()["rechazos"] == 2
+
+
+def test_errores_que_no_son_de_disponibilidad_no_cuentan(reloj):
+    circuito = CircuitBreaker(fallos=1, espera=10)
+    for error in (
+        pymysql.err.ProgrammingError(1064, "syntax"),
+        pymysql.err.OperationalError(database.ER_QUERY_TIMEOUT, "max_execution_time exceeded"),
+        ValueError("fila inválida"),
+    ):
+        circuito.permitir()
+        circuito.registrar(error)
+    assert circuito.estado == CircuitBreaker.CERRADO
+
+    circuito.permitir()
+    circuito.registrar(PoolTimeoutError("pool agotado"))
+    assert circuito.estado == CircuitBreaker.ABIERTO
+
+
+def test_semiabierto_deja_pasar_una_sola_prueba(reloj):
+    circuito = CircuitBreaker(fallos=1, espera=10)
+    abrir(circuito)
+    reloj[0] += 10
+
+    # verificar no reserva la prueba
+    circuito.verificar()
+    circuito.permitir()
+    assert circuito.estado == CircuitBreaker.SEMIABIERTO
+    with pytest.raises(CircuitoAbiertoError):
+        circuito.permitir()
+    with pytest.raises(CircuitoAbiertoError):
+        circuito.verificar()
+
+    # La prueba responde: se cierra
+    circuito.registrar()
+    assert circuito.estado == CircuitBreaker.CERRADO
+    circuito.permitir()
+    circuito.registrar()
+
+
+def test_prueba_fallida_reabre_por_otra_espera(reloj):
+    circuito = CircuitBreaker(fallos=3, espera=10)
+    abrir(circuito)
+    reloj[0] += 10
+    circuito.permitir()
+    # Basta un fallo de la prueba, sin esperar otros `fallos`
+    circuito.registrar(caida())
+    assert circuito.estado == CircuitBreaker.ABIERTO
+    assert circuito.stats()["aperturas"] == 2
+    assert circuito.stats()["reintentar_en_s"] == 10
+
+    reloj[0] += 10
+    circuito.permitir()
+    circuito.registrar()
+    assert circuito.estado == CircuitBreaker.CERRADO
+
+
+def test_omitir_libera_la_prueba_sin_decidir(reloj):
+    circuito = CircuitBreaker(fallos=1, espera=10)
+    abrir(circuito)
+    reloj[0] += 10
+    circuito.permitir()
+    circuito.omitir()
+    assert circuito.estado == CircuitBreaker.SEMIABIERTO
+    circuito.permitir()
+    circuito.registrar()
+    assert circuito.estado == CircuitBreaker.CERRADO
+
+
+def test_deshabilitado_nunca_se_abre(reloj):
+    circuito = CircuitBreaker(fallos=1, espera=10, enabled=False)
+    abrir(circuito)
+    circuito.permitir()
+    assert circuito.estado == CircuitBreaker.CERRADO
+
+
+class ConexionFalsa:
+    open = True
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def pool(monkeypatch, reloj):
+    monkeypatch.setattr(database, "circuito", CircuitBreaker(fallos=2, espera=10))
+    return ConnectionPool("prueba", 1, 0, 1, 3600, False, factory=lambda db: ConexionFalsa())
+
+
+def usar(pool, error):
+    with get_db_connection(pool=pool):
+        raise error
+
+
+def test_get_db_connection_tiempo_excedido_conserva_conexion_y_circuito(pool):
+    for _ in range(3):
+        with pytest.raises(ConsultaExcedidaError) as error:
+            usar(pool, pymysql.err.OperationalError(database.ER_QUERY_TIMEOUT, "max_execution_time exceeded"))
+        assert error.value.status_code == 504
+    assert database.circuito.estado == CircuitBreaker.CERRADO
+    stats = pool.stats()
+    assert stats["creadas"] == 1 and stats["descartadas"] == 0 and stats["en_uso"] == 0
+
+
+def test_get_db_connection_caidas_descartan_y_abren(pool):
+    for _ in range(2):
+        with pytest.raises(pymysql.err.OperationalError):
+            usar(pool, caida())
+    assert database.circuito.estado == CircuitBreaker.ABIERTO
+    assert pool.stats()["descartadas"] == 2
+    assert pool.stats()["en_uso"] == 0
+
+    with pytest.raises(CircuitoAbiertoError):
+        with get_db_connection(pool=pool):
+            pass
@@ -0,0 +1,107 @@
+"""
+Pruebas de la invalidación de la caché por cambios
+
+Usan FuenteMemoria en lugar de la base de datos y la caché en memoria.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from services.cache import MemoryCacheBackend, ResponseCache, VARIANTE_CONDONACIONES, VARIANTE_RESUMEN
+from services.invalidacion import FuenteMarcaAgua, FuenteMemoria, InvalidadorCache
+
+
+def crear_invalidador():
+    cache = ResponseCache(MemoryCacheBackend(100, 1024 * 1024), ttl=3600)
+    fuente = FuenteMemoria()
+    return cache, fuente, InvalidadorCache(cache, fuente, enabled=True, intervalo=1)
+
+
+async def poblar(cache, *ids_credito):
+    for id_credito in ids_credito:
+        for variante in (VARIANTE_CONDONACIONES, VARIANTE_RESUMEN):
+            async def cargar():
+                return b"v1"
+            await cache.obtener(variante, id_credito, cargar)
+
+
+async def en_cache(cache, variante, id_credito) -> bool:
+    cargas = []
+
+    async def cargar():
+        cargas.append(1)
+        return b"v2"
+
+    await cache.obtener(variante, id_credito, cargar)
+    return not cargas
+
+
+def test_invalida_solo_los_creditos_modificados():
+    async def prueba():
+        cache, fuente, invalidador = crear_invalidador()
+        await poblar(cache, 1001, 1002)
+        fuente.publicar(1001, 1001)
+
+        assert await invalidador.procesar() == [1001]
+        assert invalidador.entradas_eliminadas == 2
+        assert not await en_cache(cache, VARIANTE_CONDONACIONES, 1001)
+        assert await en_cache(cache, VARIANTE_RESUMEN, 1002)
+
+    asyncio.run(prueba())
+
+
+def test_segunda_invalidacion_en_la_lectura_siguiente():
+    async def prueba():
+        cache, fuente, invalidador = crear_invalidador()
+        fuente.publicar(1001)
+        await invalidador.procesar()
+
+        # Una carga que empezó antes del cambio guarda la versión anterior
+        await poblar(cache, 1001)
+        assert await invalidador.procesar() == []
+        assert not await en_cache(cache, VARIANTE_CONDONACIONES, 1001)
+
+        # Después ya no se vuelve a invalidar
+        await poblar(cache, 1001)
+        await invalidador.procesar()
+        assert await en_cache(cache, VARIANTE_CONDONACIONES, 1001)
+
+    asyncio.run(prueba())
+
+
+def test_refresca_los_creditos_modificados():
+    async def prueba():
+        cache, fuente, invalidador = crear_invalidador()
+        refrescados = []
+
+        async def refrescar(ids_credito):
+            refrescados.extend(ids_credito)
+            return len(ids_credito)
+
+        fuente.publicar(1003, 1004)
+        await invalidador.procesar(refrescar)
+        assert refrescados == [1003, 1004]
+        assert invalidador.refrescadas == 2
+
+    asyncio.run(prueba())
+
+
+def test_marca_de_agua_no_repite_cambios_del_margen():
+    fuente = FuenteMarcaAgua("fecha_condonacion", margen=5)
+    t0 = datetime(2025, 3, 1, 10, 0)
+    fuente.marca = t0
+
+    filas = [
+        {"id_credito": 1001, "marca": t0 + timedelta(seconds=1)},
+        {"id_credito": 1002, "marca": t0 + timedelta(seconds=2)},
+    ]
+    assert fuente._nuevos(filas, t0 + timedelta(seconds=2)) == [1001, 1002]
+    assert fuente.marca == t0 + timedelta(seconds=2)
+
+    # Misma ventana más un cambio confirmado tarde con fecha anterior al tope
+    filas.append({"id_credito": 1003, "marca": t0 + timedelta(seconds=1)})
+    assert fuente._nuevos(filas, t0 + timedelta(seconds=2)) == [1003]
+
+    # Un cambio nuevo en un crédito ya reportado
+    filas[0] = {"id_credito": 1001, "marca": t0 + timedelta(seconds=3)}
+    assert fuente._nuevos(filas, t0 + timedelta(seconds=3)) == [1001]
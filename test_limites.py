@@ -0,0 +1,170 @@
+"""
+Pruebas de los límites de peticiones por API Key
+
+Usan el backend en memoria con un reloj falso; el backend de Redis se
+prueba con un cliente falso en memoria.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from config.security import ClienteApiKey
+from services import limites
+from services.limites import LimitadorPeticiones, MemoryLimitesBackend, RedisLimitesBackend
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(limites, "time", SimpleNamespace(monotonic=lambda: ahora[0], time=lambda: ahora[0]))
+    return ahora
+
+
+def cliente(nombre="php", **limites_cliente) -> ClienteApiKey:
+    return ClienteApiKey(nombre, b"", **limites_cliente)
+
+
+def crear_limitador(por_segundo=2, burst=3, max_en_vuelo=0, enabled=True):
+    return LimitadorPeticiones(MemoryLimitesBackend(), por_segundo, burst, max_en_vuelo, enabled)
+
+
+async def adquirir_y_liberar(limitador, cliente_api):
+    permiso = await limitador.adquirir(cliente_api)
+    await permiso.liberar()
+
+
+def test_cubeta_permite_rafaga_y_se_rellena(reloj):
+    async def prueba():
+        limitador = crear_limitador(por_segundo=2, burst=3)
+        for _ in range(3):
+            await adquirir_y_liberar(limitador, cliente())
+
+        with pytest.raises(HTTPException) as error:
+            await limitador.adquirir(cliente())
+        assert error.value.status_code == 429
+        assert error.value.headers["Retry-After"] == "1"
+
+        # A 2 tokens por segundo, medio segundo rellena uno solo
+        reloj[0] += 0.5
+        await adquirir_y_liberar(limitador, cliente())
+        with pytest.raises(HTTPException):
+            await limitador.adquirir(cliente())
+
+        # La cubeta nunca pasa de burst
+        reloj[0] += 60
+        for _ in range(3):
+            await adquirir_y_liberar(limitador, cliente())
+        with pytest.raises(HTTPException):
+            await limitador.adquirir(cliente())
+
+    asyncio.run(prueba())
+
+
+def test_cubetas_independientes_y_limites_por_cliente(reloj):
+    async def prueba():
+        limitador = crear_limitador(por_segundo=1, burst=1)
+        await adquirir_y_liberar(limitador, cliente("a"))
+        await adquirir_y_liberar(limitador, cliente("b"))
+        with pytest.raises(HTTPException):
+            await limitador.adquirir(cliente("a"))
+
+        # rate_limit y burst propios del cliente sustituyen a los de RATE_LIMIT_*
+        propio = cliente("c", rate_limit=0.1, burst=5)
+        for _ in range(5):
+            await adquirir_y_liberar(limitador, propio)
+        with pytest.raises(HTTPException) as error:
+            await limitador.adquirir(propio)
+        assert error.value.headers["Retry-After"] == "10"
+
+        # rate_limit=0 desactiva la tasa del cliente
+        for _ in range(50):
+            await adquirir_y_liberar(limitador, cliente("d", rate_limit=0))
+
+    asyncio.run(prueba())
+
+
+def test_maximo_en_vuelo_y_liberacion_unica(reloj):
+    async def prueba():
+        limitador = crear_limitador(por_segundo=0, max_en_vuelo=2)
+        primero = await limitador.adquirir(cliente())
+        segundo = await limitador.adquirir(cliente())
+        with pytest.raises(HTTPException) as error:
+            await limitador.adquirir(cliente())
+        assert error.value.status_code == 429
+
+        # Liberar dos veces no devuelve dos lugares
+        await primero.liberar()
+        await primero.liberar()
+        tercero = await limitador.adquirir(cliente())
+        with pytest.raises(HTTPException):
+            await limitador.adquirir(cliente())
+
+        await segundo.liberar()
+        await tercero.liberar()
+        assert limitador.stats()["en_vuelo"] == {}
+
+        # max_en_vuelo=0 en el cliente lo deja sin límite
+        permisos = [await limitador.adquirir(cliente("sin", max_en_vuelo=0)) for _ in range(10)]
+        assert all(permiso.backend is None for permiso in permisos)
+
+    asyncio.run(prueba())
+
+
+def test_permiso_transferido_libera_al_terminar_el_cuerpo(reloj):
+    async def prueba():
+        limitador = crear_limitador(por_segundo=0, max_en_vuelo=1)
+        permiso = await limitador.adquirir(cliente())
+        transferido = permiso.transferir()
+
+        # La dependencia termina antes de enviar el cuerpo: no libera nada
+        await permiso.liberar()
+        with pytest.raises(HTTPException):
+            await limitador.adquirir(cliente())
+
+        await transferido.liberar()
+        await adquirir_y_liberar(limitador, cliente())
+
+    asyncio.run(prueba())
+
+
+def test_deshabilitado_no_limita(reloj):
+    async def prueba():
+        limitador = crear_limitador(por_segundo=1, burst=1, max_en_vuelo=1, enabled=False)
+        permisos = [await limitador.adquirir(cliente()) for _ in range(5)]
+        assert all(permiso.backend is None for permiso in permisos)
+
+    asyncio.run(prueba())
+
+
+class RedisFalso:
+    """incr/decr/expire de redis.asyncio en memoria"""
+
+    def __init__(self):
+        self.valores = {}
+
+    async def incr(self, llave):
+        self.valores[llave] = self.valores.get(llave, 0) + 1
+        return self.valores[llave]
+
+    async def decr(self, llave):
+        self.valores[llave] = self.valores.get(llave, 0) - 1
+        return self.valores[llave]
+
+    async def expire(self, llave, segundos):
+        return True
+
+
+def test_en_vuelo_en_redis_revierte_el_incremento_rechazado():
+    async def prueba():
+        client = RedisFalso()
+        backend = RedisLimitesBackend(client, prefijo="t:")
+        assert await backend.entrar("php", 1)
+        assert not await backend.entrar("php", 1)
+        assert client.valores["t:en_vuelo:php"] == 1
+        await backend.salir("php")
+        assert await backend.entrar("php", 1)
+
+    asyncio.run(prueba())
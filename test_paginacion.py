@@ -0,0 +1,80 @@
+"""
+Pruebas de la paginación por cursor del detalle de gastos
+
+Ejecutan la consulta generada sobre una tabla gastos_cobranza en SQLite.
+"""
+
+import re
+import sqlite3
+from datetime import date
+
+import pytest
+
+from services.condonaciones import FiltroGastos, _sql_gastos, codificar_cursor, decodificar_cursor
+
+ID_CREDITO = 1001
+
+# (id, periodo_inicio, parcialidad): parcialidades repetidas y NULL en la
+# misma fecha, de modo que caen en los bordes de página con limit=2
+GASTOS = [
+    (1, date(2026, 1, 5), "1/52"),
+    (2, date(2026, 1, 5), "1/52"),
+    (3, date(2026, 1, 5), None),
+    (4, date(2026, 1, 5), "1/52"),
+    (5, date(2026, 1, 5), None),
+    (6, date(2026, 1, 12), "2/52"),
+    (7, date(2026, 1, 12), None),
+    (8, date(2026, 1, 19), "3/52"),
+]
+
+
+@pytest.fixture
+def conexion():
+    sqlite3.register_adapter(date, date.isoformat)
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = lambda cursor, row: {columna[0]: valor for columna, valor in zip(cursor.description, row)}
+    conn.execute("""
+        CREATE TABLE gastos_cobranza (
+            id INTEGER PRIMARY KEY, Id_credito INTEGER, periodo_inicio TEXT, periodo_fin TEXT,
+            SEMANA TEXT, parcialidad TEXT, monto_valor REAL, cuota REAL, condonado INTEGER,
+            fecha_condonacion TEXT
+        )
+    """)
+    conn.executemany(
+        "INSERT INTO gastos_cobranza (id, Id_credito, periodo_inicio, parcialidad, condonado) VALUES (?, ?, ?, ?, 1)",
+        [(id_gasto, ID_CREDITO, periodo_inicio, parcialidad) for id_gasto, periodo_inicio, parcialidad in GASTOS]
+    )
+    yield conn
+    conn.close()
+
+
+def recorrer(conn, orden: str, limite: int) -> list:
+    """IDs de gasto de todas las páginas, siguiendo el cursor como la API"""
+    ids, despues_de = [], None
+    while True:
+        filtro = FiltroGastos(orden=orden, limite=limite + 1, despues_de=despues_de)
+        parametros = [ID_CREDITO, *filtro.parametros(), filtro.limite]
+        rows = conn.execute(_sql_gastos(filtro.forma()).replace("%s", "?"), parametros).fetchall()
+        pagina = rows[:limite]
+        ids.extend(row["id_gasto"] for row in pagina)
+        if len(rows) <= limite:
+            return ids
+        despues_de = decodificar_cursor(codificar_cursor(pagina[-1]))
+
+
+@pytest.mark.parametrize("limite", [1, 2, 3])
+def test_cursor_no_omite_parcialidades_repetidas_ni_nulas(conexion, limite):
+    ascendente = recorrer(conexion, "asc", limite)
+    assert sorted(ascendente) == [id_gasto for id_gasto, _, _ in GASTOS]
+    assert ascendente == [3, 5, 1, 2, 4, 7, 6, 8]
+    assert recorrer(conexion, "desc", limite) == ascendente[::-1]
+
+
+def test_sin_paginar_no_usa_la_clave_primaria():
+    """Solo las consultas con limit o cursor dependen de GASTOS_COLUMNA_ID"""
+    from services.condonaciones import COLUMNA_ID_GASTO, _sql_condonacion, _sql_gastos_lote
+
+    filtro = FiltroGastos(estado="todos")
+    for sql in (_sql_gastos(filtro.forma()), _sql_condonacion(filtro.forma()), _sql_gastos_lote(filtro.forma(), 3)):
+        assert not re.search(rf"\b{re.escape(COLUMNA_ID_GASTO[1])}\b", sql)
+    assert re.search(rf"\b{re.escape(COLUMNA_ID_GASTO[1])}\b", _sql_gastos(FiltroGastos(limite=10).forma()))
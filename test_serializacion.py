@@ -0,0 +1,197 @@
+"""
+Pruebas de paridad de la serialización rápida
+
+Verifican que utils/serializacion.py produce exactamente el mismo JSON que los
+modelos Pydantic de models/condonaciones.py, que son el contrato de la API.
+"""
+
+import random
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from models.condonaciones import (
+    BatchCondonacionResponse,
+    CondonacionCobranza,
+    CondonacionResponse,
+    DatosGenerales,
+    DetalleCondonacion,
+    ResultadoCredito
+)
+from utils.serializacion import dumps, resultado_credito, serializar_condonacion
+
+
+def respuesta_pydantic(mensaje, datos_generales_row, detalles_rows) -> bytes:
+    """JSON generado por la ruta Pydantic"""
+    return CondonacionResponse(
+        status_code=200,
+        status_message="OK",
+        success=True,
+        mensaje=mensaje,
+        datos_generales=DatosGenerales(**datos_generales_row),
+        condonacion_cobranza=CondonacionCobranza(
+            detalle=[DetalleCondonacion(**row) for row in detalles_rows]
+        )
+    ).model_dump_json().encode()
+
+
+def fila_datos_generales(rnd: random.Random) -> dict:
+    """Fila de datos generales con los tipos que entrega pymysql"""
+    return {
+        "id_credito": rnd.randint(1, 999999999),
+        "nombre_cliente": rnd.choice(["Juan Pérez García", "María Ñúñez", "", None]),
+        "id_cliente": rnd.choice([rnd.randint(1, 10**6), None]),
+        "domicilio_completo": rnd.choice(["Calle Principal #123, Col. Centro", "Av. \"Reforma\" 1\n", None]),
+        "bucket_morosidad": rnd.choice(["B0", "B2", "B7+", None]),
+        "dias_mora": rnd.choice([0, rnd.randint(1, 900), Decimal(15), None]),
+        "saldo_vencido": rnd.choice([
+            Decimal("3500.00"),
+            Decimal(str(round(rnd.uniform(0, 10**7), 2))),
+            rnd.uniform(0, 10**7),
+            0,
+            None
+        ]),
+    }
+
+
+def fila_detalle(rnd: random.Random) -> dict:
+    """Fila de gastos_cobranza con los tipos que entrega pymysql"""
+    inicio = date(2020, 1, 1) + timedelta(days=rnd.randint(0, 3000))
+    return {
+        "periodoinicio": rnd.choice([inicio, None]),
+        "periodofin": rnd.choice([inicio + timedelta(days=6), datetime(inicio.year, inicio.month, inicio.day), None]),
+        "semana": rnd.choice([f"{inicio.year}-{rnd.randint(1, 52):02d}", rnd.randint(1, 52), Decimal(7), None]),
+        "parcialidad": rnd.choice([f"{rnd.randint(1, 52)}/52", rnd.randint(1, 52), b"3/52", None]),
+        "monto_valor": rnd.choice([
+            Decimal(str(round(rnd.uniform(0, 5000), 2))),
+            Decimal("0.10"),
+            150,
+            rnd.uniform(0, 1e9),
+            1e-7,
+            None
+        ]),
+        "cuota": rnd.choice([Decimal("150.00"), 150.5, 0, None]),
+        "condonado": rnd.choice([0, 1, True, None]),
+        "fecha_condonacion": rnd.choice([
+            datetime(2026, 1, 28, 10, 30),
+            datetime(2026, 1, 28, 10, 30, 0, 123400),
+            datetime(2026, 1, 28, 10, 30, tzinfo=timezone.utc),
+            datetime(2026, 1, 28, 10, 30, tzinfo=timezone(timedelta(hours=-6))),
+            date(2026, 1, 28),
+            None
+        ]),
+    }
+
+
+@pytest.mark.parametrize("semilla", range(200))
+def test_condonacion_identica_a_pydantic(semilla):
+    """La respuesta rápida es idéntica byte a byte a la de Pydantic"""
+    rnd = random.Random(semilla)
+    datos_generales_row = fila_datos_generales(rnd)
+    detalles_rows = [fila_detalle(rnd) for _ in range(rnd.randint(0, 40))]
+    mensaje = f"Se encontraron {len(detalles_rows)} gastos condonados"
+
+    assert serializar_condonacion(mensaje, datos_generales_row, detalles_rows) == \
+        respuesta_pydantic(mensaje, datos_generales_row, detalles_rows)
+
+
+def test_detalle_vacio():
+    """Sin gastos el detalle es un arreglo vacío"""
+    datos_generales_row = fila_datos_generales(random.Random(0))
+    mensaje = "No hay gastos condonados para este crédito"
+
+    assert serializar_condonacion(mensaje, datos_generales_row, []) == \
+        respuesta_pydantic(mensaje, datos_generales_row, [])
+
+
+def test_lote_identico_a_pydantic():
+    """Los resultados por crédito del lote coinciden con ResultadoCredito"""
+    rnd = random.Random(42)
+    resultados = [
+        (1, 200, "Se encontraron 2 gastos de cobranza", fila_datos_generales(rnd), [fila_detalle(rnd), fila_detalle(rnd)]),
+        (2, 404, "No se encontró información del crédito 2. Verifica que el ID sea correcto.", None, None),
+        (3, 400, "El ID del crédito debe ser mayor a 0", None, None),
+    ]
+
+    rapido = dumps({
+        "status_code": 200,
+        "status_message": "OK",
+        "success": True,
+        "mensaje": "Se consultaron 3 créditos: 1 encontrados, 2 no encontrados",
+        "total_encontrados": 1,
+        "total_no_encontrados": 2,
+        "resultados": [resultado_credito(*resultado) for resultado in resultados]
+    })
+    pydantic = BatchCondonacionResponse(
+        mensaje="Se consultaron 3 créditos: 1 encontrados, 2 no encontrados",
+        total_encontrados=1,
+        total_no_encontrados=2,
+        resultados=[
+            ResultadoCredito(
+                id_credito=id_credito,
+                status_code=status_code,
+                mensaje=mensaje,
+                datos_generales=DatosGenerales(**datos) if datos is not None else None,
+                condonacion_cobranza=CondonacionCobranza(
+                    detalle=[DetalleCondonacion(**row) for row in detalles]
+                ) if detalles is not None else None
+            )
+            for id_credito, status_code, mensaje, datos, detalles in resultados
+        ]
+    ).model_dump_json().encode()
+
+    assert rapido == pydantic
+
+
+def test_fecha_con_hora_rechazada():
+    """Igual que Pydantic, una fecha con hora distinta de cero no es válida"""
+    datos_generales_row = fila_datos_generales(random.Random(1))
+    detalles_rows = [{"periodoinicio": datetime(2026, 1, 1, 3, 0)}]
+
+    with pytest.raises(ValueError):
+        respuesta_pydantic("", datos_generales_row, detalles_rows)
+    with pytest.raises(ValueError):
+        serializar_condonacion("", datos_generales_row, detalles_rows)
+
+
+@pytest.mark.parametrize("semilla", range(50))
+def test_proyeccion_y_cursor_identicos_a_pydantic(semilla):
+    """Con fields y paginación la respuesta rápida sigue coincidiendo con Pydantic"""
+    rnd = random.Random(semilla)
+    datos_generales_row = fila_datos_generales(rnd)
+    detalles_rows = [fila_detalle(rnd) for _ in range(rnd.randint(0, 10))]
+    todos = list(DetalleCondonacion.model_fields)
+    campos = tuple(campo for campo in todos if rnd.random() < 0.5) or ("monto_valor",)
+    siguiente_cursor = rnd.choice(["WyIyMDI2LTAxLTAxIiwgIjEvNTIiXQ", None])
+    filas = [{campo: row[campo] for campo in campos} for row in detalles_rows]
+
+    pydantic = CondonacionResponse(
+        mensaje="",
+        datos_generales=DatosGenerales(**datos_generales_row),
+        condonacion_cobranza=CondonacionCobranza(
+            detalle=[DetalleCondonacion(**row) for row in filas],
+            siguiente_cursor=siguiente_cursor
+        )
+    ).model_dump_json(
+        exclude={"condonacion_cobranza": {"detalle": {"__all__": set(todos) - set(campos)}}}
+    ).encode()
+
+    assert serializar_condonacion("", datos_generales_row, filas, campos, siguiente_cursor) == pydantic
+
+
+def test_cursor_ida_y_vuelta():
+    """El cursor recupera la clave (periodo_inicio, parcialidad, id_gasto) de la fila"""
+    from services.condonaciones import codificar_cursor, decodificar_cursor
+
+    for row in (
+        {"periodoinicio": date(2026, 1, 5), "parcialidad": "12/52", "id_gasto": 7},
+        {"periodoinicio": datetime(2026, 1, 5, 8, 0), "parcialidad": 12, "id_gasto": 8},
+        {"periodoinicio": None, "parcialidad": None, "id_gasto": 9},
+    ):
+        cursor = codificar_cursor(row)
+        assert "=" not in cursor
+        assert decodificar_cursor(cursor) == (row["periodoinicio"], row["parcialidad"], row["id_gasto"])
+
+    with pytest.raises(ValueError):
+        decodificar_cursor("no-es-un-cursor")
@@ -0,0 +1,60 @@
+"""
+Pruebas de la actualización del índice de datos generales
+
+Usan un constructor falso en lugar de leer tbl_segundometro_semana.
+"""
+
+from services.snapshot import IndiceDatosGenerales, IndiceSnapshot
+
+
+def crear_snapshot():
+    construidos = []
+
+    def construir(semana, marca):
+        construidos.append(marca)
+        return IndiceDatosGenerales(semana, marca)
+
+    return IndiceSnapshot(enabled=True, intervalo=1), construir, construidos
+
+
+def test_primera_construccion_inmediata_y_sin_cambios_no_reconstruye():
+    snapshot, construir, construidos = crear_snapshot()
+    assert snapshot._aplicar_marca((202610, 500, None), construir)
+    assert not snapshot._aplicar_marca((202610, 500, None), construir)
+    assert not snapshot._aplicar_marca(None, construir)
+    assert construidos == [(202610, 500, None)]
+
+
+def test_carga_en_curso_se_reconstruye_al_estabilizarse():
+    snapshot, construir, construidos = crear_snapshot()
+    # La API arranca a mitad de la carga semanal
+    snapshot._aplicar_marca((202611, 100, None), construir)
+
+    # Mientras las filas siguen llegando se espera
+    assert not snapshot._aplicar_marca((202611, 300, None), construir)
+    assert not snapshot._aplicar_marca((202611, 500, None), construir)
+    assert snapshot.stats()["carga_pendiente"]
+
+    # Un intervalo sin cambios: se completa el índice una sola vez
+    assert snapshot._aplicar_marca((202611, 500, None), construir)
+    assert not snapshot._aplicar_marca((202611, 500, None), construir)
+    assert construidos == [(202611, 100, None), (202611, 500, None)]
+    assert not snapshot.stats()["carga_pendiente"]
+
+
+def test_correccion_con_las_mismas_filas_por_fecha_de_carga():
+    snapshot, construir, construidos = crear_snapshot()
+    snapshot._aplicar_marca((202611, 500, "2026-03-16 02:00"), construir)
+    snapshot._aplicar_marca((202611, 500, "2026-03-18 10:00"), construir)
+    assert snapshot._aplicar_marca((202611, 500, "2026-03-18 10:00"), construir)
+    assert construidos[-1] == (202611, 500, "2026-03-18 10:00")
+
+
+def test_pendiente_que_vuelve_a_la_marca_vigente_se_descarta():
+    snapshot, construir, construidos = crear_snapshot()
+    snapshot._aplicar_marca((202611, 500, None), construir)
+    snapshot._aplicar_marca((202612, 10, None), construir)
+    assert not snapshot._aplicar_marca((202611, 500, None), construir)
+    # La marca nueva vuelve a esperar un intervalo completo
+    assert not snapshot._aplicar_marca((202612, 10, None), construir)
+    assert len(construidos) == 1
@@ -3,6 +3,7 @@ Utilidades para la API
 """
 
 from .validations import validar_id_credito, validar_datos_encontrados
+from .singleflight import SingleFlight
 
-__all__ = ['validar_id_credito', 'validar_datos_encontrados']
+__all__ = ['validar_id_credito', 'validar_datos_encontrados', 'SingleFlight']
 
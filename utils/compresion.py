@@ -0,0 +1,217 @@
+"""
+Compresión de respuestas (gzip, brotli y zstd)
+
+La codificación se negocia con Accept-Encoding entre las disponibles: gzip
+siempre; brotli y zstd si están instalados los paquetes `brotli` y
+`zstandard`. Las respuestas menores que COMPRESION_MIN_BYTES se envían sin
+comprimir.
+
+Las rutas por crédito comprimen en el router y guardan el resultado en la
+caché de respuestas; `CompresionMiddleware` comprime el resto (lotes,
+exportación, errores) y deja pasar las respuestas que ya traen
+Content-Encoding.
+"""
+
+import os
+import zlib
+from typing import Dict, List, Optional
+import anyio
+from dotenv import load_dotenv
+from starlette.datastructures import Headers, MutableHeaders
+
+load_dotenv()
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class CompresionConfig:
+    """Configuración de la compresión de respuestas"""
+
+    ENABLED = os.getenv("COMPRESION_ENABLED", "True").lower() == "true"
+    MIN_BYTES = int(os.getenv("COMPRESION_MIN_BYTES", "1024"))
+    # Orden de preferencia cuando el cliente acepta varias
+    ALGORITMOS = [a.strip() for a in os.getenv("COMPRESION_ALGORITMOS", "zstd,br,gzip").split(",") if a.strip()]
+    GZIP_NIVEL = int(os.getenv("COMPRESION_GZIP_NIVEL", "6"))
+    BROTLI_NIVEL = int(os.getenv("COMPRESION_BROTLI_NIVEL", "5"))
+    ZSTD_NIVEL = int(os.getenv("COMPRESION_ZSTD_NIVEL", "3"))
+    # Cuerpos mayores se comprimen en un hilo para no bloquear el event loop
+    HILO_MIN_BYTES = int(os.getenv("COMPRESION_HILO_MIN_BYTES", str(256 * 1024)))
+
+
+def _disponible(codificacion: str) -> bool:
+    if codificacion == "br":
+        return brotli is not None
+    if codificacion == "zstd":
+        return zstandard is not None
+    return codificacion == "gzip"
+
+
+CODIFICACIONES = [codificacion for codificacion in CompresionConfig.ALGORITMOS if _disponible(codificacion)]
+
+# Tipos de contenido que vale la pena comprimir
+_TIPOS_COMPRIMIBLES = ("application/json", "application/x-ndjson", "text/")
+
+
+def elegir_codificacion(accept_encoding: Optional[str], tamano: Optional[int] = None) -> Optional[str]:
+    """
+    Codificación a usar según Accept-Encoding, o None para enviar sin comprimir.
+
+    Args:
+        accept_encoding: Valor de la cabecera (p. ej. "gzip, br;q=0.9")
+        tamano: Bytes del cuerpo, si se conocen
+    """
+    if not CompresionConfig.ENABLED or not accept_encoding or not CODIFICACIONES:
+        return None
+    if tamano is not None and tamano < CompresionConfig.MIN_BYTES:
+        return None
+
+    aceptadas: Dict[str, float] = {}
+    for parte in accept_encoding.lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        aceptadas[nombre.strip()] = calidad
+
+    comodin = aceptadas.get("*", 0.0)
+    mejor, mejor_calidad = None, 0.0
+    for codificacion in CODIFICACIONES:
+        calidad = aceptadas.get(codificacion, comodin)
+        if calidad > mejor_calidad:
+            mejor, mejor_calidad = codificacion, calidad
+    return mejor
+
+
+class Compresor:
+    """Compresor incremental para respuestas en streaming"""
+
+    def __init__(self, codificacion: str):
+        self.codificacion = codificacion
+        if codificacion == "br":
+            self._compresor = brotli.Compressor(quality=CompresionConfig.BROTLI_NIVEL)
+        elif codificacion == "zstd":
+            self._compresor = zstandard.ZstdCompressor(level=CompresionConfig.ZSTD_NIVEL).compressobj()
+        else:
+            # wbits=31: formato gzip
+            self._compresor = zlib.compressobj(CompresionConfig.GZIP_NIVEL, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        """Comprime un bloque y vacía el compresor para poder enviarlo ya"""
+        if self.codificacion == "br":
+            return self._compresor.process(datos) + self._compresor.flush()
+        if self.codificacion == "zstd":
+            return self._compresor.compress(datos) + self._compresor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._compresor.compress(datos) + self._compresor.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminar(self) -> bytes:
+        if self.codificacion == "br":
+            return self._compresor.finish()
+        return self._compresor.flush()
+
+
+def comprimir(contenido: bytes, codificacion: str) -> bytes:
+    """Comprime un cuerpo completo"""
+    if codificacion == "br":
+        return brotli.compress(contenido, quality=CompresionConfig.BROTLI_NIVEL)
+    if codificacion == "zstd":
+        return zstandard.ZstdCompressor(level=CompresionConfig.ZSTD_NIVEL).compress(contenido)
+    compresor = zlib.compressobj(CompresionConfig.GZIP_NIVEL, zlib.DEFLATED, 31)
+    return compresor.compress(contenido) + compresor.flush()
+
+
+async def comprimir_async(contenido: bytes, codificacion: str) -> bytes:
+    """Comprime un cuerpo completo; los grandes en un hilo"""
+    if len(contenido) >= CompresionConfig.HILO_MIN_BYTES:
+        return await anyio.to_thread.run_sync(comprimir, contenido, codificacion)
+    return comprimir(contenido, codificacion)
+
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI que comprime las respuestas que no vienen comprimidas.
+
+    Si la respuesta llega en un solo mensaje se comprime completa (o se envía
+    tal cual si es menor que el mínimo); si llega en streaming cada bloque se
+    comprime y se envía en cuanto llega.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding"))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio: List[dict] = []
+        estado = {"pasar": False, "compresor": None}
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                headers = Headers(raw=mensaje["headers"])
+                tipo = headers.get("content-type", "")
+                estado["pasar"] = (
+                    "content-encoding" in headers
+                    or mensaje["status"] in (204, 304)
+                    or not tipo.startswith(_TIPOS_COMPRIMIBLES)
+                )
+                if estado["pasar"]:
+                    await send(mensaje)
+                else:
+                    # Las cabeceras dependen de si el cuerpo se comprime
+                    inicio.append(mensaje)
+                return
+
+            if mensaje["type"] != "http.response.body" or estado["pasar"]:
+                await send(mensaje)
+                return
+
+            cuerpo = mensaje.get("body", b"")
+            mas = mensaje.get("more_body", False)
+
+            if estado["compresor"] is None:
+                respuesta = inicio.pop()
+                headers = MutableHeaders(raw=respuesta["headers"])
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                if not mas:
+                    if len(cuerpo) < CompresionConfig.MIN_BYTES:
+                        estado["pasar"] = True
+                        await send(respuesta)
+                        await send(mensaje)
+                        return
+                    cuerpo = await comprimir_async(cuerpo, codificacion)
+                    headers["Content-Encoding"] = codificacion
+                    headers["Content-Length"] = str(len(cuerpo))
+                    estado["pasar"] = True
+                    await send(respuesta)
+                    await send({"type": "http.response.body", "body": cuerpo})
+                    return
+                headers["Content-Encoding"] = codificacion
+                del headers["Content-Length"]
+                estado["compresor"] = Compresor(codificacion)
+                await send(respuesta)
+
+            compresor = estado["compresor"]
+            datos = compresor.comprimir(cuerpo) if cuerpo else b""
+            if not mas:
+                datos += compresor.terminar()
+            await send({"type": "http.response.body", "body": datos, "more_body": mas})
+
+        await self.app(scope, receive, enviar)
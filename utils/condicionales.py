@@ -0,0 +1,35 @@
+"""
+Peticiones condicionales (ETag / If-None-Match)
+
+El ETag es un hash del cuerpo JSON ya serializado: cambia exactamente cuando
+cambia la respuesta. Con la caché de respuestas activa el cuerpo sale de la
+caché, por lo que responder 304 no requiere consultar ni serializar nada.
+Las versiones comprimidas llevan la codificación en el ETag.
+"""
+
+import hashlib
+from typing import Optional
+
+
+def calcular_etag(contenido: bytes) -> str:
+    """ETag fuerte del cuerpo de una respuesta"""
+    return '"' + hashlib.blake2b(contenido, digest_size=16).hexdigest() + '"'
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Compara If-None-Match con el ETag (comparación débil, RFC 9110 13.1.2):
+    acepta listas separadas por comas, `*` y el prefijo W/.
+    """
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def etag_codificado(etag: str, codificacion: Optional[str]) -> str:
+    """ETag de la versión comprimida (cada codificación es otra representación)"""
+    return etag if codificacion is None else etag[:-1] + "-" + codificacion + '"'
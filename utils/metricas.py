@@ -0,0 +1,261 @@
+"""
+Métricas de latencia por ruta y por etapa en formato Prometheus
+
+Registro mínimo de histogramas y contadores con buckets fijos: cada
+observación es una búsqueda binaria y tres sumas bajo un lock, sin crear
+objetos por petición más allá de la tupla de etiquetas. Las etapas que corren
+en hilos (consultas a MySQL) obtienen la ruta de la petición a través de un
+ContextVar, que anyio copia al hilo de trabajo.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class MetricasConfig:
+    """Configuración de las métricas"""
+
+    ENABLED = os.getenv("METRICAS_ENABLED", "True").lower() == "true"
+
+
+# Límites superiores de los buckets
+BUCKETS_SEGUNDOS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_FILAS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000, 10000)
+BUCKETS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def _formato(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: Tuple[str, ...], extra: str = "") -> str:
+    pares = [f'{nombre}="{_escapar(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histograma:
+    """Histograma con buckets fijos por combinación de etiquetas"""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...], buckets: Tuple[float, ...]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # etiquetas -> [conteo por bucket..., +Inf, suma]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observar(self, valor: float, *etiquetas: str) -> None:
+        posicion = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(etiquetas)
+            if serie is None:
+                serie = self._series[etiquetas] = [0] * (len(self.buckets) + 2)
+            serie[posicion] += 1
+            serie[-1] += valor
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = [(etiquetas, list(serie)) for etiquetas, serie in self._series.items()]
+        for etiquetas, serie in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets + (float("inf"),), serie):
+                acumulado += conteo
+                le = 'le="' + _formato(limite) + '"'
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, etiquetas, le)} {acumulado}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, etiquetas)} {serie[-1]}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, etiquetas)} {acumulado}")
+        return lineas
+
+
+class Contador:
+    """Contador monotónico por combinación de etiquetas"""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...]):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._lock = threading.Lock()
+        self._valores: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *etiquetas: str, valor: float = 1) -> None:
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + valor
+
+    def exponer(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            valores = list(self._valores.items())
+        for etiquetas, valor in valores:
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, etiquetas)} {valor}")
+        return lineas
+
+
+class Registro:
+    """Conjunto de métricas expuestas en /metrics"""
+
+    def __init__(self):
+        self._metricas: List = []
+        # Funciones que devuelven (nombre, tipo, ayuda, [(etiquetas, valor), ...]) al exponer
+        self._colectores: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]] = []
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...], buckets: Tuple[float, ...]) -> Histograma:
+        metrica = Histograma(nombre, ayuda, etiquetas, buckets)
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...]) -> Contador:
+        metrica = Contador(nombre, ayuda, etiquetas)
+        self._metricas.append(metrica)
+        return metrica
+
+    def colector(self, funcion) -> None:
+        """Registra valores que se leen al momento de exponer (p. ej. estado del pool)"""
+        self._colectores.append(funcion)
+
+    def exponer(self) -> str:
+        """Texto en formato de exposición de Prometheus (versión 0.0.4)"""
+        lineas: List[str] = []
+        for metrica in self._metricas:
+            lineas.extend(metrica.exponer())
+        for colector in self._colectores:
+            for nombre, tipo, ayuda, muestras in colector():
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+                for etiquetas, valor in muestras:
+                    lineas.append(
+                        f"{nombre}{_etiquetas(tuple(etiquetas), tuple(etiquetas.values()))} {_formato(valor)}"
+                    )
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+
+duracion_peticion = registro.histograma(
+    "condonaciones_request_duration_seconds",
+    "Duración de las peticiones HTTP",
+    ("route", "method", "status"),
+    BUCKETS_SEGUNDOS
+)
+bytes_respuesta = registro.histograma(
+    "condonaciones_response_bytes",
+    "Tamaño del cuerpo de las respuestas",
+    ("route",),
+    BUCKETS_BYTES
+)
+duracion_etapa = registro.histograma(
+    "condonaciones_stage_duration_seconds",
+    "Duración de cada etapa (conexión, consultas, modelos, serialización)",
+    ("route", "stage"),
+    BUCKETS_SEGUNDOS
+)
+filas_consulta = registro.histograma(
+    "condonaciones_db_rows",
+    "Filas devueltas por consulta",
+    ("route", "stage"),
+    BUCKETS_FILAS
+)
+errores_db = registro.contador(
+    "condonaciones_db_errors_total",
+    "Errores de base de datos por tipo",
+    ("route", "error")
+)
+
+
+# Scope ASGI de la petición en curso (la ruta se resuelve después del enrutamiento)
+_scope_actual: ContextVar[Optional[dict]] = ContextVar("scope_metricas", default=None)
+
+
+def ruta_actual() -> str:
+    """Plantilla de la ruta de la petición en curso (p. ej. /api/condonaciones/{id_credito})"""
+    scope = _scope_actual.get()
+    if scope is None:
+        return "-"
+    ruta = scope.get("route")
+    return getattr(ruta, "path_format", None) or getattr(ruta, "path", None) or "sin_ruta"
+
+
+class medir:
+    """
+    Mide la duración de una etapa de la petición en curso.
+
+        with medir("serializacion"):
+            ...
+    """
+
+    __slots__ = ("etapa", "inicio")
+
+    def __init__(self, etapa: str):
+        self.etapa = etapa
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if MetricasConfig.ENABLED:
+            duracion_etapa.observar(time.perf_counter() - self.inicio, ruta_actual(), self.etapa)
+        return False
+
+
+def registrar_filas(etapa: str, cantidad: int) -> None:
+    """Filas devueltas por una consulta de la petición en curso"""
+    if MetricasConfig.ENABLED:
+        filas_consulta.observar(cantidad, ruta_actual(), etapa)
+
+
+def registrar_error_db(error: BaseException) -> None:
+    """Error de base de datos durante la petición en curso"""
+    if MetricasConfig.ENABLED:
+        errores_db.inc(ruta_actual(), type(error).__name__)
+
+
+class MetricasMiddleware:
+    """
+    Middleware ASGI que mide duración, código de estado y bytes de cada
+    petición HTTP. Se implementa directamente sobre ASGI (sin
+    BaseHTTPMiddleware) para no agregar tareas ni copias del cuerpo.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        token = _scope_actual.set(scope)
+        estado = [500, 0]  # código, bytes
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                estado[1] += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            ruta = ruta_actual()
+            duracion_peticion.observar(time.perf_counter() - inicio, ruta, scope["method"], str(estado[0]))
+            bytes_respuesta.observar(estado[1], ruta)
+            _scope_actual.reset(token)
@@ -0,0 +1,230 @@
+"""
+Serialización rápida de respuestas
+
+Convierte las filas de la base de datos directamente a JSON sin construir un
+modelo Pydantic por fila. La salida es idéntica a la de los modelos en
+models/condonaciones.py, que siguen siendo el contrato de la API: las
+conversiones de cada campo se derivan de sus anotaciones de tipo.
+"""
+
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type, Union, get_args
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from models.condonaciones import DatosGenerales, DetalleCondonacion
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson está en requirements.txt
+    orjson = None
+    import json
+
+load_dotenv()
+
+
+class SerializacionConfig:
+    """Rutas que usan la serialización rápida"""
+
+    # Variantes separadas por comas (condonaciones, solo-condonados, pendientes, batch)
+    VARIANTES_RAPIDAS = {
+        variante.strip()
+        for variante in os.getenv(
+            "SERIALIZACION_RAPIDA", "condonaciones,solo-condonados,pendientes,batch"
+        ).split(",")
+        if variante.strip()
+    }
+
+
+def usa_serializacion_rapida(variante: str) -> bool:
+    """Indica si la variante de endpoint usa la serialización rápida"""
+    return variante in SerializacionConfig.VARIANTES_RAPIDAS
+
+
+# Conversiones equivalentes a la validación en modo lax de Pydantic
+
+def _a_int(valor):
+    if valor is None or type(valor) is int:
+        return valor
+    return int(valor)
+
+
+def _a_float(valor):
+    if valor is None or type(valor) is float:
+        return valor
+    return float(valor)
+
+
+def _a_str(valor):
+    if isinstance(valor, (bytes, bytearray)):
+        return valor.decode()
+    return valor
+
+
+def _a_str_o_int(valor):
+    if isinstance(valor, (Decimal, float)) and valor == int(valor):
+        return int(valor)
+    return _a_str(valor)
+
+
+def _a_fecha(valor):
+    if isinstance(valor, datetime):
+        if valor.time() != datetime.min.time():
+            raise ValueError("Datetimes provided to dates should have zero time")
+        return valor.date()
+    return valor
+
+
+def _a_fecha_hora(valor):
+    if type(valor) is date:
+        return datetime(valor.year, valor.month, valor.day)
+    return valor
+
+
+_CONVERSORES = {
+    frozenset({int}): _a_int,
+    frozenset({float}): _a_float,
+    frozenset({str}): _a_str,
+    frozenset({str, int}): _a_str_o_int,
+    frozenset({date}): _a_fecha,
+    frozenset({datetime}): _a_fecha_hora,
+}
+
+
+def _campos(modelo: Type[BaseModel]) -> Tuple[Tuple[str, Callable], ...]:
+    """(campo, conversión) de cada campo del modelo, en el orden del modelo"""
+    campos = []
+    for nombre, info in modelo.model_fields.items():
+        tipos = set()
+        for tipo in get_args(info.annotation) or (info.annotation,):
+            tipos.update(get_args(tipo) if getattr(tipo, "__origin__", None) is Union else (tipo,))
+        tipos.discard(type(None))
+        conversor = _CONVERSORES.get(frozenset(tipos))
+        if conversor is None:
+            raise TypeError(f"Tipo sin conversión rápida en {modelo.__name__}.{nombre}: {info.annotation}")
+        campos.append((nombre, conversor))
+    return tuple(campos)
+
+
+CAMPOS_DATOS_GENERALES = _campos(DatosGenerales)
+CAMPOS_DETALLE = _campos(DetalleCondonacion)
+
+
+def fila_datos_generales(row: dict) -> dict:
+    """Fila de tbl_segundometro_semana con la forma de DatosGenerales"""
+    return {campo: conversor(row.get(campo)) for campo, conversor in CAMPOS_DATOS_GENERALES}
+
+
+def fila_detalle(row: dict) -> dict:
+    """Fila de gastos_cobranza con la forma de DetalleCondonacion"""
+    return {campo: conversor(row.get(campo)) for campo, conversor in CAMPOS_DETALLE}
+
+
+def filas_detalle(rows: List[dict], campos: Optional[Sequence[str]] = None) -> List[dict]:
+    """
+    Filas de gastos_cobranza con la forma de DetalleCondonacion.
+
+    Con `campos` solo se incluyen esos campos (proyección de la respuesta).
+    """
+    conversores = CAMPOS_DETALLE
+    if campos is not None:
+        conversores = tuple((campo, conversor) for campo, conversor in CAMPOS_DETALLE if campo in campos)
+    return [
+        {campo: conversor(row.get(campo)) for campo, conversor in conversores}
+        for row in rows
+    ]
+
+
+def condonacion_cobranza(
+    detalles_rows: List[dict],
+    campos: Optional[Sequence[str]] = None,
+    siguiente_cursor: Optional[str] = None
+) -> dict:
+    """Estructura de CondonacionCobranza (el cursor solo aparece si hay otra página)"""
+    cobranza = {"detalle": filas_detalle(detalles_rows, campos)}
+    if siguiente_cursor is not None:
+        cobranza["siguiente_cursor"] = siguiente_cursor
+    return cobranza
+
+
+def _json_default(valor):
+    """Tipos que el codificador JSON no maneja de forma nativa"""
+    if isinstance(valor, Decimal):
+        return float(valor)
+    if isinstance(valor, datetime):
+        texto = valor.isoformat()
+        return texto[:-6] + "Z" if texto.endswith("+00:00") else texto
+    if isinstance(valor, date):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def dumps(obj) -> bytes:
+    """Serializa a JSON compacto en UTF-8 (mismo formato que model_dump_json)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_json_default, option=orjson.OPT_UTC_Z)
+    return json.dumps(
+        obj, ensure_ascii=False, separators=(",", ":"), default=_json_default
+    ).encode()
+
+
+def condonacion_response(
+    mensaje: str,
+    datos_generales_row: Optional[dict],
+    detalles_rows: Optional[List[dict]],
+    campos: Optional[Sequence[str]] = None,
+    siguiente_cursor: Optional[str] = None
+) -> dict:
+    """Estructura de CondonacionResponse a partir de filas de la base de datos"""
+    return {
+        "status_code": 200,
+        "status_message": "OK",
+        "success": True,
+        "mensaje": mensaje,
+        "datos_generales": fila_datos_generales(datos_generales_row) if datos_generales_row is not None else None,
+        "condonacion_cobranza": (
+            condonacion_cobranza(detalles_rows, campos, siguiente_cursor) if detalles_rows is not None else None
+        )
+    }
+
+
+def serializar_condonacion(
+    mensaje: str,
+    datos_generales_row: dict,
+    detalles_rows: List[dict],
+    campos: Optional[Sequence[str]] = None,
+    siguiente_cursor: Optional[str] = None
+) -> bytes:
+    """
+    JSON de CondonacionResponse directamente desde las filas de la base de datos.
+
+    Args:
+        mensaje: Mensaje de la respuesta
+        datos_generales_row: Fila de datos generales
+        detalles_rows: Filas de detalle de gastos
+        campos: Campos del detalle a incluir (None = todos)
+        siguiente_cursor: Cursor de la siguiente página, si la hay
+
+    Returns:
+        El cuerpo JSON de la respuesta
+    """
+    return dumps(condonacion_response(mensaje, datos_generales_row, detalles_rows, campos, siguiente_cursor))
+
+
+def resultado_credito(
+    id_credito: int,
+    status_code: int,
+    mensaje: str,
+    datos_generales_row: Optional[dict] = None,
+    detalles_rows: Optional[List[dict]] = None
+) -> Dict:
+    """Estructura de ResultadoCredito a partir de filas de la base de datos"""
+    return {
+        "id_credito": id_credito,
+        "status_code": status_code,
+        "mensaje": mensaje,
+        "datos_generales": fila_datos_generales(datos_generales_row) if datos_generales_row is not None else None,
+        "condonacion_cobranza": {"detalle": filas_detalle(detalles_rows)} if detalles_rows is not None else None
+    }
@@ -0,0 +1,52 @@
+"""
+Agrupación de llamadas concurrentes (singleflight)
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Comparte una misma ejecución entre llamadas concurrentes con la misma clave.
+
+    La primera llamada para una clave lanza la función como una tarea
+    independiente; las llamadas que llegan mientras sigue en curso esperan esa
+    misma tarea en lugar de repetir el trabajo. La tarea no se cancela si el
+    cliente que la originó se desconecta, para no afectar a los demás.
+    """
+
+    def __init__(self):
+        self._en_vuelo: Dict[Hashable, asyncio.Task] = {}
+        self.compartidas = 0
+
+    async def do(self, clave: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta `func` o se une a la ejecución en curso para `clave`.
+
+        Args:
+            clave: Identificador de la operación
+            func: Función asíncrona sin argumentos
+
+        Returns:
+            El resultado de la ejecución compartida
+        """
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            tarea = asyncio.ensure_future(func())
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(lambda t: self._terminar(clave, t))
+        else:
+            self.compartidas += 1
+        return await asyncio.shield(tarea)
+
+    def en_vuelo(self) -> int:
+        """Número de operaciones en curso"""
+        return len(self._en_vuelo)
+
+    def _terminar(self, clave: Hashable, tarea: asyncio.Task) -> None:
+        if self._en_vuelo.get(clave) is tarea:
+            del self._en_vuelo[clave]
+        # Marca la excepción como recuperada aunque nadie siga esperando
+        if not tarea.cancelled():
+            tarea.exception()